@@ -1,17 +1,99 @@
 import numpy as np
 import torch
 import time
-from transformers import pipeline
-from typing import List, Dict, Any
-from config import CLASS_NAMES
+import threading
+import atexit
+from typing import List, Dict, Any, Callable, Optional, Tuple
+from config import (
+    AVAILABLE_MODELS, CACHE_DIR,
+    BATCHING_ENABLED, BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS,
+    MODEL_CACHE_MAX_MB, MODEL_CACHE_IDLE_TTL, MODEL_LOAD_FAILURE_TTL,
+    PREDICTION_CACHE_ENABLED, PREDICTION_CACHE_MEMORY_ENTRIES, PREDICTION_CACHE_MAX_DISK_ENTRIES,
+    INFERENCE_WORKERS, INFERENCE_WORKER_THREADS, INFERENCE_SHM_THRESHOLD_BYTES,
+    INFERENCE_WORKER_TIMEOUT, INFERENCE_HEALTH_INTERVAL, INFERENCE_LOAD_TIMEOUT
+)
+from batching import MicroBatcher
+from model_registry import LoadedModel
+from inference_engine import InferenceEngine, RemoteModel
+from model_cache import ModelCache
+from mmap_weights import get_mapped_weights_memory
+from quantization import is_quantization_enabled
+from early_exit import get_early_exit_threshold, get_heads_path
+from result_cache import TwoTierCache, ModelFingerprints, text_hash
+from singleflight import SingleFlight
+from text_encoding import TextEncoding
 
-# Global cache for preloaded models
-_model_cache = {}
-_explainer_cache = {}
+
+# Callbacks run with the model key after a model leaves the cache (see add_eviction_listener)
+_eviction_listeners = []
+
+
+def add_eviction_listener(callback: Callable[[str], None]) -> None:
+    """
+    Register a callback that releases state derived from a model when it is evicted.
+    
+    Args:
+        callback: Called with the model key after the model leaves the cache
+    """
+    _eviction_listeners.append(callback)
+
+
+def _on_model_evicted(model_key: str, loaded_model: LoadedModel, reason: str) -> None:
+    """Release resources tied to an evicted model."""
+    for callback in _eviction_listeners:
+        callback(model_key)
+    _forget_fingerprint(model_key)
+    with _batchers_lock:
+        _batchers.pop(model_key, None)
+    with _tokenizer_lock:
+        _tokenizer_cache.pop(model_key, None)
+    if isinstance(loaded_model, RemoteModel):
+        loaded_model.engine.unload(model_key)
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+# Global cache for preloaded models (model_key -> LoadedModel)
+# Pretrained models are pinned; custom models are evicted when idle or over budget
+_model_cache = ModelCache(
+    max_bytes=MODEL_CACHE_MAX_MB * 1024**2,
+    idle_ttl=MODEL_CACHE_IDLE_TTL,
+    pinned=AVAILABLE_MODELS.keys(),
+    on_evict=_on_model_evicted
+)
+
+# Concurrent cold loads of the same key share one load (and its failure)
+_model_loads = SingleFlight('model', failure_ttl=MODEL_LOAD_FAILURE_TTL)
+_tokenizer_loads = SingleFlight('tokenizer', failure_ttl=MODEL_LOAD_FAILURE_TTL)
+
+# Per-model micro-batchers for concurrent single-text predictions
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+# Per-model tokenizers, shared by the length check and the inference path
+_tokenizer_cache = {}
+_tokenizer_lock = threading.Lock()
+
+# Prediction results keyed by model fingerprint + normalized text hash
+_model_fingerprints = ModelFingerprints(CACHE_DIR / 'results.sqlite')
+
+# Served fingerprint per model key (dropped when the model is loaded or evicted)
+_served_fingerprints = {}
+_served_fingerprints_lock = threading.Lock()
+_prediction_cache = TwoTierCache(
+    CACHE_DIR / 'results.sqlite',
+    'predictions',
+    max_memory_entries=PREDICTION_CACHE_MEMORY_ENTRIES,
+    max_disk_entries=PREDICTION_CACHE_MAX_DISK_ENTRIES
+)
 
 # Store the optimal device
 _optimal_device = None
 
+# Worker-process inference engine (started on first use when INFERENCE_WORKERS > 0)
+_inference_engine = None
+_inference_engine_lock = threading.Lock()
+
 def get_device():
     """Get the optimal device for model operations."""
     global _optimal_device
@@ -26,80 +108,494 @@ def get_device():
     return _optimal_device
 
 
-def preload_model(model_key: str, model_path: str, print_logs=True) -> None:
+def get_inference_engine() -> Optional[InferenceEngine]:
+    """
+    Get the worker-process inference engine, starting it on first use.
+    
+    Returns:
+        Optional[InferenceEngine]: The engine, or None when forward passes run
+            in this process (INFERENCE_WORKERS=0 or a GPU is available)
+    """
+    global _inference_engine
+    if INFERENCE_WORKERS <= 0 or get_device() >= 0:
+        return None
+    with _inference_engine_lock:
+        if _inference_engine is None:
+            _inference_engine = InferenceEngine(
+                INFERENCE_WORKERS,
+                threads_per_worker=INFERENCE_WORKER_THREADS,
+                shm_threshold_bytes=INFERENCE_SHM_THRESHOLD_BYTES,
+                worker_timeout=INFERENCE_WORKER_TIMEOUT,
+                health_interval=INFERENCE_HEALTH_INTERVAL,
+                load_timeout=INFERENCE_LOAD_TIMEOUT
+            )
+            _inference_engine.start()
+            atexit.register(_inference_engine.stop)
+        return _inference_engine
+
+
+def get_inference_worker_stats() -> Dict[str, Any]:
+    """Get health and load counters of the inference worker pool."""
+    engine = _inference_engine
+    if engine is None:
+        return {'enabled': INFERENCE_WORKERS > 0, 'workers': 0}
+    stats = engine.get_stats()
+    stats['enabled'] = True
+    return stats
+
+
+def get_early_exit_stats() -> Dict[str, Any]:
+    """Get the threshold and exit-layer distribution of every model served with early exit."""
+    return {key: model.early_exit.get_stats() for key, model in _model_cache.items()
+            if getattr(model, 'early_exit_enabled', False) and model.early_exit is not None}
+
+
+def get_model_memory_stats() -> Dict[str, Any]:
+    """
+    Get shared vs private memory of the memory-mapped model weights, per process.
+
+    Shared pages are backed by the page cache once per host; private pages are
+    what each additional process actually costs.
+
+    Returns:
+        Dict: Per-model usage in this process and, when the worker pool runs,
+            in each worker process
+    """
+    local_paths = {key: model.model_path for key, model in _model_cache.items()
+                   if getattr(model, 'mmapped', False)}
+    stats = {'web': get_mapped_weights_memory(local_paths)}
+
+    engine = _inference_engine
+    if engine is not None:
+        engine_stats = engine.get_stats()
+        stats['workers'] = {
+            str(process['pid']): get_mapped_weights_memory(engine_stats['model_paths'], pid=process['pid'])
+            for process in engine_stats['processes'] if process['alive']
+        }
+    return stats
+
+
+def preload_model(model_key: str, model_path: str, print_logs=True) -> LoadedModel:
     """
     Preload a model into memory for faster inference.
     
+    Concurrent calls for the same cold model share a single load; a failed load
+    is re-raised to every waiter and to new callers for MODEL_LOAD_FAILURE_TTL seconds.
+    
     Args:
         model_key: The key to store the model under
         model_path: Path to the model
         print_logs: Whether to print loading information
-    """
-    if model_key not in _model_cache:
-        start_time = time.time()
-        device = get_device()
         
-        if print_logs:
-            print(f"🤖 Loading model {model_key} to {'GPU' if device >= 0 else 'CPU'}")
-        
-        # Check GPU memory before loading if using GPU
-        if device >= 0:
-            try:
-                memory_free = (torch.cuda.get_device_properties(0).total_memory - 
-                              torch.cuda.memory_allocated()) / 1024**3
-                if memory_free < 2.0:
-                    print(f"⚠️ Low GPU memory ({memory_free:.1f} GB), using CPU for {model_key}")
-                    device = -1
-            except:
+    Returns:
+        LoadedModel: The cached model instance (a RemoteModel when inference runs in worker processes)
+    """
+    loaded_model = _model_cache.get(model_key)
+    if loaded_model is None:
+        loaded_model = _model_loads.do(model_key, _load_model, model_key, model_path, print_logs)
+    return loaded_model
+
+
+def _load_model(model_key: str, model_path: str, print_logs: bool) -> LoadedModel:
+    """Load a model and add it to the cache (run once per cold key by preload_model)."""
+    # Another thread may have finished loading between the cache miss and the single-flight
+    loaded_model = _model_cache.get(model_key)
+    if loaded_model is not None:
+        return loaded_model
+    
+    start_time = time.time()
+    device = get_device()
+    # The files may have changed since the model was last served
+    _forget_fingerprint(model_key)
+    
+    if print_logs:
+        print(f"🤖 Loading model {model_key} to {'GPU' if device >= 0 else 'CPU'}")
+    
+    # Check GPU memory before loading if using GPU
+    if device >= 0:
+        try:
+            memory_free = (torch.cuda.get_device_properties(0).total_memory - 
+                          torch.cuda.memory_allocated()) / 1024**3
+            if memory_free < 2.0:
+                print(f"⚠️ Low GPU memory ({memory_free:.1f} GB), using CPU for {model_key}")
                 device = -1
-        
-        classifier = pipeline(
-            "text-classification", 
-            model=model_path, 
-            device=device
-        )
-        _model_cache[model_key] = classifier
-        
-        # Log GPU memory after loading
-        if device >= 0 and torch.cuda.is_available():
-            memory_used = torch.cuda.memory_allocated() / 1024**3
-            if print_logs:
-                print(f"🎮 GPU memory after loading {model_key}: {memory_used:.2f} GB")
-        
-        end_time = time.time()
+        except:
+            device = -1
+    
+    tokenizer = get_tokenizer(model_key, model_path)
+    engine = get_inference_engine() if device < 0 else None
+    if engine is not None:
+        loaded_model = RemoteModel(engine, model_key, model_path, tokenizer=tokenizer)
+    else:
+        loaded_model = LoadedModel(model_key, model_path, device, tokenizer=tokenizer)
+    _model_cache[model_key] = loaded_model
+    
+    # Log GPU memory after loading
+    if device >= 0 and torch.cuda.is_available():
+        memory_used = torch.cuda.memory_allocated() / 1024**3
         if print_logs:
-            print(f"✅ Model {model_key} loaded in {end_time - start_time:.2f}s on {'GPU' if device >= 0 else 'CPU'}")
+            print(f"🎮 GPU memory after loading {model_key}: {memory_used:.2f} GB")
+    
+    end_time = time.time()
+    if print_logs:
+        mmapped = ", mmap" if getattr(loaded_model, 'mmapped', False) else ""
+        print(f"✅ Model {model_key} loaded in {end_time - start_time:.2f}s on {'GPU' if device >= 0 else 'CPU'} "
+              f"({loaded_model.backend}{mmapped}, {loaded_model.param_bytes / 1024**2:.0f} MB)")
+    return loaded_model
 
 
-def get_cached_model(model_key: str) -> pipeline:
+def get_loaded_model(model_key: str) -> LoadedModel:
     """
-    Get a cached model or raise an error if not found.
+    Get the shared model instance for a key, loading it on demand.
     
     Args:
-        model_key: The key for the cached model
+        model_key: The key for the cached model (pretrained key or custom_<code>)
         
     Returns:
-        pipeline: The cached model pipeline
+        LoadedModel: The model instance with its label, probability and explainer views
         
     Raises:
-        ValueError: If model is not preloaded
+        ValueError: If the model cannot be found
     """
-    if model_key not in _model_cache:
+    loaded_model = _model_cache.get(model_key)
+    if loaded_model is None:
         # Load on demand if not preloaded
         from model_utils import get_model_path
         model_path = get_model_path(model_key)
-        preload_model(model_key, model_path, True)
-    return _model_cache[model_key]
+        loaded_model = preload_model(model_key, model_path, True)
+    return loaded_model
+
+
+def evict_model(model_key: str) -> bool:
+    """
+    Evict a model from the cache (e.g. after its files were deleted).
+    
+    Args:
+        model_key: The key for the cached model
+        
+    Returns:
+        bool: True if the model was cached and has been evicted
+    """
+    _model_loads.forget(model_key)
+    _tokenizer_loads.forget(model_key)
+    return _model_cache.pop(model_key) is not None
+
+
+def cache_derived_entry(key: str, value: Any) -> None:
+    """
+    Charge an object built from loaded models (e.g. stacked ensemble weights) to the model cache.
+
+    The entry counts against MODEL_CACHE_MAX_MB through its param_bytes attribute
+    and is evicted like a custom model (LRU, idle TTL); eviction listeners are
+    called with its key.
+
+    Args:
+        key: Cache key (must not collide with a model key)
+        value: The object, exposing param_bytes
+    """
+    _model_cache[key] = value
+
 
+def get_derived_entry(key: str) -> Any:
+    """Get an entry added with cache_derived_entry (None if it was evicted)."""
+    return _model_cache.get(key)
 
-def hf_pretrained_classify(model_key: str, texts: str | List[str], label_mapping=None) -> List[Dict[str, Any]]:
+
+def drop_derived_entry(key: str) -> bool:
+    """Evict an entry added with cache_derived_entry."""
+    return _model_cache.pop(key) is not None
+
+
+def get_model_cache_headroom(keep: List[str] = ()) -> Optional[int]:
+    """
+    Get the bytes of MODEL_CACHE_MAX_MB a new entry could use beside the pinned models.
+
+    Args:
+        keep: Cached keys the new entry cannot displace (e.g. the models it is built from)
+
+    Returns:
+        Optional[int]: Available bytes, or None when the budget is unlimited
+    """
+    return _model_cache.headroom(keep)
+
+
+def evict_idle_models() -> int:
+    """Evict custom models that have been idle longer than MODEL_CACHE_IDLE_TTL."""
+    return _model_cache.evict_idle()
+
+
+def get_model_cache_stats() -> Dict[str, Any]:
+    """Get hit/miss/eviction counters and memory usage of the model cache."""
+    return _model_cache.get_stats()
+
+
+def get_model_load_stats() -> Dict[str, Any]:
+    """Get single-flight load counters and recent load events (time, waiters, outcome)."""
+    return {
+        'models': _model_loads.get_stats(),
+        'tokenizers': _tokenizer_loads.get_stats(),
+    }
+
+
+def get_tokenizer(model_key: str, model_path: str = None):
+    """
+    Get the cached tokenizer for a model, loading only the tokenizer files on first use.
+    
+    The same instance is handed to the model when it is loaded, so the length
+    check and the forward pass share one tokenizer.
+    
+    Args:
+        model_key: The key for the model
+        model_path: Path to the model (resolved from the key if None)
+        
+    Returns:
+        The model's tokenizer
+    """
+    with _tokenizer_lock:
+        tokenizer = _tokenizer_cache.get(model_key)
+    if tokenizer is not None:
+        return tokenizer
+    
+    if model_path is None:
+        from model_utils import get_model_path
+        model_path = get_model_path(model_key)
+    
+    return _tokenizer_loads.do(model_key, _load_tokenizer, model_key, model_path)
+
+
+def _load_tokenizer(model_key: str, model_path: str):
+    """Load a tokenizer and add it to the cache (run once per cold key by get_tokenizer)."""
+    with _tokenizer_lock:
+        tokenizer = _tokenizer_cache.get(model_key)
+    if tokenizer is None:
+        from transformers import AutoTokenizer
+        tokenizer = AutoTokenizer.from_pretrained(str(model_path))
+        with _tokenizer_lock:
+            _tokenizer_cache[model_key] = tokenizer
+    return tokenizer
+
+
+def count_tokens(model_key: str, text: str, max_tokens: int = 512) -> Tuple[Optional[int], Optional[List[int]]]:
+    """
+    Count the tokens of a text, skipping tokenization when a cheap bound proves it fits.
+    
+    For ASCII text every token covers at least one character, so the token
+    count can never exceed the character count plus one word-boundary marker
+    and the special tokens.
+    
+    Args:
+        model_key: The key for the model (selects the tokenizer)
+        text: Text to check
+        max_tokens: Token limit to check against
+        
+    Returns:
+        tuple: (token_count, input_ids) - both None when the bound proves the text fits;
+            input_ids can be passed to hf_pretrained_classify to skip re-tokenization
+    """
+    tokenizer = get_tokenizer(model_key)
+    
+    if text.isascii():
+        upper_bound = len(text) + 1 + tokenizer.num_special_tokens_to_add()
+        if upper_bound <= max_tokens:
+            return None, None
+    
+    input_ids = tokenizer.encode(text, truncation=False, add_special_tokens=True)
+    return len(input_ids), input_ids
+
+
+def encode_text(model_key: str, text: str) -> TextEncoding:
+    """
+    Tokenize a text once for a request (token count, input IDs, offsets and word mapping).
+    
+    Args:
+        model_key: The key for the model (selects the tokenizer)
+        text: Text to encode
+        
+    Returns:
+        TextEncoding: The encoding, to be passed to the prediction and explanation stages
+    """
+    return TextEncoding.encode(get_tokenizer(model_key), model_key, text)
+
+
+def _scores_from_probs(loaded_model: LoadedModel, probs: np.ndarray) -> List[List[Dict[str, Any]]]:
+    """Convert a probability matrix into per-text [{'label', 'score'}, ...] lists in label ID order."""
+    id2label = loaded_model.config.id2label
+    labels = [id2label[i] for i in range(probs.shape[1])]
+    return [
+        [{'label': label, 'score': float(score)} for label, score in zip(labels, row)]
+        for row in probs
+    ]
+
+
+def _score_batch(model_key: str, items: List[Tuple[str, Optional[List[int]]]]) -> List[List[Dict[str, Any]]]:
+    """
+    Run one forward pass over a batch of texts, sorted by token length to cut padding.
+    
+    Args:
+        model_key: Key for the preloaded model
+        items: (text, input_ids) pairs collected by the micro-batcher; input_ids may be
+            None, in which case the text is tokenized here
+        
+    Returns:
+        List[List[Dict[str, Any]]]: Scores for every label, one list per text, in input order
+    """
+    loaded_model = get_loaded_model(model_key)
+    
+    input_ids = [ids for _, ids in items]
+    missing = [i for i, ids in enumerate(input_ids) if ids is None]
+    if missing:
+        encoded = loaded_model.encode([items[i][0] for i in missing])
+        for i, ids in zip(missing, encoded):
+            input_ids[i] = ids
+    
+    return _scores_from_probs(loaded_model, loaded_model.predict_proba_ids(input_ids))
+
+
+def get_batcher(model_key: str) -> MicroBatcher:
+    """
+    Get (or create) the micro-batcher for a model.
+    
+    Args:
+        model_key: Key for the preloaded model
+        
+    Returns:
+        MicroBatcher: Batching queue that feeds this model
+    """
+    with _batchers_lock:
+        batcher = _batchers.get(model_key)
+        if batcher is None:
+            batcher = MicroBatcher(
+                model_key,
+                lambda items: _score_batch(model_key, items),
+                max_batch_size=BATCH_MAX_SIZE,
+                max_wait_ms=BATCH_MAX_WAIT_MS
+            )
+            _batchers[model_key] = batcher
+        return batcher
+
+
+def get_batching_stats() -> Dict[str, Any]:
+    """Get batch-size and queue-wait statistics for every model batcher."""
+    with _batchers_lock:
+        batchers = dict(_batchers)
+    return {
+        'enabled': BATCHING_ENABLED,
+        'max_batch_size': BATCH_MAX_SIZE,
+        'max_wait_ms': BATCH_MAX_WAIT_MS,
+        'models': {key: batcher.get_stats() for key, batcher in batchers.items()}
+    }
+
+
+def get_model_fingerprint(model_key: str) -> str:
+    """
+    Get the content fingerprint of a model as served (changes when the model is
+    retrained or replaced, or when its int8 or early-exit variant is served instead).
+    
+    Args:
+        model_key: The key for the model
+        
+    Returns:
+        str: Hex digest of the model files, suffixed with the serving variant
+            (and the digest of the early-exit heads)
+    """
+    with _served_fingerprints_lock:
+        fingerprint = _served_fingerprints.get(model_key)
+    if fingerprint is not None:
+        return fingerprint
+    
+    from model_utils import get_model_path
+    model_path = get_model_path(model_key)
+    fingerprint = _model_fingerprints.get(model_path)
+    if get_device() < 0 and is_quantization_enabled(model_key):
+        fingerprint = f"{fingerprint}-int8"
+    threshold = get_early_exit_threshold(model_key)
+    heads_path = get_heads_path(model_path)
+    if threshold is not None and heads_path.exists():
+        # The heads live in a subdirectory the model fingerprint does not cover
+        fingerprint = f"{fingerprint}-exit{threshold:g}-{_model_fingerprints.get_file(heads_path)[:16]}"
+    
+    with _served_fingerprints_lock:
+        _served_fingerprints[model_key] = fingerprint
+    return fingerprint
+
+
+def _forget_fingerprint(model_key: str) -> None:
+    """Drop the memoized fingerprint of a model (recomputed on next use)."""
+    with _served_fingerprints_lock:
+        _served_fingerprints.pop(model_key, None)
+
+
+def get_prediction_cache_stats() -> Dict[str, Any]:
+    """Get hit/miss counters of the prediction cache."""
+    stats = _prediction_cache.get_stats()
+    stats['enabled'] = PREDICTION_CACHE_ENABLED
+    return stats
+
+
+def _score_texts(model_key: str, texts: List[str], input_ids: Optional[List[Optional[List[int]]]] = None,
+                 use_cache: bool = True) -> List[List[Dict[str, Any]]]:
+    """
+    Score texts against every label, serving repeated texts from the prediction cache.
+    
+    Cache hits skip tokenization and the forward pass. A single uncached text
+    goes through the model's micro-batcher; several go through one batched call.
+    
+    Args:
+        model_key: Key for the preloaded model
+        texts: Texts to score
+        input_ids: Token IDs per text, None where the text still needs tokenizing
+        use_cache: Whether to read and write the prediction cache
+        
+    Returns:
+        List[List[Dict[str, Any]]]: Scores for every label, one list per text, in input order
+    """
+    use_cache = use_cache and PREDICTION_CACHE_ENABLED
+    scores = [None] * len(texts)
+    
+    if use_cache:
+        fingerprint = get_model_fingerprint(model_key)
+        keys = [f"{fingerprint}:{text_hash(text)}" for text in texts]
+        cached = _prediction_cache.get_many(keys)
+        for i, key in enumerate(keys):
+            if key in cached:
+                scores[i] = cached[key]
+    
+    missing = [i for i, score in enumerate(scores) if score is None]
+    if missing:
+        if len(missing) == 1 and BATCHING_ENABLED:
+            ids = input_ids[missing[0]] if input_ids else None
+            scores[missing[0]] = get_batcher(model_key).submit((texts[missing[0]], ids)).result()
+        else:
+            loaded_model = get_loaded_model(model_key)
+            encoded = [input_ids[i] if input_ids else None for i in missing]
+            untokenized = [n for n, ids in enumerate(encoded) if ids is None]
+            if untokenized:
+                for n, ids in zip(untokenized, loaded_model.encode([texts[missing[n]] for n in untokenized])):
+                    encoded[n] = ids
+            computed = _scores_from_probs(loaded_model, loaded_model.predict_proba_ids(encoded))
+            for i, score in zip(missing, computed):
+                scores[i] = score
+        
+        if use_cache:
+            _prediction_cache.put_many({keys[i]: scores[i] for i in missing})
+    
+    return scores
+
+
+def hf_pretrained_classify(model_key: str, texts: str | List[str], label_mapping=None,
+                           input_ids: Optional[List[int]] = None) -> List[Dict[str, Any]]:
     """
     Classify text using a preloaded model.
     
+    Repeated texts are served from the prediction cache. Single texts are
+    routed through the model's micro-batcher so concurrent requests share one
+    forward pass.
+    
     Args:
         model_key: Key for the preloaded model
         texts: Text or list of texts to classify
         label_mapping: Optional mapping for label names
+        input_ids: Token IDs of a single text, as returned by count_tokens (skips re-tokenization)
         
     Returns:
         List[Dict[str, Any]]: Classification results
@@ -108,8 +604,9 @@ def hf_pretrained_classify(model_key: str, texts: str | List[str], label_mapping
     print(f"🔮 Starting prediction with model: {model_key}")
     
     try:
-        classifier = get_cached_model(model_key)
-        results = classifier(texts)
+        text_list = [texts] if isinstance(texts, str) else list(texts)
+        scores = _score_texts(model_key, text_list, input_ids=[input_ids] if input_ids is not None else None)
+        results = [max(label_scores, key=lambda item: item['score']) for label_scores in scores]
         
         end_time = time.time()
         text_length = len(texts) if isinstance(texts, str) else sum(len(t) for t in texts)
@@ -124,9 +621,6 @@ def hf_pretrained_classify(model_key: str, texts: str | List[str], label_mapping
         print(f"❌ Prediction error with {model_key}: {str(e)}")
         raise
     
-    if isinstance(results, dict):
-        results = [results]
-    
     if label_mapping:
         results = [
             {'label': label_mapping.get(res['label'], res['label']), 'score': res['score']} 
@@ -135,7 +629,25 @@ def hf_pretrained_classify(model_key: str, texts: str | List[str], label_mapping
     return results
 
 
-def get_pred_probs(model_key: str, texts: str | List[str], label_mapping=None) -> np.ndarray:
+def get_token_probs(model_key: str, input_ids: List[List[int]]) -> np.ndarray:
+    """
+    Get prediction probabilities for pre-tokenized inputs (e.g. long-text windows)
+    through the prediction cache and micro-batcher.
+    
+    Args:
+        model_key: Key for the preloaded model
+        input_ids: Token IDs per input, special tokens included
+        
+    Returns:
+        np.ndarray: Probabilities per input, columns ordered by model label ID
+    """
+    # Keyed on the token IDs: a window's IDs need not match a fresh tokenization of its text
+    keys = [f"ids:{' '.join(map(str, ids))}" for ids in input_ids]
+    scores = _score_texts(model_key, keys, input_ids=input_ids)
+    return np.array([[item['score'] for item in label_scores] for label_scores in scores])
+
+
+def get_pred_probs(model_key: str, texts: str | List[str], label_mapping=None, use_cache: bool = True) -> np.ndarray:
     """
     Get prediction probabilities for texts using preloaded model.
     
@@ -143,71 +655,21 @@ def get_pred_probs(model_key: str, texts: str | List[str], label_mapping=None) -
         model_key: Key for the preloaded model
         texts: Text or list of texts to analyze
         label_mapping: Optional mapping for label names
+        use_cache: Whether to use the prediction cache (disable for throwaway inputs
+            such as LIME perturbations)
         
     Returns:
-        np.ndarray: Probability array for each class
+        np.ndarray: Probability array for each class (no rows for an empty list)
     """
+    text_list = [texts] if isinstance(texts, str) else list(texts)
+    if not text_list:
+        return np.empty((0, len(get_loaded_model(model_key).class_columns(label_mapping))))
+    
     start_time = time.time()
     print(f"📊 Getting prediction probabilities with model: {model_key}")
     
     try:
-        # For probability prediction, we need a separate pipeline with top_k=None
-        # Check if we have a probability version cached
-        prob_key = f"{model_key}_probs"
-        if prob_key not in _model_cache:
-            print(f"🔧 Creating probability pipeline for {model_key}")
-            
-            # Handle custom models differently
-            if model_key.startswith("custom_"):
-                # For custom models, use the model from cache directly
-                if model_key in _model_cache:
-                    # Get the pipeline from cache and create a new top_k=None version
-                    cached_pipeline = _model_cache[model_key]
-                    device = get_device()
-                    
-                    # Create a new pipeline with top_k=None using the same model path
-                    # We need to get the model path from the custom model directory
-                    model_code = model_key.replace("custom_", "")
-                    from training_routes import CUSTOM_MODELS_DIR
-                    model_path = CUSTOM_MODELS_DIR / model_code / 'model'
-                    
-                    prob_classifier = pipeline(
-                        "text-classification",
-                        model=str(model_path),
-                        top_k=None,
-                        device=device
-                    )
-                else:
-                    raise ValueError(f"Custom model {model_key} not found in cache")
-            else:
-                # For regular models, use the normal path
-                from model_utils import get_model_path
-                model_path = get_model_path(model_key)
-                device = get_device()
-                
-                # Check GPU memory
-                if device >= 0:
-                    try:
-                        memory_free = (torch.cuda.get_device_properties(0).total_memory - 
-                                      torch.cuda.memory_allocated()) / 1024**3
-                        if memory_free < 1.0:
-                            print(f"⚠️ Low GPU memory ({memory_free:.1f} GB), using CPU for probability pipeline")
-                            device = -1
-                    except:
-                        device = -1
-                
-                prob_classifier = pipeline(
-                    "text-classification", 
-                    model=model_path, 
-                    top_k=None, 
-                    device=device
-                )
-                
-            _model_cache[prob_key] = prob_classifier
-            print(f"✅ Probability pipeline cached: {prob_key}")
-        
-        classifier = _model_cache[prob_key]
-        results = classifier(texts)
+        results = _score_texts(model_key, text_list, use_cache=use_cache)
         
         end_time = time.time()
         print(f"⚡ Probability prediction completed in {end_time - start_time:.3f}s")
@@ -216,22 +678,6 @@ def get_pred_probs(model_key: str, texts: str | List[str], label_mapping=None) -
         print(f"❌ Probability prediction error with {model_key}: {str(e)}")
         raise
     
-    # Handle single text input
-    if isinstance(texts, str):
-        results = [results]
-    
-    probs = []
-    for res in results:
-        # Create probability array in the order of class_names
-        prob_dict = {}
-        for item in res:
-            label = label_mapping.get(item['label'], item['label']) if label_mapping else item['label']
-            prob_dict[label] = item['score']
-        
-        # Ensure we have probabilities for both classes
-        prob_array = []
-        for cls in CLASS_NAMES:
-            prob_array.append(prob_dict.get(cls, 0.0))
-        
-        probs.append(prob_array)
-    return np.array(probs)
+    # Scores are in label-ID order; reorder the columns to CLASS_NAMES
+    probs = np.array([[item['score'] for item in res] for res in results])
+    return np.ascontiguousarray(probs[:, get_loaded_model(model_key).class_columns(label_mapping)])
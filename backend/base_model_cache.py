@@ -9,8 +9,6 @@ import time
 import shutil
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-from huggingface_hub import HfApi, model_info
 
 
 # Base models directory
@@ -135,6 +133,8 @@ def download_base_model(model_name: str, force_redownload: bool = False) -> Tupl
     Returns:
         Tuple[bool, str]: (success, message)
     """
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+    
     model_path = get_model_cache_path(model_name)
     
     # Check if already cached
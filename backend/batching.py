@@ -0,0 +1,162 @@
+"""
+Dynamic Micro-Batching
+Gathers concurrent single-text prediction requests for a model and runs them
+through one forward pass, handing each result back to its waiting thread.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List
+
+
+class _BatchItem:
+    """A single queued input waiting for its prediction."""
+
+    __slots__ = ('payload', 'future', 'enqueued_at')
+
+    def __init__(self, payload: Any):
+        self.payload = payload
+        self.future = Future()
+        self.enqueued_at = time.time()
+
+
+class MicroBatcher:
+    """Per-model batching queue served by a single worker thread."""
+
+    def __init__(self, name: str, run_batch: Callable[[List[Any]], List[Any]],
+                 max_batch_size: int = 16, max_wait_ms: float = 5.0, idle_timeout: float = 60.0):
+        """
+        Initialize the batcher.
+
+        Args:
+            name: Name used in logs and statistics (usually the model key)
+            run_batch: Callable taking a list of payloads and returning one result per payload, in order
+            max_batch_size: Maximum number of texts per forward pass
+            max_wait_ms: Maximum time the first queued text waits for more texts to arrive
+            idle_timeout: Seconds without traffic after which the worker thread exits
+        """
+        self.name = name
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000
+        self.idle_timeout = idle_timeout
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+        # Statistics
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._requests = 0
+        self._errors = 0
+        self._max_batch_seen = 0
+        self._batch_size_counts = {}
+        self._total_wait = 0.0
+        self._max_wait_seen = 0.0
+        self._total_forward = 0.0
+
+    def submit(self, payload: Any) -> Future:
+        """
+        Queue an input for the next batch.
+
+        Args:
+            payload: Input passed to run_batch (e.g. a text, or a text with its token IDs)
+
+        Returns:
+            Future: Resolves to the result produced by run_batch for this input
+        """
+        item = _BatchItem(payload)
+        with self._lock:
+            self._queue.put(item)
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._worker_loop,
+                    name=f"batcher-{self.name}",
+                    daemon=True
+                )
+                self._worker.start()
+        return item.future
+
+    def _collect_batch(self, first: _BatchItem) -> List[_BatchItem]:
+        """Gather more items until the batch is full or the first item's wait budget is spent."""
+        batch = [first]
+        deadline = first.enqueued_at + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.time()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _worker_loop(self):
+        """Main worker loop: collect a batch, run it, resolve futures."""
+        while True:
+            try:
+                first = self._queue.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                with self._lock:
+                    if self._queue.empty():
+                        self._worker = None
+                        return
+                continue
+
+            batch = self._collect_batch(first)
+            batch_start = time.time()
+
+            try:
+                results = self.run_batch([item.payload for item in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"Batch returned {len(results)} results for {len(batch)} inputs")
+                for item, result in zip(batch, results):
+                    item.future.set_result(result)
+                failed = False
+            except Exception as e:
+                print(f"❌ Batch error for {self.name}: {str(e)}")
+                for item in batch:
+                    if not item.future.done():
+                        item.future.set_exception(e)
+                failed = True
+
+            self._record(batch, batch_start, time.time(), failed)
+
+    def _record(self, batch: List[_BatchItem], batch_start: float, batch_end: float, failed: bool):
+        """Update batch-size and queue-wait statistics."""
+        size = len(batch)
+        waits = [batch_start - item.enqueued_at for item in batch]
+        with self._stats_lock:
+            self._batches += 1
+            self._requests += size
+            if failed:
+                self._errors += 1
+            self._max_batch_seen = max(self._max_batch_seen, size)
+            self._batch_size_counts[size] = self._batch_size_counts.get(size, 0) + 1
+            self._total_wait += sum(waits)
+            self._max_wait_seen = max(self._max_wait_seen, max(waits))
+            self._total_forward += batch_end - batch_start
+
+    def get_stats(self) -> Dict:
+        """Get batch-size and queue-wait statistics for this batcher."""
+        with self._stats_lock:
+            batches = self._batches
+            requests = self._requests
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000,
+                'batches': batches,
+                'requests': requests,
+                'errors': self._errors,
+                'queued': self._queue.qsize(),
+                'avg_batch_size': round(requests / batches, 2) if batches else 0.0,
+                'largest_batch': self._max_batch_seen,
+                'batch_size_counts': {str(k): v for k, v in sorted(self._batch_size_counts.items())},
+                'avg_queue_wait_ms': round(self._total_wait / requests * 1000, 2) if requests else 0.0,
+                'max_queue_wait_ms': round(self._max_wait_seen * 1000, 2),
+                'avg_batch_time_ms': round(self._total_forward / batches * 1000, 2) if batches else 0.0,
+            }
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Cascade Calibration
+Scores a labeled CSV with a fast and a slow model and picks the narrowest
+uncertainty band (fast deceptive probability between low and high) whose
+cascade reaches a target accuracy, then prints the CASCADES entry to use.
+"""
+
+import sys
+import time
+import argparse
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import AVAILABLE_MODELS, LABEL_MAPPING
+from cascade import format_cascade_spec
+
+
+def load_labeled_csv(csv_path: str, max_rows: Optional[int] = None) -> Tuple[List[str], np.ndarray]:
+    """
+    Load a CSV in the training format: a 'text' column and a 'label' column
+    (0/1 or deceptive/truthful, where 0 = deceptive).
+
+    Returns:
+        tuple: (texts, labels) with labels as 1 = deceptive, 0 = truthful
+    """
+    import pandas as pd
+
+    df = pd.read_csv(csv_path, nrows=max_rows)
+    if 'text' not in df.columns or 'label' not in df.columns:
+        raise ValueError("CSV must contain 'text' and 'label' columns")
+
+    label_mapping = {'deceptive': 1, '0': 1, 0: 1, 'truthful': 0, '1': 0, 1: 0}
+    df['label'] = df['label'].map(label_mapping)
+    df = df.dropna(subset=['text', 'label'])
+    if df.empty:
+        raise ValueError("CSV contains no usable rows")
+    return df['text'].astype(str).tolist(), df['label'].astype(int).to_numpy()
+
+
+def score_deceptive(model_key: str, texts: List[str]) -> Tuple[np.ndarray, float]:
+    """
+    Score texts with a served model.
+
+    Returns:
+        tuple: (deceptive probability per text, seconds per text)
+    """
+    from ai_utils import get_loaded_model
+
+    loaded_model = get_loaded_model(model_key)
+    id2label = loaded_model.config.id2label
+
+    start_time = time.time()
+    probs = loaded_model.predict_proba_ids(loaded_model.encode(texts))
+    elapsed = time.time() - start_time
+
+    labels = [LABEL_MAPPING.get(str(id2label[i]), str(id2label[i])) for i in range(probs.shape[1])]
+    deceptive_index = labels.index('deceptive') if 'deceptive' in labels else 0
+    return probs[:, deceptive_index], elapsed / len(texts)
+
+
+def choose_band(fast_scores: np.ndarray, fast_correct: np.ndarray, slow_correct: np.ndarray,
+                target_accuracy: float, grid: int = 200) -> Dict:
+    """
+    Find the band that reaches the target accuracy with the fewest escalations.
+
+    Texts whose fast score lies strictly inside (low, high) take the slow
+    model's answer. Candidate thresholds are quantiles of the fast scores.
+
+    Args:
+        fast_scores: Fast-model deceptive probability per text
+        fast_correct: Whether the fast model is right, per text
+        slow_correct: Whether the slow model is right, per text
+        target_accuracy: Minimum cascade accuracy
+        grid: Number of candidate thresholds
+
+    Returns:
+        Dict: 'low', 'high', 'accuracy', 'escalation_rate' and 'met' (False when
+            no band reaches the target; the most accurate band is returned then)
+    """
+    order = np.argsort(fast_scores)
+    scores = fast_scores[order]
+    gain = np.concatenate([[0], np.cumsum(slow_correct[order].astype(int) - fast_correct[order].astype(int))])
+    n = len(scores)
+    base_correct = int(fast_correct.sum())
+
+    thresholds = np.unique(np.concatenate([[0.0, 0.5, 1.0], np.quantile(scores, np.linspace(0, 1, grid))]))
+    # Inside (low, high) = sorted positions [first above low, first at or above high)
+    starts = np.searchsorted(scores, thresholds, side='right')
+    ends = np.searchsorted(scores, thresholds, side='left')
+
+    best, best_any = None, None
+    for i, low in enumerate(thresholds):
+        for j in range(i, len(thresholds)):
+            start, end = starts[i], max(starts[i], ends[j])
+            accuracy = (base_correct + gain[end] - gain[start]) / n
+            candidate = {'low': float(low), 'high': float(thresholds[j]), 'accuracy': float(accuracy),
+                         'escalation_rate': float((end - start) / n)}
+            if best_any is None or (accuracy, -candidate['escalation_rate']) > (best_any['accuracy'], -best_any['escalation_rate']):
+                best_any = candidate
+            if accuracy >= target_accuracy and (
+                    best is None or (candidate['escalation_rate'], -accuracy) < (best['escalation_rate'], -best['accuracy'])):
+                best = candidate
+
+    if best is not None:
+        return {**best, 'met': True}
+    return {**best_any, 'met': False}
+
+
+def main():
+    """Main CLI interface."""
+    parser = argparse.ArgumentParser(
+        description="Pick cascade thresholds from labeled data",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python calibrate_cascade.py --fast bert-combined-1 --slow deberta-combined-1 --csv heldout.csv
+  python calibrate_cascade.py --fast bert-covid-1 --slow deberta-covid-1 --csv covid.csv --target-accuracy 0.93 --name covid
+        """
+    )
+    parser.add_argument('--fast', required=True, help='Fast model key')
+    parser.add_argument('--slow', required=True, help='Slow, more accurate model key')
+    parser.add_argument('--csv', required=True, help="Held-out CSV with 'text' and 'label' columns")
+    parser.add_argument('--target-accuracy', type=float, default=None,
+                        help='Minimum cascade accuracy (default: the slow model\'s accuracy minus --tolerance)')
+    parser.add_argument('--tolerance', type=float, default=0.005,
+                        help='Accuracy the cascade may give up against the slow model when no target is set')
+    parser.add_argument('--name', default=None, help='Public model name of the cascade (default: the slow model key)')
+    parser.add_argument('--max-rows', type=int, default=None, help='Only use the first N rows')
+    parser.add_argument('--grid', type=int, default=200, help='Candidate thresholds to search')
+    args = parser.parse_args()
+
+    for model_key in (args.fast, args.slow):
+        if model_key not in AVAILABLE_MODELS:
+            print(f"❌ Unknown model: {model_key}")
+            sys.exit(1)
+
+    try:
+        texts, labels = load_labeled_csv(args.csv, args.max_rows)
+        print(f"📊 Scoring {len(texts)} texts with {args.fast} and {args.slow}...")
+        fast_scores, fast_latency = score_deceptive(args.fast, texts)
+        slow_scores, slow_latency = score_deceptive(args.slow, texts)
+    except Exception as e:
+        print(f"❌ Calibration failed: {str(e)}")
+        sys.exit(1)
+
+    fast_correct = (fast_scores > 0.5) == labels.astype(bool)
+    slow_correct = (slow_scores > 0.5) == labels.astype(bool)
+    fast_accuracy, slow_accuracy = float(fast_correct.mean()), float(slow_correct.mean())
+    target = args.target_accuracy if args.target_accuracy is not None else slow_accuracy - args.tolerance
+
+    band = choose_band(fast_scores, fast_correct, slow_correct, target, grid=args.grid)
+    cascade_latency = fast_latency + band['escalation_rate'] * slow_latency
+
+    print()
+    print("🪜 Cascade Calibration")
+    print("=" * 50)
+    print(f"  {'fast':<8} {args.fast:<30} accuracy {fast_accuracy:.4f}  {fast_latency * 1000:7.2f} ms/text")
+    print(f"  {'slow':<8} {args.slow:<30} accuracy {slow_accuracy:.4f}  {slow_latency * 1000:7.2f} ms/text")
+    print(f"  {'cascade':<8} band ({band['low']:.4f}, {band['high']:.4f}){'':<9} accuracy {band['accuracy']:.4f}  "
+          f"{cascade_latency * 1000:7.2f} ms/text (est.)")
+    print(f"  Escalated to the slow model: {band['escalation_rate']:.1%} of texts (target accuracy {target:.4f})")
+    print()
+
+    spec = format_cascade_spec(args.name or args.slow, args.fast, args.slow, band['low'], band['high'])
+    if not band['met']:
+        print(f"❌ No band reaches {target:.4f}; the most accurate band is shown above")
+        print(f"   CASCADES={spec}")
+        sys.exit(1)
+
+    print("✅ Add to backend/.env (join several cascades with ';'):")
+    print(f"   CASCADES={spec}")
+
+
+if __name__ == "__main__":
+    main()
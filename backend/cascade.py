@@ -0,0 +1,186 @@
+"""
+Model Cascade
+Serves a public model name with a fast model first and escalates to a slower,
+more accurate model only when the fast model's deceptive probability falls
+inside a configured uncertainty band. Bands are picked offline with
+calibrate_cascade.py.
+"""
+
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from config import AVAILABLE_MODELS, LABEL_MAPPING, CASCADE_SPEC
+from ai_utils import hf_pretrained_classify
+from text_encoding import TextEncoding
+from text_scoring import check_text_length
+from ensemble import TokenLimitError
+
+
+class Cascade:
+    """A fast model backed by a slow model for uncertain inputs."""
+
+    def __init__(self, name: str, fast_model: str, slow_model: str, low: float, high: float):
+        """
+        Initialize the cascade.
+
+        Args:
+            name: Public model name served by the cascade
+            fast_model: Model that scores every request
+            slow_model: Model that scores requests the fast model is unsure about
+            low: Escalate when the fast deceptive probability is above low...
+            high: ...and below high
+        """
+        self.name = name
+        self.fast_model = fast_model
+        self.slow_model = slow_model
+        self.low = low
+        self.high = high
+
+    def escalates(self, deceptive_score: float) -> bool:
+        """Whether a fast-model deceptive probability falls inside the uncertainty band."""
+        return self.low < deceptive_score < self.high
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Describe the cascade for responses and stats."""
+        return {'fast_model': self.fast_model, 'slow_model': self.slow_model, 'band': [self.low, self.high]}
+
+
+def format_cascade_spec(name: str, fast_model: str, slow_model: str, low: float, high: float) -> str:
+    """Format one CASCADES entry (the inverse of parse_cascades)."""
+    return f"{name}={fast_model}>{slow_model}@{low:.4f}:{high:.4f}"
+
+
+def parse_cascades(spec: str, available_models=AVAILABLE_MODELS) -> Dict[str, Cascade]:
+    """
+    Parse the CASCADES setting.
+
+    Args:
+        spec: Semicolon-separated entries of the form "name=fast_model>slow_model@low:high"
+        available_models: Models the stages must come from
+
+    Returns:
+        Dict[str, Cascade]: Cascades by public name (invalid entries are skipped with a warning)
+    """
+    cascades = {}
+    for entry in (e.strip() for e in spec.split(';')):
+        if not entry:
+            continue
+        try:
+            name, rest = entry.split('=', 1)
+            models, band = rest.split('@', 1)
+            fast_model, slow_model = models.split('>', 1)
+            low, high = (float(v) for v in band.split(':', 1))
+            name, fast_model, slow_model = name.strip(), fast_model.strip(), slow_model.strip()
+        except ValueError:
+            print(f"⚠️ Ignoring malformed cascade '{entry}' (expected name=fast>slow@low:high)")
+            continue
+
+        missing = [m for m in (fast_model, slow_model) if m not in available_models]
+        if missing:
+            print(f"⚠️ Ignoring cascade '{name}': unknown model(s) {', '.join(missing)}")
+            continue
+        if not 0.0 <= low <= high <= 1.0:
+            print(f"⚠️ Ignoring cascade '{name}': band must satisfy 0 <= low <= high <= 1")
+            continue
+        cascades[name] = Cascade(name, fast_model, slow_model, low, high)
+    return cascades
+
+
+CASCADES = parse_cascades(CASCADE_SPEC)
+
+# Requests and escalations per cascade
+_stats = {name: {'requests': 0, 'escalated': 0} for name in CASCADES}
+_stats_lock = threading.Lock()
+
+
+def is_cascade(model_key: str) -> bool:
+    """Whether a public model name is served by a cascade."""
+    return model_key in CASCADES
+
+
+def get_entry_model(model_key: str) -> str:
+    """The model that sees a request first (the fast stage for cascades, else the model itself)."""
+    cascade = CASCADES.get(model_key)
+    return cascade.fast_model if cascade is not None else model_key
+
+
+def get_public_models() -> Dict[str, Any]:
+    """Model names accepted by the prediction endpoints: every model plus every cascade."""
+    return {**AVAILABLE_MODELS, **CASCADES}
+
+
+def get_cascade_stats() -> Dict[str, Any]:
+    """Get the configuration and escalation rate of every cascade."""
+    with _stats_lock:
+        stats = {name: dict(counts) for name, counts in _stats.items()}
+    for name, counts in stats.items():
+        counts['escalation_rate'] = counts['escalated'] / counts['requests'] if counts['requests'] else 0.0
+        counts.update(CASCADES[name].to_dict())
+    return stats
+
+
+def _deceptive_score(prediction: Dict[str, Any]) -> float:
+    """Deceptive probability of a binary hf_pretrained_classify result."""
+    return prediction['score'] if prediction['label'] == 'deceptive' else 1.0 - prediction['score']
+
+
+def score_cascade(name: str, text: str, encoding: Optional[TextEncoding] = None,
+                  label_mapping=LABEL_MAPPING) -> Dict[str, Any]:
+    """
+    Score a text with a cascade.
+
+    Args:
+        name: Public name of the cascade
+        text: Validated text (already within the fast model's token limit)
+        encoding: TextEncoding of the text for the fast model (skips re-tokenization)
+        label_mapping: Mapping from model labels to response labels
+
+    Returns:
+        Dict: 'prediction', 'confidence', 'model_used' (the deciding model) and
+            'cascade' ('stage' that decided - fast or slow - plus the fast
+            model's confidence and deceptive score, the models and the band)
+
+    Raises:
+        TokenLimitError: If the text escalates but exceeds the slow model's token limit
+    """
+    start_time = time.time()
+    cascade = CASCADES[name]
+
+    input_ids = encoding.input_ids if encoding is not None and encoding.model_key == cascade.fast_model else None
+    fast = hf_pretrained_classify(cascade.fast_model, text, label_mapping, input_ids=input_ids)[0]
+    fast_deceptive = _deceptive_score(fast)
+
+    details = {
+        'stage': 'fast',
+        'fast_prediction': fast['label'],
+        'fast_confidence': fast['score'],
+        'fast_deceptive_score': fast_deceptive,
+        **cascade.to_dict(),
+    }
+    decision, model_used = fast, cascade.fast_model
+
+    escalated = cascade.escalates(fast_deceptive)
+    with _stats_lock:
+        _stats[name]['requests'] += 1
+        _stats[name]['escalated'] += int(escalated)
+
+    if escalated:
+        is_valid, _, error_msg, slow_encoding = check_text_length(text, cascade.slow_model)
+        if not is_valid:
+            raise TokenLimitError(error_msg)
+        slow_ids = slow_encoding.input_ids if slow_encoding is not None else None
+        decision = hf_pretrained_classify(cascade.slow_model, text, label_mapping, input_ids=slow_ids)[0]
+        model_used = cascade.slow_model
+        details['stage'] = 'slow'
+
+    end_time = time.time()
+    print(f"🪜 Cascade {name} decided at the {details['stage']} stage in {end_time - start_time:.3f}s - "
+          f"Fast: {fast['label']} ({fast['score']:.3f}), Result: {decision['label']} ({decision['score']:.3f})")
+
+    return {
+        'prediction': decision['label'],
+        'confidence': decision['score'],
+        'model_used': model_used,
+        'cascade': details,
+    }
@@ -25,6 +25,12 @@ class CleanupService:
         # Also schedule a daily cleanup at 2 AM
         schedule.every().day.at("02:00").do(self._run_cleanup)
         
+        # Release custom models that have not been used recently
+        schedule.every(5).minutes.do(self._run_idle_eviction)
+        
+        # Drop async job results past their TTL
+        schedule.every(5).minutes.do(self._run_job_cleanup)
+        
         # Start the scheduler thread
         self.thread = threading.Thread(target=self._scheduler_loop, daemon=True)
         self.thread.start()
@@ -49,6 +55,26 @@ class CleanupService:
         except Exception as e:
             print(f"❌ Cleanup service error: {str(e)}")
     
+    def _run_idle_eviction(self):
+        """Evict idle custom models from the in-memory model cache."""
+        try:
+            from ai_utils import evict_idle_models
+            evicted = evict_idle_models()
+            if evicted > 0:
+                print(f"🧹 Evicted {evicted} idle models from memory")
+        except Exception as e:
+            print(f"❌ Idle model eviction error: {str(e)}")
+    
+    def _run_job_cleanup(self):
+        """Drop expired async job results."""
+        try:
+            from jobs import job_manager
+            removed = job_manager.cleanup_expired()
+            if removed > 0:
+                print(f"🧹 Removed {removed} expired job results")
+        except Exception as e:
+            print(f"❌ Job cleanup error: {str(e)}")
+    
     def _scheduler_loop(self):
         """Main scheduler loop."""
         while self.running:
@@ -1,20 +1,27 @@
-import torch
 from pathlib import Path
-from gpu_utils import get_torch_device
 import os
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Get optimal device using gpu_utils
-DEVICE = get_torch_device()
+
+def __getattr__(name):
+    """Resolve DEVICE on first access so importing config does not import torch."""
+    if name == 'DEVICE':
+        from gpu_utils import get_torch_device
+        globals()['DEVICE'] = get_torch_device()
+        return globals()['DEVICE']
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 LABEL_MAPPING = {'0': 'deceptive', '1': 'truthful'}
 CLASS_NAMES = ['deceptive', 'truthful']
 
 MODELS_DIR = Path(__file__).parent / 'models'
 BASE_MODELS_DIR = Path(__file__).parent / 'base_models'
+CUSTOM_MODELS_DIR = Path(__file__).parent / 'custom_models'
+CACHE_DIR = Path(os.environ.get('CACHE_DIR', Path(__file__).parent / 'cache'))
 
 # Default pretrained model list (used when models.txt isn't available)
 DEFAULT_MODEL_LIST = [
@@ -90,6 +97,139 @@ RATE_LIMIT_ANALYSIS = 60  # Text analysis endpoint
 RATE_LIMIT_TRAINING = 60   # Model training endpoint
 RATE_LIMIT_DEFAULT = 120   # Other endpoints
 
+# Batch scoring endpoints (rate limited per text, in a separate bucket)
+MAX_BATCH_TEXTS = int(os.environ.get('MAX_BATCH_TEXTS', 100))                 # Texts per batch request
+RATE_LIMIT_BATCH_TEXTS = int(os.environ.get('RATE_LIMIT_BATCH_TEXTS', 2000))  # Texts per minute
+MAX_BATCH_EXPLAINED_TEXTS = int(os.environ.get('MAX_BATCH_EXPLAINED_TEXTS', 5))  # Texts per batch with include_explanations
+
+# Streaming bulk scoring (/api/public/score/stream); texts are charged to the batch rate limit
+STREAM_BATCH_SIZE = int(os.environ.get('STREAM_BATCH_SIZE', 64))                # Records scored per streamed chunk
+STREAM_MAX_LINE_BYTES = int(os.environ.get('STREAM_MAX_LINE_BYTES', 65536))     # Longest accepted NDJSON line
+STREAM_MAX_RECORDS = int(os.environ.get('STREAM_MAX_RECORDS', 100000))        # Records per stream before it is stopped
+
+# Async jobs (checkDeception with params.async)
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))                # Jobs run concurrently
+JOB_MAX_PENDING = int(os.environ.get('JOB_MAX_PENDING', 100))      # Queued + running jobs before 503
+JOB_RESULT_TTL = int(os.environ.get('JOB_RESULT_TTL', 3600))       # Seconds results stay available
+JOB_MAX_WAIT = float(os.environ.get('JOB_MAX_WAIT', 30))           # Longest long-poll wait per request
+
+# Dynamic micro-batching of concurrent single-text predictions
+BATCHING_ENABLED = os.environ.get('BATCHING_ENABLED', 'True').lower() not in ('false', '0', 'no')
+BATCH_MAX_SIZE = int(os.environ.get('BATCH_MAX_SIZE', 16))          # Texts per forward pass
+BATCH_MAX_WAIT_MS = float(os.environ.get('BATCH_MAX_WAIT_MS', 5))   # Max time to wait for a batch to fill
+
+# Loaded model cache (pretrained models are pinned; custom models are evicted LRU / when idle)
+MODEL_CACHE_MAX_MB = int(os.environ.get('MODEL_CACHE_MAX_MB', 4096))            # Parameter-byte budget, 0 = unlimited
+MODEL_CACHE_IDLE_TTL = int(os.environ.get('MODEL_CACHE_IDLE_TTL', 1800))        # Seconds before an idle custom model is evicted
+MODEL_LOAD_FAILURE_TTL = float(os.environ.get('MODEL_LOAD_FAILURE_TTL', 10))     # Seconds a failed load is re-raised to new requests
+
+# Startup warm-up (runs in the background; /api/health?ready=1 returns 503 until it finishes)
+# WARMUP_MODELS: comma-separated model keys, 'all' for every pretrained model, empty (default) to disable
+WARMUP_MODELS = [m.strip() for m in os.environ.get('WARMUP_MODELS', '').split(',') if m.strip()]
+WARMUP_WORKERS = int(os.environ.get('WARMUP_WORKERS', 2))                                  # Models warmed concurrently
+WARMUP_SEQUENCE_LENGTHS = [int(n) for n in os.environ.get('WARMUP_SEQUENCE_LENGTHS', '64,256').split(',') if n.strip()]
+WARMUP_EXPLAINERS = os.environ.get('WARMUP_EXPLAINERS', 'False').lower() not in ('false', '0', 'no')
+HEALTH_REQUIRE_READY = os.environ.get('HEALTH_REQUIRE_READY', 'False').lower() not in ('false', '0', 'no')  # 503 until warm
+
+# Long-document mode ("long_text": true): overlapping token windows scored in one batched pass
+LONG_TEXT_MAX_CHARS = int(os.environ.get('LONG_TEXT_MAX_CHARS', 100000))        # Character limit in long-text mode
+LONG_TEXT_WINDOW_TOKENS = int(os.environ.get('LONG_TEXT_WINDOW_TOKENS', 512))   # Tokens per window (incl. special tokens)
+LONG_TEXT_STRIDE = int(os.environ.get('LONG_TEXT_STRIDE', 128))                 # Tokens shared by consecutive windows
+LONG_TEXT_MAX_WINDOWS = int(os.environ.get('LONG_TEXT_MAX_WINDOWS', 64))        # Windows per text before rejecting
+LONG_TEXT_AGGREGATION = os.environ.get('LONG_TEXT_AGGREGATION', 'mean')         # mean | max_deceptive | length_weighted
+
+# Ensemble endpoint: same-architecture models can run as one stacked, vmapped module (off by default).
+# Stacking copies every member's weights; the copies count against MODEL_CACHE_MAX_MB (groups that do
+# not fit run model by model), are kept for the last ENSEMBLE_STACK_CACHE_SIZE model groups and are
+# released when one of their models is evicted from the model cache
+ENSEMBLE_VMAP = os.environ.get('ENSEMBLE_VMAP', 'False').lower() not in ('false', '0', 'no')
+ENSEMBLE_STACK_CACHE_SIZE = int(os.environ.get('ENSEMBLE_STACK_CACHE_SIZE', 2))
+
+# Confidence-gated cascades: a public model name answered by a fast model, escalating to a slower
+# model only when the fast deceptive probability falls inside (low, high). Pick bands with calibrate_cascade.py.
+# Semicolon-separated "name=fast_model>slow_model@low:high"; a name may shadow one of the models
+CASCADE_SPEC = os.environ.get('CASCADES', '')
+
+# LIME explanations: 'native' (vectorized engine in lime_engine.py, scores perturbed token IDs directly)
+# or 'lime' (the lime package's LimeTextExplainer); native falls back to lime for tokenizers without offsets
+LIME_ENGINE = os.environ.get('LIME_ENGINE', 'native').lower()
+LIME_NUM_SAMPLES = int(os.environ.get('LIME_NUM_SAMPLES', 500))       # Perturbations per explanation
+LIME_KERNEL_WIDTH = float(os.environ.get('LIME_KERNEL_WIDTH', 25))     # LimeTextExplainer default
+# Adaptive sample budget (native engine): draw rounds until the top-k ranking and weights are stable
+LIME_ADAPTIVE = os.environ.get('LIME_ADAPTIVE', 'True').lower() not in ('false', '0', 'no')
+LIME_MIN_SAMPLES = int(os.environ.get('LIME_MIN_SAMPLES', 100))       # Samples before convergence is checked
+LIME_ROUND_SAMPLES = int(os.environ.get('LIME_ROUND_SAMPLES', 100))   # Samples added per round
+LIME_MAX_SAMPLES = int(os.environ.get('LIME_MAX_SAMPLES', 2000))      # Adaptive budget (and per-request limit)
+LIME_TOLERANCE = float(os.environ.get('LIME_TOLERANCE', 0.05))        # Max relative top-k weight change
+
+# Cold-import budget for `import app`, checked by import_time_report.py (seconds)
+IMPORT_TIME_BUDGET = float(os.environ.get('IMPORT_TIME_BUDGET', 15))
+
+# Inference batching for multi-text calls
+INFERENCE_BATCH_SIZE = int(os.environ.get('INFERENCE_BATCH_SIZE', 32))
+
+# Forward-pass batch size for explainer scoring (LIME perturbations, SHAP maskings);
+# EXPLAINER_BATCH_SIZES overrides it per model: comma-separated "model_key=size"
+EXPLAINER_BATCH_SIZE = int(os.environ.get('EXPLAINER_BATCH_SIZE', 64))
+EXPLAINER_BATCH_SIZES = {
+    key.strip(): int(value)
+    for key, value in (entry.split('=', 1) for entry in os.environ.get('EXPLAINER_BATCH_SIZES', '').split(',') if '=' in entry)
+}
+
+# SHAP evaluation budget: masked inputs scored per explanation (shap's default is 500);
+# SHAP_MAX_EVALS_BY_MODEL overrides it per model: comma-separated "model_key=evals"
+SHAP_MAX_EVALS = int(os.environ.get('SHAP_MAX_EVALS', 500))
+SHAP_MAX_EVALS_BY_MODEL = {
+    key.strip(): int(value)
+    for key, value in (entry.split('=', 1) for entry in os.environ.get('SHAP_MAX_EVALS_BY_MODEL', '').split(',') if '=' in entry)
+}
+SHAP_MAX_EVALS_LIMIT = int(os.environ.get('SHAP_MAX_EVALS_LIMIT', 5000))        # Per-request max_evals ceiling
+SHAP_MAX_BATCH_SIZE = int(os.environ.get('SHAP_MAX_BATCH_SIZE', 512))           # Per-request batch_size ceiling
+# Partition trees cached per text; texts over SHAP_COARSE_TOKENS tokens get a balanced tree whose
+# groups of at least SHAP_COARSE_GROUP_TOKENS tokens (whole words) are never split (0 = off)
+SHAP_TREE_CACHE_SIZE = int(os.environ.get('SHAP_TREE_CACHE_SIZE', 256))
+SHAP_COARSE_TOKENS = int(os.environ.get('SHAP_COARSE_TOKENS', 256))
+SHAP_COARSE_GROUP_TOKENS = int(os.environ.get('SHAP_COARSE_GROUP_TOKENS', 8))
+
+# Inference backend: 'auto' (ONNX Runtime on CPU when an export exists), 'onnx' (export on first load) or 'torch'
+INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'auto').lower()
+
+# Multi-process inference workers on CPU nodes (0 = run forward passes in the web process)
+INFERENCE_WORKERS = int(os.environ.get('INFERENCE_WORKERS', 0))
+INFERENCE_WORKER_THREADS = int(os.environ.get('INFERENCE_WORKER_THREADS', 0))             # Torch threads per worker, 0 = cores / workers
+INFERENCE_SHM_THRESHOLD_BYTES = int(os.environ.get('INFERENCE_SHM_THRESHOLD_BYTES', 65536))  # Larger inputs go through shared memory
+INFERENCE_WORKER_TIMEOUT = float(os.environ.get('INFERENCE_WORKER_TIMEOUT', 120))         # Silence (with pending work) before restart
+INFERENCE_HEALTH_INTERVAL = float(os.environ.get('INFERENCE_HEALTH_INTERVAL', 10))        # Seconds between health pings
+INFERENCE_LOAD_TIMEOUT = float(os.environ.get('INFERENCE_LOAD_TIMEOUT', 1800))         # Silence while loading a model before restart
+
+# Load local fp32 weights on CPU from memory-mapped safetensors (models with only pytorch_model.bin
+# load the regular way until converted by the trainer or manage_serving_models.py convert-safetensors)
+# so every process on the host shares one copy through the page cache
+MMAP_WEIGHTS = os.environ.get('MMAP_WEIGHTS', 'True').lower() not in ('false', '0', 'no')
+
+# Models served from their dynamically quantized int8 variant on CPU
+# (comma-separated model keys, 'custom' for all custom models, 'all' for every model)
+QUANTIZED_MODELS = [m.strip() for m in os.environ.get('QUANTIZED_MODELS', '').split(',') if m.strip()]
+
+# Early-exit inference for BERT/RoBERTa models with trained exit heads (manage_serving_models.py early-exit):
+# comma-separated "model_key=threshold" ('custom' for all custom models, 'all' for every model)
+EARLY_EXIT_THRESHOLDS = {
+    key.strip(): float(value)
+    for key, value in (entry.split('=', 1) for entry in os.environ.get('EARLY_EXIT_THRESHOLDS', '').split(',') if '=' in entry)
+}
+
+# Prediction result cache (in-process LRU + SQLite file in CACHE_DIR shared by workers on the host)
+PREDICTION_CACHE_ENABLED = os.environ.get('PREDICTION_CACHE_ENABLED', 'True').lower() not in ('false', '0', 'no')
+PREDICTION_CACHE_MEMORY_ENTRIES = int(os.environ.get('PREDICTION_CACHE_MEMORY_ENTRIES', 10000))
+PREDICTION_CACHE_MAX_DISK_ENTRIES = int(os.environ.get('PREDICTION_CACHE_MAX_DISK_ENTRIES', 500000))
+
+# LIME/SHAP explanation cache (same SQLite file); LIME uses EXPLANATION_SEED unless a seed is given
+# so its explanations are deterministic and cacheable
+EXPLANATION_CACHE_ENABLED = os.environ.get('EXPLANATION_CACHE_ENABLED', 'True').lower() not in ('false', '0', 'no')
+EXPLANATION_CACHE_MEMORY_ENTRIES = int(os.environ.get('EXPLANATION_CACHE_MEMORY_ENTRIES', 1000))
+EXPLANATION_CACHE_MAX_DISK_ENTRIES = int(os.environ.get('EXPLANATION_CACHE_MAX_DISK_ENTRIES', 100000))
+EXPLANATION_SEED = int(os.environ.get('EXPLANATION_SEED', 42))
+
 # JWT / Public API settings (override with env vars — REQUIRED in production)
 _DEFAULT_JWT_SECRET = 'dev_jwt_secret_change_me'
 JWT_SECRET = os.environ.get('JWT_SECRET', _DEFAULT_JWT_SECRET)
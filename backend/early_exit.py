@@ -0,0 +1,462 @@
+"""
+Early-Exit Inference
+Lightweight classifier heads after intermediate encoder layers of BERT-family
+models. At inference every row of a batch stops at the first head whose
+confidence reaches the model's threshold, so confidently classified texts skip
+the remaining layers. Heads are trained on a frozen model (after fine-tuning or
+as a post-training step) and saved next to the model with a per-threshold
+accuracy/latency report.
+"""
+
+import os
+import json
+import time
+import threading
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import torch
+
+from config import EARLY_EXIT_THRESHOLDS
+from model_utils import is_artifact_current
+
+EARLY_EXIT_SUBDIR = 'early_exit'
+HEADS_FILENAME = 'heads.pt'
+REPORT_FILENAME = 'report.json'
+
+SUPPORTED_MODEL_TYPES = ('bert', 'roberta')
+DEFAULT_THRESHOLDS = (0.8, 0.85, 0.9, 0.95, 0.97, 0.99)
+
+
+def get_early_exit_threshold(model_key: str) -> Optional[float]:
+    """
+    Get the exit threshold configured for a model (EARLY_EXIT_THRESHOLDS).
+
+    Args:
+        model_key: Model key (e.g. 'bert-covid-1' or 'custom_<code>')
+
+    Returns:
+        Optional[float]: Threshold, or None if early exit is off for the model
+    """
+    if model_key in EARLY_EXIT_THRESHOLDS:
+        return EARLY_EXIT_THRESHOLDS[model_key]
+    if model_key.startswith('custom_') and 'custom' in EARLY_EXIT_THRESHOLDS:
+        return EARLY_EXIT_THRESHOLDS['custom']
+    return EARLY_EXIT_THRESHOLDS.get('all')
+
+
+def get_heads_path(model_path: str) -> Path:
+    """Get the path of the exit heads for a local model directory."""
+    return Path(model_path) / EARLY_EXIT_SUBDIR / HEADS_FILENAME
+
+
+def get_report_path(model_path: str) -> Path:
+    """Get the path of the per-threshold report for a local model directory."""
+    return Path(model_path) / EARLY_EXIT_SUBDIR / REPORT_FILENAME
+
+
+def is_early_exit_enabled(model_key: str, model_path: str) -> bool:
+    """Check whether a model has a threshold configured and current exit heads."""
+    return get_early_exit_threshold(model_key) is not None and is_artifact_current(get_heads_path(model_path), model_path)
+
+
+def load_report(model_path: str) -> Optional[Dict[str, Any]]:
+    """Load the saved early-exit report of a model (None if there is none)."""
+    report_path = get_report_path(model_path)
+    if not report_path.exists():
+        return None
+    with open(report_path, 'r') as f:
+        return json.load(f)
+
+
+class ExitHead(torch.nn.Module):
+    """Pooler-style classifier on the first token's hidden state."""
+
+    def __init__(self, hidden_size: int, num_labels: int, dropout: float = 0.1):
+        super().__init__()
+        self.dense = torch.nn.Linear(hidden_size, hidden_size)
+        self.dropout = torch.nn.Dropout(dropout)
+        self.out = torch.nn.Linear(hidden_size, num_labels)
+
+    def forward(self, first_token: torch.Tensor) -> torch.Tensor:
+        return self.out(self.dropout(torch.tanh(self.dense(first_token))))
+
+
+class EarlyExitHeads(torch.nn.Module):
+    """One exit head per intermediate layer."""
+
+    def __init__(self, layers: Sequence[int], hidden_size: int, num_labels: int):
+        """
+        Create untrained heads.
+
+        Args:
+            layers: Encoder layers (1-based) followed by a head
+            hidden_size: Hidden size of the encoder
+            num_labels: Number of classes
+        """
+        super().__init__()
+        self.layers = sorted(layers)
+        self.hidden_size = hidden_size
+        self.num_labels = num_labels
+        self.heads = torch.nn.ModuleDict({str(layer): ExitHead(hidden_size, num_labels) for layer in self.layers})
+
+    def head(self, layer: int) -> ExitHead:
+        """The head after an encoder layer."""
+        return self.heads[str(layer)]
+
+    def save(self, path: Path, model_type: str) -> None:
+        """Write the heads atomically."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.pt.tmp')
+        torch.save({
+            'model_type': model_type,
+            'layers': self.layers,
+            'hidden_size': self.hidden_size,
+            'num_labels': self.num_labels,
+            'state_dict': self.state_dict(),
+        }, tmp_path)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> 'EarlyExitHeads':
+        """Load heads written by save()."""
+        saved = torch.load(path, map_location='cpu', weights_only=True)
+        heads = cls(saved['layers'], saved['hidden_size'], saved['num_labels'])
+        heads.load_state_dict(saved['state_dict'])
+        heads.eval()
+        return heads
+
+
+def default_exit_layers(num_layers: int) -> List[int]:
+    """Heads after every second layer, excluding the last (e.g. 2, 4, ..., 10 for 12 layers)."""
+    return list(range(2, num_layers, 2))
+
+
+def _backbone(model):
+    """Get the encoder of a sequence-classification model and its final classifier."""
+    model_type = model.config.model_type
+    if model_type == 'bert':
+        base = model.bert
+        return base, lambda hidden: model.classifier(model.dropout(base.pooler(hidden)))
+    if model_type == 'roberta':
+        return model.roberta, lambda hidden: model.classifier(hidden)
+    raise ValueError(f"Early exit supports {', '.join(SUPPORTED_MODEL_TYPES)} models, not {model_type}")
+
+
+def _additive_attention_mask(attention_mask: torch.Tensor, dtype: torch.dtype) -> torch.Tensor:
+    """
+    Broadcastable additive mask for calling encoder layers directly (0 to attend,
+    dtype minimum for padding). Built here because transformers 5 dropped
+    get_extended_attention_mask from the models.
+    """
+    mask = attention_mask[:, None, None, :].to(dtype)
+    return (1.0 - mask) * torch.finfo(dtype).min
+
+
+def early_exit_forward(model, heads: EarlyExitHeads, batch: Dict[str, torch.Tensor],
+                       threshold: float) -> Tuple[torch.Tensor, List[int]]:
+    """
+    Run the encoder layer by layer, retiring each row at its first confident head.
+
+    Args:
+        model: BERT or RoBERTa sequence-classification model
+        heads: Exit heads on the model's device
+        batch: Padded tokenizer output on the model's device
+        threshold: Top-class probability a head needs for a row to exit
+
+    Returns:
+        tuple: (logits per row, encoder layers run per row)
+    """
+    base, final_classifier = _backbone(model)
+    encoder_layers = base.encoder.layer
+    input_ids = batch['input_ids']
+    rows = input_ids.shape[0]
+
+    hidden = base.embeddings(input_ids=input_ids, token_type_ids=batch.get('token_type_ids'))
+    attention_mask = batch.get('attention_mask')
+    if attention_mask is None:
+        attention_mask = torch.ones_like(input_ids)
+    extended_mask = _additive_attention_mask(attention_mask, hidden.dtype)
+
+    logits = torch.empty(rows, heads.num_labels, device=input_ids.device)
+    exits = [len(encoder_layers)] * rows
+    active = torch.arange(rows, device=input_ids.device)
+
+    for layer_number, layer in enumerate(encoder_layers, start=1):
+        output = layer(hidden, attention_mask=extended_mask)
+        hidden = output[0] if isinstance(output, tuple) else output
+        if layer_number == len(encoder_layers) or layer_number not in heads.layers:
+            continue
+
+        head_logits = heads.head(layer_number)(hidden[:, 0].float())
+        confident = torch.softmax(head_logits, dim=-1).max(dim=-1).values >= threshold
+        if not confident.any():
+            continue
+        logits[active[confident]] = head_logits[confident]
+        for row in active[confident].tolist():
+            exits[row] = layer_number
+        remaining = ~confident
+        if not remaining.any():
+            return logits, exits
+        active, hidden, extended_mask = active[remaining], hidden[remaining], extended_mask[remaining]
+
+    logits[active] = final_classifier(hidden).float()
+    return logits, exits
+
+
+class EarlyExitRunner:
+    """Serves a model's forward pass with early exit and counts where rows exit."""
+
+    def __init__(self, model_key: str, model, heads: EarlyExitHeads, threshold: float):
+        self.model_key = model_key
+        self.model = model
+        self.heads = heads.to(model.device)
+        self.threshold = threshold
+        self.num_layers = len(_backbone(model)[0].encoder.layer)
+        self._exits = Counter()
+        self._lock = threading.Lock()
+
+    def logits(self, batch: Dict[str, torch.Tensor]) -> np.ndarray:
+        """Early-exit logits for a padded batch on the model's device."""
+        with torch.inference_mode():
+            logits, exits = early_exit_forward(self.model, self.heads, batch, self.threshold)
+        with self._lock:
+            self._exits.update(exits)
+        return logits.cpu().numpy()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Threshold, exit layers and the share of rows that exited at each layer."""
+        with self._lock:
+            exits = dict(self._exits)
+        total = sum(exits.values())
+        return {
+            'threshold': self.threshold,
+            'exit_layers': self.heads.layers,
+            'num_layers': self.num_layers,
+            'rows': total,
+            'avg_layers': sum(layer * count for layer, count in exits.items()) / total if total else None,
+            'exit_rates': {str(layer): count / total for layer, count in sorted(exits.items())},
+        }
+
+
+def load_early_exit(model_key: str, model_path: str, model) -> Optional[EarlyExitRunner]:
+    """
+    Build the early-exit runner of a served model.
+
+    Args:
+        model_key: The key the model is served under
+        model_path: Local model directory
+        model: The loaded PyTorch model
+
+    Returns:
+        Optional[EarlyExitRunner]: None if early exit is off, the heads are missing
+            or stale, or the architecture is not supported
+    """
+    if not is_early_exit_enabled(model_key, model_path):
+        return None
+    if model.config.model_type not in SUPPORTED_MODEL_TYPES:
+        print(f"⚠️ Early exit is not supported for {model_key} ({model.config.model_type})")
+        return None
+
+    try:
+        heads = EarlyExitHeads.load(get_heads_path(model_path))
+    except Exception as e:
+        print(f"⚠️ Could not load early-exit heads for {model_key}: {str(e)}")
+        return None
+
+    threshold = get_early_exit_threshold(model_key)
+    print(f"🚪 Early exit enabled for {model_key} - threshold {threshold}, heads after layers {heads.layers}")
+    return EarlyExitRunner(model_key, model, heads, threshold)
+
+
+def extract_features(model, tokenizer, texts: List[str], layers: Sequence[int],
+                     batch_size: int = 32) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Run the full model once and keep the first-token state after each exit layer.
+
+    Returns:
+        tuple: (features of shape (texts, layers, hidden), final logits of shape (texts, labels))
+    """
+    features, final_logits = [], []
+    for start in range(0, len(texts), batch_size):
+        batch = tokenizer(texts[start:start + batch_size], padding=True, truncation=True, return_tensors='pt')
+        batch = {name: tensor.to(model.device) for name, tensor in batch.items()}
+        with torch.no_grad():
+            output = model(**batch, output_hidden_states=True)
+        # hidden_states[0] is the embedding output, hidden_states[k] follows layer k
+        features.append(torch.stack([output.hidden_states[layer][:, 0] for layer in layers], dim=1).float().cpu().numpy())
+        final_logits.append(output.logits.float().cpu().numpy())
+    return np.concatenate(features), np.concatenate(final_logits)
+
+
+def fit_heads(features: np.ndarray, labels: np.ndarray, layers: Sequence[int], num_labels: int,
+              epochs: int = 20, learning_rate: float = 1e-3, batch_size: int = 64, seed: int = 42) -> EarlyExitHeads:
+    """
+    Train the exit heads on cached features (the encoder stays frozen).
+
+    Args:
+        features: First-token states per text and exit layer
+        labels: Class ID per text
+        layers: Exit layers, in the order of the features' second axis
+        num_labels: Number of classes
+
+    Returns:
+        EarlyExitHeads: Trained heads in eval mode on the CPU
+    """
+    torch.manual_seed(seed)
+    heads = EarlyExitHeads(layers, features.shape[2], num_labels)
+    optimizer = torch.optim.AdamW(heads.parameters(), lr=learning_rate, weight_decay=0.01)
+    inputs = torch.from_numpy(features)
+    targets = torch.as_tensor(labels, dtype=torch.long)
+
+    heads.train()
+    for _ in range(epochs):
+        for batch_index in torch.randperm(len(targets)).split(batch_size):
+            optimizer.zero_grad()
+            loss = sum(torch.nn.functional.cross_entropy(heads.head(layer)(inputs[batch_index, k]), targets[batch_index])
+                       for k, layer in enumerate(heads.layers))
+            loss.backward()
+            optimizer.step()
+    heads.eval()
+    return heads
+
+
+def _measure_ms_per_text(model, tokenizer, texts: List[str], heads: Optional[EarlyExitHeads] = None,
+                         threshold: float = 1.0) -> Optional[float]:
+    """Single-text latency of the full model (heads=None) or of early exit."""
+    if not texts:
+        return None
+    start_time = time.time()
+    for text in texts:
+        batch = tokenizer([text], truncation=True, return_tensors='pt')
+        batch = {name: tensor.to(model.device) for name, tensor in batch.items()}
+        with torch.no_grad():
+            if heads is None:
+                model(**batch)
+            else:
+                early_exit_forward(model, heads, batch, threshold)
+    return (time.time() - start_time) * 1000 / len(texts)
+
+
+def train_early_exit(model, tokenizer, model_path: str, train_texts: List[str], train_labels: List[int],
+                     eval_texts: Optional[List[str]] = None, eval_labels: Optional[List[int]] = None,
+                     layers: Optional[Sequence[int]] = None, thresholds: Sequence[float] = DEFAULT_THRESHOLDS,
+                     latency_samples: int = 64, max_drop: float = 0.005) -> Dict[str, Any]:
+    """
+    Train exit heads for a fine-tuned model and report the accuracy/latency trade-off.
+
+    Args:
+        model: Fine-tuned BERT or RoBERTa model (left unchanged)
+        tokenizer: Its tokenizer
+        model_path: Local model directory the heads and report are saved under
+        train_texts: Texts to train the heads on
+        train_labels: Class ID per training text
+        eval_texts: Held-out texts for the report (the training texts if None)
+        eval_labels: Class ID per held-out text
+        layers: Exit layers (default: every second layer)
+        thresholds: Thresholds to report
+        latency_samples: Held-out texts timed one by one per threshold
+        max_drop: Accuracy the recommended threshold may give up against the full model
+
+    Returns:
+        Dict: Report with the full model's accuracy and latency, one entry per
+            threshold (accuracy, average layers run, measured speedup, exit
+            rates per layer) and the recommended threshold
+    """
+    model_type = model.config.model_type
+    if model_type not in SUPPORTED_MODEL_TYPES:
+        raise ValueError(f"Early exit supports {', '.join(SUPPORTED_MODEL_TYPES)} models, not {model_type}")
+
+    was_training = model.training
+    model.eval()
+    start_time = time.time()
+    num_layers = model.config.num_hidden_layers
+    layers = sorted(layers or default_exit_layers(num_layers))
+    if not layers or layers[0] < 1 or layers[-1] >= num_layers:
+        raise ValueError(f"Exit layers must lie between 1 and {num_layers - 1}")
+
+    print(f"🚪 Training early-exit heads after layers {layers} on {len(train_texts)} texts...")
+    features, _ = extract_features(model, tokenizer, train_texts, layers)
+    heads = fit_heads(features, np.asarray(train_labels), layers, model.config.num_labels)
+
+    if not eval_texts:
+        eval_texts, eval_labels, eval_split = train_texts, train_labels, 'train'
+    else:
+        eval_split = 'validation'
+    eval_labels = np.asarray(eval_labels)
+    eval_features, final_logits = extract_features(model, tokenizer, eval_texts, layers)
+
+    with torch.no_grad():
+        inputs = torch.from_numpy(eval_features)
+        head_probs = torch.stack([torch.softmax(heads.head(layer)(inputs[:, k]), dim=-1)
+                                  for k, layer in enumerate(layers)], dim=1).numpy()
+    full_preds = final_logits.argmax(axis=1)
+    full_accuracy = float((full_preds == eval_labels).mean())
+
+    heads = heads.to(model.device)
+    timing_texts = list(eval_texts[:latency_samples])
+    full_ms = _measure_ms_per_text(model, tokenizer, timing_texts)
+
+    results = []
+    for threshold in thresholds:
+        confident = head_probs.max(axis=2) >= threshold
+        exited = confident.any(axis=1)
+        first = confident.argmax(axis=1)
+        preds = np.where(exited, head_probs[np.arange(len(first)), first].argmax(axis=1), full_preds)
+        layers_run = np.where(exited, np.asarray(layers)[first], num_layers)
+        ms = _measure_ms_per_text(model, tokenizer, timing_texts, heads, threshold)
+        accuracy = float((preds == eval_labels).mean())
+        results.append({
+            'threshold': float(threshold),
+            'accuracy': accuracy,
+            'accuracy_delta': accuracy - full_accuracy,
+            'avg_layers': float(layers_run.mean()),
+            'ms_per_text': ms,
+            'speedup': full_ms / ms if full_ms and ms else None,
+            'exit_rates': {str(layer): float((layers_run == layer).mean()) for layer in layers + [num_layers]},
+        })
+
+    acceptable = [r for r in results if r['accuracy_delta'] >= -max_drop]
+    recommended = max(acceptable, key=lambda r: (r['speedup'] or num_layers / r['avg_layers'])) if acceptable else None
+
+    report = {
+        'model_type': model_type,
+        'num_layers': num_layers,
+        'exit_layers': layers,
+        'rows': len(eval_texts),
+        'eval_split': eval_split,
+        'full': {'accuracy': full_accuracy, 'ms_per_text': full_ms},
+        'thresholds': results,
+        'max_drop': max_drop,
+        'recommended_threshold': recommended['threshold'] if recommended else None,
+        'created_at': datetime.now().isoformat(),
+    }
+
+    heads.cpu().save(get_heads_path(model_path), model_type)
+    with open(get_report_path(model_path), 'w') as f:
+        json.dump(report, f, indent=2)
+
+    if was_training:
+        model.train()
+    print(f"✅ Early-exit heads for {Path(model_path).name} written in {time.time() - start_time:.2f}s "
+          f"(recommended threshold: {report['recommended_threshold']})")
+    return report
+
+
+def format_report(report: Dict[str, Any]) -> List[str]:
+    """Format a report as table lines for the CLI."""
+    full = report['full']
+    full_ms = f"{full['ms_per_text']:.1f} ms" if full['ms_per_text'] else "n/a"
+    lines = [f"   Full model ({report['num_layers']} layers): accuracy {full['accuracy']:.4f}, {full_ms}/text "
+             f"({report['rows']} {report['eval_split']} rows, heads after layers {report['exit_layers']})",
+             f"   {'threshold':>9}  {'accuracy':>8}  {'Δ':>7}  {'layers':>6}  {'ms/text':>7}  {'speedup':>7}"]
+    for r in report['thresholds']:
+        ms = f"{r['ms_per_text']:.1f}" if r['ms_per_text'] else "n/a"
+        speedup = f"{r['speedup']:.2f}x" if r['speedup'] else "n/a"
+        marker = "  ◀ recommended" if r['threshold'] == report['recommended_threshold'] else ""
+        lines.append(f"   {r['threshold']:>9.2f}  {r['accuracy']:>8.4f}  {r['accuracy_delta']:>+7.4f}  "
+                     f"{r['avg_layers']:>6.2f}  {ms:>7}  {speedup:>7}{marker}")
+    return lines
@@ -0,0 +1,301 @@
+"""
+Model Ensemble
+Scores one text with several models in a single request. The text is
+tokenized once per tokenizer family, and models sharing an architecture run as
+one stacked, vectorized module (torch.func.stack_module_state + vmap) with a
+per-model fallback when vectorization is not possible.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import torch
+
+from config import LABEL_MAPPING, ENSEMBLE_VMAP, ENSEMBLE_STACK_CACHE_SIZE
+from ai_utils import (
+    get_loaded_model, get_model_fingerprint, add_eviction_listener,
+    cache_derived_entry, get_derived_entry, drop_derived_entry, get_model_cache_headroom
+)
+from model_registry import LoadedModel, softmax
+
+
+class TokenLimitError(ValueError):
+    """Raised when the text exceeds the token limit of an ensemble member."""
+
+
+# model_key -> (tokenizer id, family key); model_key -> (model id, architecture signature)
+_tokenizer_families = {}
+_architectures = {}
+
+# Stacked parameters are copies of the members' weights, so they live in the model cache (charged
+# to MODEL_CACHE_MAX_MB) under STACK_KEY_PREFIX keys and are dropped when a member is evicted.
+# Stack key -> member model keys, most recently built last
+STACK_KEY_PREFIX = 'ensemble-stack:'
+_stacks = OrderedDict()
+_stacks_lock = threading.Lock()
+
+# Architecture signatures for which vmap failed once (run per model from then on)
+_vmap_disabled = set()
+
+
+def get_tokenizer_family(model_key: str, tokenizer) -> str:
+    """
+    Get a key shared by every model whose tokenizer produces identical input IDs.
+
+    Args:
+        model_key: The key for the model
+        tokenizer: The model's tokenizer
+
+    Returns:
+        str: Tokenizer class plus a digest of its vocabulary and casing
+    """
+    cached = _tokenizer_families.get(model_key)
+    if cached is not None and cached[0] == id(tokenizer):
+        return cached[1]
+
+    digest = hashlib.sha1()
+    for token, token_id in sorted(tokenizer.get_vocab().items()):
+        digest.update(f"{token}\t{token_id}\n".encode('utf-8'))
+    family = f"{type(tokenizer).__name__}:{tokenizer.init_kwargs.get('do_lower_case')}:{digest.hexdigest()[:16]}"
+    _tokenizer_families[model_key] = (id(tokenizer), family)
+    return family
+
+
+def get_architecture_signature(loaded_model) -> Optional[Tuple]:
+    """
+    Get a signature shared by models that can be stacked into one vectorized module.
+
+    Args:
+        loaded_model: A served model
+
+    Returns:
+        Optional[Tuple]: Model type, device and parameter names/shapes/dtypes, or
+            None if the model does not run on fp32/fp16 PyTorch in this process
+    """
+    if not isinstance(loaded_model, LoadedModel) or loaded_model.backend != 'torch':
+        return None
+
+    model = loaded_model.model
+    cached = _architectures.get(loaded_model.model_key)
+    if cached is not None and cached[0] == id(model):
+        return cached[1]
+
+    signature = (
+        loaded_model.config.model_type,
+        str(model.device),
+        tuple((name, tuple(tensor.shape), str(tensor.dtype)) for name, tensor in model.state_dict().items()),
+    )
+    _architectures[loaded_model.model_key] = (id(model), signature)
+    return signature
+
+
+class StackedModels:
+    """Models with identical architecture evaluated in one vmapped forward pass."""
+
+    def __init__(self, models: List[torch.nn.Module]):
+        """
+        Stack the parameters and buffers of the models.
+
+        Args:
+            models: Modules with identical structure (see get_architecture_signature)
+        """
+        from torch.func import stack_module_state
+
+        self.params, self.buffers = stack_module_state(models)
+        # Structure only, built on the meta device so no weights are allocated;
+        # the stacked tensors are passed in at call time
+        with torch.device('meta'):
+            self.base = type(models[0])(models[0].config)
+        self.base.eval()
+        self.param_bytes = sum(t.numel() * t.element_size()
+                               for t in list(self.params.values()) + list(self.buffers.values()))
+
+    def logits(self, batch: Dict[str, torch.Tensor]) -> np.ndarray:
+        """
+        Run every stacked model on the same padded batch.
+
+        Returns:
+            np.ndarray: Logits of shape (models, texts, labels)
+        """
+        from torch.func import functional_call
+
+        def forward(params, buffers):
+            return functional_call(self.base, (params, buffers), (), batch).logits
+
+        with torch.no_grad():
+            return torch.vmap(forward)(self.params, self.buffers).float().cpu().numpy()
+
+
+def get_stack_key(loaded_models: List[LoadedModel]) -> str:
+    """Model cache key of the stacked weights of a group (members and their fingerprints)."""
+    members = '|'.join(f"{m.model_key}@{get_model_fingerprint(m.model_key)}" for m in loaded_models)
+    return STACK_KEY_PREFIX + hashlib.sha1(members.encode('utf-8')).hexdigest()[:16]
+
+
+def release_model(model_key: str) -> None:
+    """Drop the stacked weights and cached signatures involving an evicted model (or stack)."""
+    with _stacks_lock:
+        if model_key in _stacks:
+            # The stack itself left the model cache
+            del _stacks[model_key]
+            return
+        released = [key for key, members in _stacks.items() if model_key in members]
+
+    _tokenizer_families.pop(model_key, None)
+    _architectures.pop(model_key, None)
+    for key in released:
+        drop_derived_entry(key)
+    if released:
+        print(f"🧱 Released {len(released)} stacked ensemble groups containing {model_key}")
+
+
+add_eviction_listener(release_model)
+
+
+def _get_stacked(loaded_models: List[LoadedModel]) -> Optional[StackedModels]:
+    """
+    Get (or build) the stacked parameters of a group of models.
+
+    Returns:
+        Optional[StackedModels]: The stack, or None when its copy of the weights
+            does not fit in MODEL_CACHE_MAX_MB beside the pinned models and its members
+    """
+    key = get_stack_key(loaded_models)
+    stacked = get_derived_entry(key)
+    if stacked is not None:
+        with _stacks_lock:
+            if key in _stacks:
+                _stacks.move_to_end(key)
+        return stacked
+
+    member_keys = [m.model_key for m in loaded_models]
+    needed = sum(m.param_bytes for m in loaded_models)
+    headroom = get_model_cache_headroom(member_keys)
+    if headroom is not None and needed > headroom:
+        print(f"⚠️ Not stacking {', '.join(member_keys)}: {needed / 1024**2:.0f} MB of stacked weights "
+              f"exceed the {max(headroom, 0) / 1024**2:.0f} MB left in MODEL_CACHE_MAX_MB")
+        return None
+
+    start_time = time.time()
+    stacked = StackedModels([m.model for m in loaded_models])
+    print(f"🧱 Stacked {len(loaded_models)} models for vectorized ensemble in {time.time() - start_time:.2f}s "
+          f"({stacked.param_bytes / 1024**2:.0f} MB)")
+
+    with _stacks_lock:
+        _stacks[key] = tuple(member_keys)
+        oldest = list(_stacks)[:max(0, len(_stacks) - max(1, ENSEMBLE_STACK_CACHE_SIZE))]
+    cache_derived_entry(key, stacked)
+    for old_key in oldest:
+        drop_derived_entry(old_key)
+    return stacked
+
+
+def _run_group(loaded_models: List[Any], input_ids: List[List[int]]) -> Tuple[List[np.ndarray], str]:
+    """
+    Score pre-tokenized texts with a group of models sharing one tokenizer.
+
+    Returns:
+        tuple: (probabilities per model, execution mode 'vmap' or 'sequential')
+    """
+    signatures = [get_architecture_signature(m) for m in loaded_models]
+    signature = signatures[0]
+    stackable = (ENSEMBLE_VMAP and len(loaded_models) > 1 and signature is not None
+                 and all(s == signature for s in signatures) and signature not in _vmap_disabled)
+
+    if stackable:
+        try:
+            stacked = _get_stacked(loaded_models)
+            if stacked is None:
+                return [m.predict_proba_ids(input_ids) for m in loaded_models], 'sequential'
+            tokenizer = loaded_models[0].tokenizer
+            batch = tokenizer.pad({'input_ids': input_ids}, return_tensors='pt')
+            batch = {name: tensor.to(loaded_models[0].model.device) for name, tensor in batch.items()}
+            logits = stacked.logits(batch)
+            return [softmax(model_logits) for model_logits in logits], 'vmap'
+        except Exception as e:
+            _vmap_disabled.add(signature)
+            print(f"⚠️ Vectorized ensemble unavailable for {loaded_models[0].config.model_type}, "
+                  f"running models one by one: {str(e)}")
+
+    return [m.predict_proba_ids(input_ids) for m in loaded_models], 'sequential'
+
+
+def score_ensemble(model_keys: List[str], text: str, max_tokens: int = 512,
+                   label_mapping=LABEL_MAPPING) -> Dict[str, Any]:
+    """
+    Score a text with several models, tokenizing once per tokenizer family.
+
+    Args:
+        model_keys: Models to evaluate
+        text: Validated text
+        max_tokens: Token limit per model
+        label_mapping: Mapping from model labels to response labels
+
+    Returns:
+        Dict: 'models' (per-model prediction, confidence and deceptive score),
+            'aggregate' (mean deceptive score, prediction, confidence and votes)
+            and 'groups' (models per tokenizer family and how they ran)
+
+    Raises:
+        TokenLimitError: If the text exceeds a model's token limit
+    """
+    start_time = time.time()
+    loaded_models = [get_loaded_model(model_key) for model_key in model_keys]
+
+    groups = OrderedDict()
+    for loaded_model in loaded_models:
+        family = get_tokenizer_family(loaded_model.model_key, loaded_model.tokenizer)
+        groups.setdefault(family, []).append(loaded_model)
+
+    per_model = {}
+    group_info = []
+    for members in groups.values():
+        input_ids = members[0].tokenizer(text, truncation=False)['input_ids']
+        if len(input_ids) > max_tokens:
+            raise TokenLimitError(f"Text contains {len(input_ids)} tokens, but model limit is {max_tokens}. "
+                             f"Please reduce text length.")
+
+        # Models of one tokenizer family can still differ in architecture
+        by_architecture = OrderedDict()
+        for loaded_model in members:
+            by_architecture.setdefault(get_architecture_signature(loaded_model) or loaded_model.model_key, []).append(loaded_model)
+
+        for architecture_members in by_architecture.values():
+            probs_per_model, mode = _run_group(architecture_members, [input_ids])
+            group_info.append({'models': [m.model_key for m in architecture_members], 'mode': mode,
+                               'tokens': len(input_ids)})
+            for loaded_model, probs in zip(architecture_members, probs_per_model):
+                id2label = loaded_model.config.id2label
+                labels = [label_mapping.get(str(id2label[i]), str(id2label[i])) for i in range(probs.shape[1])]
+                row = probs[0]
+                label_index = int(np.argmax(row))
+                deceptive_score = float(row[labels.index('deceptive')]) if 'deceptive' in labels else float(row[0])
+                per_model[loaded_model.model_key] = {
+                    'prediction': labels[label_index],
+                    'confidence': float(row[label_index]),
+                    'deceptive_score': deceptive_score,
+                }
+
+    results = {model_key: per_model[model_key] for model_key in model_keys}
+    mean_deceptive = float(np.mean([r['deceptive_score'] for r in results.values()]))
+    votes = sum(1 for r in results.values() if r['prediction'] == 'deceptive')
+    prediction = 'deceptive' if mean_deceptive >= 0.5 else 'truthful'
+
+    end_time = time.time()
+    print(f"🎼 Ensemble prediction in {end_time - start_time:.3f}s - Models: {len(model_keys)}, "
+          f"Tokenizations: {len(groups)}, Result: {prediction} ({mean_deceptive:.3f})")
+
+    return {
+        'models': results,
+        'aggregate': {
+            'prediction': prediction,
+            'confidence': mean_deceptive if prediction == 'deceptive' else 1.0 - mean_deceptive,
+            'deceptive_score': mean_deceptive,
+            'votes': {'deceptive': votes, 'truthful': len(results) - votes},
+        },
+        'groups': group_info,
+    }
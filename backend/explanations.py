@@ -1,58 +1,183 @@
 import numpy as np
 import torch
 import time
-from transformers import pipeline
-from typing import List, Tuple
-from lime.lime_text import LimeTextExplainer
-import shap
-from config import CLASS_NAMES
-from ai_utils import get_pred_probs
+from typing import Any, Dict, List, Optional, Tuple
+from ai_utils import get_loaded_model, encode_text, get_model_fingerprint
+from config import (
+    CACHE_DIR, LIME_ENGINE, LIME_NUM_SAMPLES, LIME_ADAPTIVE, LIME_MAX_SAMPLES, LIME_MIN_SAMPLES, LIME_ROUND_SAMPLES,
+    LIME_TOLERANCE, SHAP_MAX_EVALS, SHAP_MAX_EVALS_BY_MODEL, SHAP_MAX_EVALS_LIMIT, SHAP_MAX_BATCH_SIZE,
+    SHAP_COARSE_TOKENS, SHAP_COARSE_GROUP_TOKENS, EXPLANATION_CACHE_ENABLED, EXPLANATION_CACHE_MEMORY_ENTRIES,
+    EXPLANATION_CACHE_MAX_DISK_ENTRIES, EXPLANATION_SEED
+)
+from result_cache import TwoTierCache, text_hash
+from text_encoding import TextEncoding
+import lime_engine
 
+# Explanation results keyed by model fingerprint, method, budget, seed and normalized text hash
+_explanation_cache = TwoTierCache(
+    CACHE_DIR / 'results.sqlite',
+    'explanations',
+    max_memory_entries=EXPLANATION_CACHE_MEMORY_ENTRIES,
+    max_disk_entries=EXPLANATION_CACHE_MAX_DISK_ENTRIES
+)
 
-def get_lime_explanation(model_key: str, text: str, label_mapping=None, top_n_words: int = None) -> List[Tuple[str, float]]:
+
+def _explanation_key(model_key: str, text: str, method: str, budget: str, seed: Optional[int] = None) -> Optional[str]:
+    """Cache key of an explanation (None when the explanation cache is disabled)."""
+    if not EXPLANATION_CACHE_ENABLED:
+        return None
+    return f"{get_model_fingerprint(model_key)}:{method}:{budget}:{seed}:{text_hash(text)}"
+
+
+def _cached_explanation(key: Optional[str], top_n_words: Optional[int]) -> Optional[Dict[str, Any]]:
     """
-    Generate LIME explanation for text classification.
+    Look up a cached explanation that covers top_n_words.
+
+    An entry computed for all words (top_n_words None) or for more words than
+    requested covers the request; the caller truncates it.
+
+    Returns:
+        Optional[Dict]: The cached result, or None on a miss
+    """
+    if key is None:
+        return None
+    entry = _explanation_cache.get(key)
+    if entry is None:
+        return None
+    cached_top_n = entry['top_n_words']
+    if cached_top_n is not None and (top_n_words is None or top_n_words > cached_top_n):
+        return None
+    return entry['result']
+
+
+def _store_explanation(key: Optional[str], top_n_words: Optional[int], result: Dict[str, Any]) -> None:
+    """Cache an explanation computed for top_n_words."""
+    if key is not None:
+        _explanation_cache.put(key, {'top_n_words': top_n_words, 'result': result})
+
+
+def get_explanation_cache_stats() -> Dict[str, Any]:
+    """Get hit/miss counters of the explanation cache."""
+    stats = _explanation_cache.get_stats()
+    stats['enabled'] = EXPLANATION_CACHE_ENABLED
+    return stats
+
+
+def parse_lime_options(options: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[str]]:
+    """
+    Read the LIME options of a request.
+
+    Args:
+        options: Request body (or its params) with optional 'num_samples'
+            (the sample budget) and 'adaptive' fields
+
+    Returns:
+        tuple: (options for explain_lime, error_message)
+    """
+    lime_options = {}
+    num_samples = options.get('num_samples')
+    if num_samples is not None:
+        if not isinstance(num_samples, int) or isinstance(num_samples, bool) or not 10 <= num_samples <= LIME_MAX_SAMPLES:
+            return {}, f"num_samples must be an integer between 10 and {LIME_MAX_SAMPLES}"
+        lime_options['num_samples'] = num_samples
+
+    adaptive = options.get('adaptive')
+    if adaptive is not None:
+        if not isinstance(adaptive, bool):
+            return {}, "adaptive must be true or false"
+        lime_options['adaptive'] = adaptive
+
+    return lime_options, None
+
+
+def explain_lime(model_key: str, text: str, label_mapping=None, top_n_words: int = None,
+                 encoding: Optional[TextEncoding] = None, num_samples: Optional[int] = None,
+                 adaptive: Optional[bool] = None, seed: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Generate LIME explanation for text classification, with sampling details.
+    
+    With LIME_ENGINE=native the text is tokenized once and perturbations are
+    scored as token IDs (see lime_engine); otherwise, or when the tokenizer
+    reports no offsets, the lime package's LimeTextExplainer is used. Either
+    way every word is ranked in one fit, and the cached ranking serves any
+    top_n_words by truncation.
     
     Args:
         model_key: Key for the preloaded model
         text: Text to explain
         label_mapping: Optional mapping for label names
         top_n_words: Number of top words to return (None = all words)
+        encoding: The request's TextEncoding of text (skips re-tokenization)
+        num_samples: Sample budget (None = LIME_MAX_SAMPLES when adaptive, else LIME_NUM_SAMPLES;
+            the lime package defaults to LIME_NUM_SAMPLES)
+        adaptive: Draw samples in rounds until the explanation is stable
+            (None = LIME_ADAPTIVE; native engine only)
+        seed: Random seed of the native engine (None = EXPLANATION_SEED, so results are cacheable)
         
     Returns:
-        List[Tuple[str, float]]: List of (word, importance_score) tuples
+        Dict: 'words' (list of (word, importance_score) tuples), 'samples' used,
+            'stability' (1.0 = top words and weights unchanged by the last
+            samples; None for the lime package) and 'engine'
     """
     start_time = time.time()
     print(f"🔍 Starting LIME explanation for model: {model_key}")
     print(f"📝 Text length: {len(text)} characters")
     
+    adaptive = LIME_ADAPTIVE if adaptive is None else adaptive
+    seed = EXPLANATION_SEED if seed is None else seed
+    if LIME_ENGINE != 'native':
+        budget = f"lime-{num_samples or LIME_NUM_SAMPLES}"
+    elif adaptive:
+        budget = (f"adaptive-{num_samples or LIME_MAX_SAMPLES}-"
+                  f"{LIME_MIN_SAMPLES}-{LIME_ROUND_SAMPLES}-{LIME_TOLERANCE:g}")
+    else:
+        budget = f"fixed-{num_samples or LIME_NUM_SAMPLES}"
+    
     try:
-        from ai_utils import _model_cache
+        # The full ranking is computed and cached once; any top_n_words is served by truncating it
+        cache_key = _explanation_key(model_key, text, 'lime', budget, seed)
+        cached = _cached_explanation(cache_key, top_n_words)
+        if cached is not None:
+            words = cached['words'] if top_n_words is None else cached['words'][:top_n_words]
+            print(f"💾 LIME explanation served from cache in {time.time() - start_time:.3f}s (features: {len(words)})")
+            return {**cached, 'words': words}
+        
+        if LIME_ENGINE == 'native':
+            if encoding is None or encoding.model_key != model_key or encoding.text != text:
+                encoding = encode_text(model_key, text)
+            loaded_model = get_loaded_model(model_key)
+            result = lime_engine.explain(loaded_model, encoding, label_mapping,
+                                         num_features=None, seed=seed,
+                                         num_samples=num_samples or (LIME_MAX_SAMPLES if adaptive else LIME_NUM_SAMPLES),
+                                         batch_size=loaded_model.explainer_batch_size, adaptive=adaptive)
+            if result is not None:
+                print(f"⚡ LIME explanation completed in {time.time() - start_time:.2f}s "
+                      f"(features: {len(result['words'])}, samples: {result['samples']})")
+                result = {'words': result['words'], 'samples': result['samples'],
+                          'stability': result['stability'], 'engine': 'native'}
+                _store_explanation(cache_key, None, result)
+                return {**result, 'words': result['words'][:top_n_words]}
+            print(f"⚠️ Tokenizer of {model_key} reports no offsets, using the lime package")
         
-        # Try to get preloaded LIME explainer, fallback to creating new one
-        lime_key = f"{model_key}_lime"
-        if lime_key in _model_cache:
-            explainer = _model_cache[lime_key]
-            print(f"✅ Using cached LIME explainer: {lime_key}")
-        else:
-            print(f"🔧 Creating new LIME explainer for {model_key}")
-            explainer = LimeTextExplainer(class_names=CLASS_NAMES)
+        # LIME explainer is attached to the shared model instance (fixed budget only)
+        num_samples = num_samples or LIME_NUM_SAMPLES
+        loaded_model = get_loaded_model(model_key)
+        explainer = loaded_model.get_lime_explainer()
+        class_columns = loaded_model.class_columns(label_mapping)
         
         def predict_fn(texts):
-            return get_pred_probs(model_key, texts, label_mapping)
+            # Perturbed samples are throwaway inputs - scored in batches, outside the prediction cache
+            return loaded_model.predict_proba_texts(texts)[:, class_columns]
         
-        # If top_n_words is None, return explanations for ALL words in the input text
-        if top_n_words is None:
-            num_features = len(text.split())
-        else:
-            num_features = top_n_words
+        # Explain ALL words in the input text (the cached ranking is truncated to top_n_words)
+        num_features = len(text.split())
         
         explanation_start = time.time()
         exp = explainer.explain_instance(
             text,
             classifier_fn=predict_fn,
             num_features=num_features,
-            num_samples=500  # Increased for better stability
+            num_samples=num_samples
         )
         explanation_end = time.time()
         
@@ -68,11 +193,33 @@ def get_lime_explanation(model_key: str, text: str, label_mapping=None, top_n_wo
             memory_used = torch.cuda.memory_allocated() / 1024**3
             print(f"🎮 GPU memory after LIME: {memory_used:.2f} GB")
         
-        return result
+        result = {'words': result, 'samples': num_samples, 'stability': None, 'engine': 'lime'}
+        _store_explanation(cache_key, None, result)
+        return {**result, 'words': result['words'][:top_n_words]}
         
     except Exception as e:
         print(f"❌ LIME explanation error for {model_key}: {str(e)}")
-        return []
+        return {'words': [], 'samples': 0, 'stability': None, 'engine': LIME_ENGINE}
+
+
+def get_lime_explanation(model_key: str, text: str, label_mapping=None, top_n_words: int = None,
+                         encoding: Optional[TextEncoding] = None, **lime_options) -> List[Tuple[str, float]]:
+    """
+    Generate LIME explanation for text classification.
+    
+    Args:
+        model_key: Key for the preloaded model
+        text: Text to explain
+        label_mapping: Optional mapping for label names
+        top_n_words: Number of top words to return (None = all words)
+        encoding: The request's TextEncoding of text (skips re-tokenization)
+        **lime_options: num_samples, adaptive and seed (see explain_lime)
+        
+    Returns:
+        List[Tuple[str, float]]: List of (word, importance_score) tuples
+    """
+    return explain_lime(model_key, text, label_mapping, top_n_words=top_n_words, encoding=encoding,
+                        **lime_options)['words']
 
 
 def format_shap_exp(words: List[str], weights: List[float], top_n_words: int = None) -> List[Tuple[str, float]]:
@@ -98,14 +245,47 @@ def format_shap_exp(words: List[str], weights: List[float], top_n_words: int = N
     return [(str(word), float(weight)) for word, weight in word_weight_pairs[:top_n_words]]
 
 
-def get_shap_explanation(model_key: str, text: str, top_n_words: int = None) -> List[Tuple[str, float]]:
+def parse_shap_options(options: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[str]]:
+    """
+    Read the SHAP budget options of a request.
+
+    Args:
+        options: Request body with optional 'max_evals' and 'batch_size' fields
+
+    Returns:
+        tuple: (options for get_shap_explanation, error_message)
+    """
+    shap_options = {}
+    for name, low, high in (('max_evals', 10, SHAP_MAX_EVALS_LIMIT), ('batch_size', 1, SHAP_MAX_BATCH_SIZE)):
+        value = options.get(name)
+        if value is None:
+            continue
+        if not isinstance(value, int) or isinstance(value, bool) or not low <= value <= high:
+            return {}, f"{name} must be an integer between {low} and {high}"
+        shap_options[name] = value
+    return shap_options, None
+
+
+def get_shap_explanation(model_key: str, text: str, top_n_words: int = None,
+                         encoding: Optional[TextEncoding] = None, word_level: bool = False,
+                         max_evals: Optional[int] = None, batch_size: Optional[int] = None) -> List[Tuple[str, float]]:
     """
     Generate SHAP explanation for text classification.
     
+    The cost is bounded by max_evals masked inputs, scored batch_size at a time;
+    partition trees are cached per text and long texts are explained in word
+    groups (see shap_engine). Every word's attribution is cached, so requests
+    with any top_n_words are served from one entry.
+    
     Args:
         model_key: Key for the preloaded model
         text: Text to explain
         top_n_words: Number of top words to return (None = all words in sentence order)
+        encoding: The request's TextEncoding of text (reused for word-level aggregation)
+        word_level: Sum sub-word token attributions into whole words (exact spans from
+            the tokenizer offsets) instead of returning one entry per token
+        max_evals: Masked inputs to score (None = SHAP_MAX_EVALS_BY_MODEL, else SHAP_MAX_EVALS)
+        batch_size: Masked inputs per scoring call (None = the model's explainer_batch_size)
         
     Returns:
         List[Tuple[str, float]]: List of (word, importance_score) tuples
@@ -114,65 +294,49 @@ def get_shap_explanation(model_key: str, text: str, top_n_words: int = None) ->
     print(f"📊 Starting SHAP explanation for model: {model_key}")
     print(f"📝 Text length: {len(text)} characters")
     
+    max_evals = max_evals or SHAP_MAX_EVALS_BY_MODEL.get(model_key, SHAP_MAX_EVALS)
+    budget = f"{max_evals}-{'words' if word_level else 'tokens'}-{SHAP_COARSE_TOKENS}-{SHAP_COARSE_GROUP_TOKENS}"
+    
     try:
-        from ai_utils import _model_cache
-        
-        # Get preloaded SHAP explainer
-        shap_key = f"{model_key}_shap"
-        if shap_key in _model_cache:
-            explainer = _model_cache[shap_key]
-            print(f"✅ Using cached SHAP explainer: {shap_key}")
-        else:
-            # Fallback: create explainer on demand
+        cache_key = _explanation_key(model_key, text, 'shap', budget)
+        cached = _cached_explanation(cache_key, top_n_words)
+        if cached is not None:
+            result = format_shap_exp([word for word, _ in cached['words']], [weight for _, weight in cached['words']],
+                                     top_n_words=top_n_words)
+            print(f"💾 SHAP explanation served from cache in {time.time() - start_time:.3f}s (features: {len(result)})")
+            return result
+        
+        # SHAP explainer scores maskings in batches on the shared model
+        loaded_model = get_loaded_model(model_key)
+        if not loaded_model.has_shap_explainer():
             print(f"🔧 Creating SHAP explainer on demand for {model_key}")
-            
-            # Handle custom models differently
-            if model_key.startswith("custom_"):
-                # For custom models, use the model path directly
-                if model_key in _model_cache:
-                    # Get the model path from the custom model directory
-                    model_code = model_key.replace("custom_", "")
-                    from training_routes import CUSTOM_MODELS_DIR
-                    model_path = CUSTOM_MODELS_DIR / model_code / 'model'
-                    device = 0 if torch.cuda.is_available() else -1
-                    
-                    classifier = pipeline(
-                        "text-classification",
-                        model=str(model_path),
-                        top_k=None,
-                        device=device
-                    )
-                else:
-                    raise ValueError(f"Custom model {model_key} not found in cache")
-            else:
-                # For regular models, use the normal path
-                from model_utils import get_model_path
-                model_path = get_model_path(model_key)
-                device = 0 if torch.cuda.is_available() else -1
-                classifier = pipeline(
-                    "text-classification", 
-                    model=model_path, 
-                    top_k=None, 
-                    device=device
-                )
-            
-            explainer = shap.Explainer(classifier)
-            _model_cache[shap_key] = explainer
-            print(f"✅ SHAP explainer cached: {shap_key}")
+        explainer = loaded_model.get_shap_explainer()
+        batch_size = batch_size or loaded_model.explainer_batch_size
         
         explanation_start = time.time()
-        shap_output = explainer([text])
+        shap_output = explainer([text], max_evals=max_evals, batch_size=batch_size, silent=True)
         explanation_end = time.time()
         
         words = shap_output.data[0]
         weights = shap_output.values[0][:, 1]
         
+        if word_level:
+            if encoding is None or encoding.model_key != model_key or encoding.text != text:
+                encoding = encode_text(model_key, text)
+            word_weights = encoding.aggregate_to_words(weights)
+            if word_weights:
+                words = [word for word, _ in word_weights]
+                weights = [weight for _, weight in word_weights]
+            else:
+                print("⚠️ SHAP tokens do not line up with the encoding, returning token-level attributions")
+        
+        _store_explanation(cache_key, None, {'words': format_shap_exp(words, weights)})
         result = format_shap_exp(words, weights, top_n_words=top_n_words)
         
         end_time = time.time()
         total_time = end_time - start_time
         explanation_time = explanation_end - explanation_start
-        print(f"⚡ SHAP explanation completed in {total_time:.2f}s (explanation: {explanation_time:.2f}s, features: {len(result)})")
+        print(f"⚡ SHAP explanation completed in {total_time:.2f}s (explanation: {explanation_time:.2f}s, max_evals: {max_evals}, features: {len(result)})")
         
         # Log GPU memory if available
         if torch.cuda.is_available():
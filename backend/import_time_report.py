@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Import Time Report
+Measures a cold `import app` in a fresh interpreter with `python -X importtime`,
+prints the slowest modules and packages by cumulative time, and fails when the
+import exceeds IMPORT_TIME_BUDGET or when a lazily loaded stack (explanations,
+training, datasets) is imported eagerly.
+"""
+
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from config import IMPORT_TIME_BUDGET
+
+# Packages (with their submodules) that must only be imported on first use, never by `import app`.
+# The transformers Auto* factories count too: they import generation, and with it sklearn
+LAZY_PACKAGES = ['shap', 'lime', 'sklearn', 'datasets', 'pandas', 'transformers.models.auto',
+                 'transformers.trainer', 'transformers.pipelines']
+
+BACKEND_DIR = Path(__file__).parent
+
+
+def run_import(module: str) -> List[Tuple[str, int, int, int]]:
+    """
+    Import a module in a fresh interpreter and collect -X importtime output.
+
+    Background work started at import (warm-up) is disabled for the measurement.
+
+    Args:
+        module: Module to import (e.g. 'app')
+
+    Returns:
+        list: (module_name, depth, self_us, cumulative_us) in import order
+    """
+    env = dict(os.environ, WARMUP_MODELS='', PYTHONDONTWRITEBYTECODE='1')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=str(BACKEND_DIR), env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        # Format: "import time: <self us> | <cumulative us> | <two spaces per nesting level><name>"
+        parts = line[len('import time:'):].split('|')
+        if not line.startswith('import time:') or len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        self_us, cumulative_us, name = parts
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return entries
+
+
+def summarize(entries: List[Tuple[str, int, int, int]]) -> Dict[str, int]:
+    """Sum self time per top-level package (microseconds)."""
+    totals = defaultdict(int)
+    for name, _, self_us, _ in entries:
+        totals[name.split('.')[0]] += self_us
+    return dict(totals)
+
+
+def is_in_package(name: str, package: str) -> bool:
+    """Check whether a module is a package or one of its submodules."""
+    return name == package or name.startswith(package + '.')
+
+
+def find_importer(entries: List[Tuple[str, int, int, int]], package: str) -> str:
+    """
+    Find the backend module whose import first pulled in a package.
+
+    Args:
+        entries: run_import output
+        package: Imported package (the first of its modules is traced)
+
+    Returns:
+        str: Name of the innermost backend module above the package ('?' if none)
+    """
+    backend_modules = {path.stem for path in BACKEND_DIR.glob('*.py')}
+    index = next(i for i, entry in enumerate(entries) if is_in_package(entry[0], package))
+    depth = entries[index][1]
+    # -X importtime lists a module after everything it imported, so parents follow at lower depth
+    for name, entry_depth, _, _ in entries[index + 1:]:
+        if entry_depth < depth:
+            if name in backend_modules:
+                return name
+            depth = entry_depth
+    return '?'
+
+
+def main():
+    """Main CLI interface."""
+    parser = argparse.ArgumentParser(
+        description="Report the cold import time of the API and enforce a budget",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python import_time_report.py                    # Report and check against IMPORT_TIME_BUDGET
+  python import_time_report.py --budget 5 --top 40
+  python import_time_report.py --repeat 3         # Median of 3 fresh interpreters
+        """
+    )
+    parser.add_argument('--module', default='app', help='Module to import (default: app)')
+    parser.add_argument('--budget', type=float, default=IMPORT_TIME_BUDGET,
+                        help=f'Maximum cumulative import time in seconds (default: {IMPORT_TIME_BUDGET:g})')
+    parser.add_argument('--top', type=int, default=25, help='Modules and packages to list')
+    parser.add_argument('--repeat', type=int, default=1, help='Fresh imports to run (the median is checked)')
+    parser.add_argument('--allow-eager', action='store_true',
+                        help='Do not fail when a lazily loaded package is imported eagerly')
+    args = parser.parse_args()
+
+    runs = []
+    for _ in range(max(1, args.repeat)):
+        try:
+            runs.append(run_import(args.module))
+        except RuntimeError as e:
+            print(f"❌ {str(e)}")
+            sys.exit(1)
+
+    totals = []
+    for entries in runs:
+        top_level = [e for e in entries if e[0] == args.module and e[1] == 0]
+        totals.append(top_level[-1][3] if top_level else sum(e[2] for e in entries))
+    median_s = statistics.median(totals) / 1e6
+    entries = runs[totals.index(sorted(totals)[len(totals) // 2])]
+
+    print(f"⏱️ Import Time Report: import {args.module}")
+    print("=" * 50)
+    print(f"Cumulative: {median_s:.2f}s (budget {args.budget:g}s"
+          f"{f', median of {len(runs)} runs' if len(runs) > 1 else ''})")
+    print()
+
+    print("Slowest modules (cumulative):")
+    for name, depth, self_us, cumulative_us in sorted(entries, key=lambda e: -e[3])[:args.top]:
+        print(f"  {cumulative_us / 1e3:9.1f} ms  {self_us / 1e3:8.1f} ms self  {name}")
+    print()
+
+    print("Slowest packages (sum of self time):")
+    for package, self_us in sorted(summarize(entries).items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {self_us / 1e3:9.1f} ms  {package}")
+    print()
+
+    failures = 0
+    imported = {name for name, _, _, _ in entries}
+    eager = [package for package in LAZY_PACKAGES if any(is_in_package(name, package) for name in imported)]
+    if eager:
+        status = "⚠️" if args.allow_eager else "❌"
+        print(f"{status} Imported eagerly (should be lazy): "
+              f"{', '.join(f'{package} (via {find_importer(entries, package)})' for package in eager)}")
+        if not args.allow_eager:
+            failures += 1
+    else:
+        print(f"✅ Lazy stacks not imported: {', '.join(LAZY_PACKAGES)}")
+
+    if median_s > args.budget:
+        print(f"❌ Import time {median_s:.2f}s exceeds the {args.budget:g}s budget")
+        failures += 1
+    else:
+        print(f"✅ Import time {median_s:.2f}s is within the {args.budget:g}s budget")
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,425 @@
+"""
+Inference Engine
+Pool of worker processes that each hold their own models and run forward passes
+outside the web process's GIL. Flask threads submit token IDs over a local queue;
+large inputs and their results travel through shared memory. A monitor thread
+pings the workers and restarts any that die or stop responding. Each worker
+replies on its own queue, so a process killed mid-reply cannot corrupt the
+replies of the others or of its replacement.
+"""
+
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from config import INFERENCE_BATCH_SIZE, INFERENCE_LOAD_TIMEOUT
+from model_registry import ModelHandle
+
+
+# ---------------------- Worker process ----------------------
+
+def _read_shm_inputs(payload):
+    """Attach to a request's shared-memory block and return (shm, input_ids, output view)."""
+    _, shm_name, n_texts, total_tokens, num_labels = payload
+    shm = shared_memory.SharedMemory(name=shm_name)
+    offsets = np.ndarray((n_texts + 1,), dtype=np.int64, buffer=shm.buf)
+    tokens = np.ndarray((total_tokens,), dtype=np.int64, buffer=shm.buf, offset=offsets.nbytes)
+    output = np.ndarray((n_texts, num_labels), dtype=np.float32, buffer=shm.buf,
+                        offset=offsets.nbytes + tokens.nbytes)
+    input_ids = [tokens[offsets[i]:offsets[i + 1]].tolist() for i in range(n_texts)]
+    return shm, input_ids, output
+
+
+def _worker_main(worker_id: int, request_queue, response_queue, num_threads: int):
+    """
+    Worker process loop: load models on demand and answer requests in order.
+
+    Messages are (request_id, op, args) tuples; replies are
+    (worker_id, request_id, ok, result_or_error).
+    """
+    import torch
+    from model_registry import LoadedModel
+
+    if num_threads > 0:
+        torch.set_num_threads(num_threads)
+    models = {}
+
+    def get_model(model_key, model_path):
+        loaded_model = models.get(model_key)
+        if loaded_model is None:
+            start_time = time.time()
+            loaded_model = LoadedModel(model_key, model_path, -1)
+            models[model_key] = loaded_model
+            print(f"✅ Worker {worker_id} loaded {model_key} in {time.time() - start_time:.2f}s "
+                  f"({loaded_model.backend})")
+        return loaded_model
+
+    print(f"🚀 Inference worker {worker_id} started (pid {os.getpid()}, {torch.get_num_threads()} threads)")
+    while True:
+        message = request_queue.get()
+        if message is None:
+            return
+        request_id, op, args = message
+
+        try:
+            if op == 'ping':
+                result = {'pid': os.getpid(), 'models': list(models.keys())}
+            elif op == 'load':
+                loaded_model = get_model(*args)
+                result = {'param_bytes': loaded_model.param_bytes, 'mmapped': loaded_model.mmapped}
+            elif op == 'unload':
+                result = models.pop(args[0], None) is not None
+            elif op == 'predict':
+                model_key, model_path, payload, batch_size = args
+                loaded_model = get_model(model_key, model_path)
+                if payload[0] == 'shm':
+                    shm, input_ids, output = _read_shm_inputs(payload)
+                    try:
+                        output[:] = loaded_model.predict_proba_ids(input_ids, batch_size=batch_size)
+                    finally:
+                        # Views must be released before the block can be closed
+                        output = None
+                        shm.close()
+                    result = None
+                else:
+                    result = loaded_model.predict_proba_ids(payload[1], batch_size=batch_size).astype(np.float32)
+            else:
+                raise ValueError(f"Unknown operation: {op}")
+            response_queue.put((worker_id, request_id, True, result))
+        except Exception as e:
+            response_queue.put((worker_id, request_id, False, f"{type(e).__name__}: {str(e)}"))
+
+
+# ---------------------- Parent side ----------------------
+
+class _WorkerState:
+    """Parent-side bookkeeping for one worker process."""
+
+    def __init__(self, process, request_queue, response_queue):
+        self.process = process
+        self.request_queue = request_queue
+        self.response_queue = response_queue
+        self.pending = {}  # request_id -> (op, Future)
+        self.started_at = time.time()
+        self.last_seen = time.time()
+        self.restarts = 0
+        self.requests = 0
+        self.errors = 0
+
+
+class InferenceEngine:
+    """Pool of inference worker processes fed by local queues."""
+
+    def __init__(self, num_workers: int, threads_per_worker: int = 0,
+                 shm_threshold_bytes: int = 65536, worker_timeout: float = 120,
+                 health_interval: float = 10, load_timeout: float = INFERENCE_LOAD_TIMEOUT):
+        """
+        Initialize the engine (call start() to launch the workers).
+
+        Args:
+            num_workers: Worker processes
+            threads_per_worker: Torch intra-op threads per worker (0 = cores / workers)
+            shm_threshold_bytes: Inputs larger than this are passed through shared memory
+            worker_timeout: Seconds a worker with pending work may stay silent before it is restarted
+            health_interval: Seconds between health pings
+            load_timeout: Seconds a worker loading a model may stay silent (replaces worker_timeout)
+        """
+        self.num_workers = max(1, int(num_workers))
+        self.threads_per_worker = int(threads_per_worker) or max(1, (os.cpu_count() or 1) // self.num_workers)
+        self.shm_threshold_bytes = int(shm_threshold_bytes)
+        self.worker_timeout = float(worker_timeout)
+        self.health_interval = float(health_interval)
+        self.load_timeout = float(load_timeout)
+
+        self._ctx = mp.get_context('spawn')
+        self._workers: List[Optional[_WorkerState]] = [None] * self.num_workers
+        self._lock = threading.Lock()
+        self._request_ids = itertools.count()
+        self._loaded = {}  # model_key -> model_path, replayed into restarted workers
+        self._running = False
+
+    def start(self):
+        """Launch the worker processes and the monitor thread."""
+        if self._running:
+            return
+        print(f"🏭 Starting {self.num_workers} inference workers ({self.threads_per_worker} threads each)")
+        self._running = True
+        for worker_id in range(self.num_workers):
+            self._start_worker(worker_id)
+        threading.Thread(target=self._monitor_loop, name='inference-monitor', daemon=True).start()
+
+    def stop(self):
+        """Stop all workers."""
+        self._running = False
+        with self._lock:
+            workers = [w for w in self._workers if w is not None]
+        for worker in workers:
+            try:
+                worker.request_queue.put(None)
+            except Exception:
+                pass
+        for worker in workers:
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+
+    def _start_worker(self, worker_id: int, restarts: int = 0):
+        """Spawn one worker process with fresh queues and replay the models it should hold."""
+        request_queue = self._ctx.Queue()
+        response_queue = self._ctx.Queue()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, request_queue, response_queue, self.threads_per_worker),
+            name=f"inference-worker-{worker_id}",
+            daemon=True
+        )
+        process.start()
+        state = _WorkerState(process, request_queue, response_queue)
+        state.restarts = restarts
+        with self._lock:
+            self._workers[worker_id] = state
+            loaded = list(self._loaded.items())
+        threading.Thread(target=self._reader_loop, args=(worker_id, state),
+                         name=f"inference-reader-{worker_id}", daemon=True).start()
+        for model_key, model_path in loaded:
+            self._send(worker_id, 'load', (model_key, model_path))
+
+    def _restart_worker(self, worker_id: int, reason: str):
+        """Fail the worker's pending requests and replace its process."""
+        with self._lock:
+            state = self._workers[worker_id]
+            pending = [future for op, future in state.pending.values() if op != 'ping']
+            state.pending.clear()
+        print(f"⚠️ Restarting inference worker {worker_id} ({reason}), failing {len(pending)} pending requests")
+        for future in pending:
+            if not future.done():
+                future.set_exception(RuntimeError(f"Inference worker {worker_id} restarted: {reason}"))
+        if state.process.is_alive():
+            state.process.kill()
+        state.process.join(timeout=5)
+        self._start_worker(worker_id, restarts=state.restarts + 1)
+
+    def _send(self, worker_id: int, op: str, args) -> Future:
+        """Queue a request for one worker."""
+        future = Future()
+        request_id = next(self._request_ids)
+        with self._lock:
+            state = self._workers[worker_id]
+            state.pending[request_id] = (op, future)
+            state.requests += 1
+        state.request_queue.put((request_id, op, args))
+        return future
+
+    def _pick_worker(self) -> int:
+        """Choose the worker with the fewest pending requests (health pings are not work)."""
+        with self._lock:
+            return min(range(self.num_workers), key=lambda i: sum(
+                op != 'ping' for op, _ in self._workers[i].pending.values()
+            ))
+
+    def _reader_loop(self, worker_id: int, state: _WorkerState):
+        """Resolve futures as replies arrive from one worker process (until it is replaced)."""
+        while self._running and self._workers[worker_id] is state:
+            try:
+                _, request_id, ok, result = state.response_queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            except Exception as e:
+                print(f"❌ Inference worker {worker_id} response queue error: {str(e)}")
+                continue
+
+            with self._lock:
+                state.last_seen = time.time()
+                _, future = state.pending.pop(request_id, (None, None))
+                if not ok:
+                    state.errors += 1
+            if future is None or future.done():
+                continue  # Reply to an abandoned request
+            if ok:
+                future.set_result(result)
+            else:
+                future.set_exception(RuntimeError(result))
+
+    def _monitor_loop(self):
+        """Ping workers and restart dead or unresponsive ones."""
+        while self._running:
+            time.sleep(self.health_interval)
+            for worker_id in range(self.num_workers):
+                with self._lock:
+                    state = self._workers[worker_id]
+                    silent_for = time.time() - state.last_seen
+                    ops = {op for op, _ in state.pending.values()}
+                # A slow first load keeps the worker silent, so loads get their own (longer) timeout
+                timeout = self.load_timeout if 'load' in ops else self.worker_timeout
+                if not state.process.is_alive():
+                    self._restart_worker(worker_id, f"process exited with code {state.process.exitcode}")
+                elif ops - {'ping'} and silent_for > timeout:
+                    self._restart_worker(worker_id, f"no response for {silent_for:.0f}s")
+                elif 'ping' not in ops:
+                    self._send(worker_id, 'ping', ())
+
+    def load(self, model_key: str, model_path: str) -> List[Future]:
+        """
+        Ask every worker to load a model.
+
+        Returns:
+            List[Future]: One per worker, resolving to {'param_bytes', 'mmapped'}
+        """
+        with self._lock:
+            self._loaded[model_key] = str(model_path)
+        return [self._send(worker_id, 'load', (model_key, str(model_path))) for worker_id in range(self.num_workers)]
+
+    def unload(self, model_key: str):
+        """Ask every worker to release a model."""
+        with self._lock:
+            self._loaded.pop(model_key, None)
+        for worker_id in range(self.num_workers):
+            self._send(worker_id, 'unload', (model_key,))
+
+    def _predict_chunk(self, model_key: str, model_path: str, input_ids: List[List[int]],
+                       num_labels: int, batch_size: int = INFERENCE_BATCH_SIZE) -> np.ndarray:
+        """Run one request on the least busy worker (batch_size texts per forward pass)."""
+        total_tokens = sum(len(ids) for ids in input_ids)
+        worker_id = self._pick_worker()
+
+        if total_tokens * 8 < self.shm_threshold_bytes:
+            future = self._send(worker_id, 'predict', (model_key, model_path, ('inline', input_ids), batch_size))
+            return future.result(timeout=self.worker_timeout * 2)
+
+        # Layout: offsets (int64, n+1) | tokens (int64) | probabilities (float32, n x labels)
+        n_texts = len(input_ids)
+        offsets = np.zeros(n_texts + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(ids) for ids in input_ids])
+        tokens = output = None
+        size = offsets.nbytes + total_tokens * 8 + n_texts * num_labels * 4
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        try:
+            np.ndarray(offsets.shape, dtype=np.int64, buffer=shm.buf)[:] = offsets
+            tokens = np.ndarray((total_tokens,), dtype=np.int64, buffer=shm.buf, offset=offsets.nbytes)
+            tokens[:] = np.fromiter(itertools.chain.from_iterable(input_ids), dtype=np.int64, count=total_tokens)
+            output = np.ndarray((n_texts, num_labels), dtype=np.float32, buffer=shm.buf,
+                                offset=offsets.nbytes + tokens.nbytes)
+
+            payload = ('shm', shm.name, n_texts, total_tokens, num_labels)
+            self._send(worker_id, 'predict', (model_key, model_path, payload, batch_size)).result(
+                timeout=self.worker_timeout * 2)
+            return output.copy()
+        finally:
+            # Views must be released before the block can be closed
+            tokens = output = None
+            shm.close()
+            shm.unlink()
+
+    def predict_proba_ids(self, model_key: str, model_path: str, input_ids: List[List[int]],
+                          num_labels: int, batch_size: int = INFERENCE_BATCH_SIZE) -> np.ndarray:
+        """
+        Get class probabilities from the worker pool.
+
+        Large requests (e.g. LIME perturbations) are split across workers and run in parallel.
+
+        Args:
+            model_key: Model key
+            model_path: Local path or HF model id (used by workers that have not loaded the model)
+            input_ids: Token IDs per text
+            num_labels: Number of output labels
+            batch_size: Texts per forward pass inside a worker
+
+        Returns:
+            np.ndarray: Probabilities per text (in input order), columns ordered by model label ID
+        """
+        if len(input_ids) <= batch_size or self.num_workers == 1:
+            return self._predict_chunk(model_key, model_path, input_ids, num_labels, batch_size)
+
+        parts = min(self.num_workers, -(-len(input_ids) // batch_size))
+        step = -(-len(input_ids) // parts)
+        threads = []
+        results = [None] * parts
+        errors = []
+
+        def run(index, chunk):
+            try:
+                results[index] = self._predict_chunk(model_key, model_path, chunk, num_labels, batch_size)
+            except Exception as e:
+                errors.append(e)
+
+        for index in range(parts):
+            chunk = input_ids[index * step:(index + 1) * step]
+            thread = threading.Thread(target=run, args=(index, chunk), daemon=True)
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+        return np.concatenate(results)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-worker health and load counters."""
+        now = time.time()
+        with self._lock:
+            return {
+                'workers': self.num_workers,
+                'threads_per_worker': self.threads_per_worker,
+                'models': list(self._loaded.keys()),
+                'model_paths': dict(self._loaded),
+                'processes': [
+                    {
+                        'worker_id': worker_id,
+                        'pid': state.process.pid,
+                        'alive': state.process.is_alive(),
+                        'pending': len(state.pending),
+                        'requests': state.requests,
+                        'errors': state.errors,
+                        'restarts': state.restarts,
+                        'uptime_seconds': round(now - state.started_at, 1),
+                        'last_seen_seconds': round(now - state.last_seen, 1),
+                    }
+                    for worker_id, state in enumerate(self._workers) if state is not None
+                ]
+            }
+
+
+class RemoteModel(ModelHandle):
+    """Web-process view of a model whose forward passes run in the worker pool."""
+
+    backend = 'workers'
+    device = -1
+
+    def __init__(self, engine: InferenceEngine, model_key: str, model_path: str, tokenizer=None):
+        """
+        Load the tokenizer and config locally and wait for the workers to load the weights.
+
+        Args:
+            engine: The running inference engine
+            model_key: The key the model is registered under
+            model_path: Local path or HF model id
+            tokenizer: Already loaded tokenizer to share (loaded from model_path if None)
+        """
+        from transformers import AutoConfig, AutoTokenizer
+
+        self.engine = engine
+        self.model_key = model_key
+        self.model_path = str(model_path)
+        self.config = AutoConfig.from_pretrained(self.model_path)
+        self.tokenizer = tokenizer if tokenizer is not None else AutoTokenizer.from_pretrained(self.model_path)
+        self._init_explainers()
+
+        # Weights live in the workers: memory-mapped weights are shared through the page
+        # cache (one copy), anything else is held once per worker
+        replies = [future.result() for future in engine.load(model_key, self.model_path)]
+        self.param_bytes = (sum(reply['param_bytes'] for reply in replies if not reply['mmapped'])
+                            + max((reply['param_bytes'] for reply in replies if reply['mmapped']), default=0))
+
+    def predict_proba_ids(self, input_ids: List[List[int]], batch_size: int = INFERENCE_BATCH_SIZE) -> np.ndarray:
+        """Run the forward passes in the worker pool (see InferenceEngine.predict_proba_ids)."""
+        return self.engine.predict_proba_ids(
+            self.model_key, self.model_path, input_ids, len(self.config.id2label), batch_size=batch_size
+        )
@@ -0,0 +1,198 @@
+"""
+Background Jobs
+Runs long requests (prediction + SHAP + LIME) on a bounded executor so request
+threads return immediately with a job ID. Results are kept for a TTL and can be
+polled or long-polled.
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from config import JOB_WORKERS, JOB_MAX_PENDING, JOB_RESULT_TTL
+
+
+class JobQueueFullError(Exception):
+    """Raised when the job queue has no room for another job."""
+
+
+class Job:
+    """State of one background job."""
+
+    __slots__ = ('job_id', 'kind', 'status', 'result', 'error', 'created_at', 'started_at', 'finished_at')
+
+    def __init__(self, kind: str):
+        self.job_id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ('completed', 'failed')
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the job for API responses."""
+        data = {
+            'job_id': self.job_id,
+            'kind': self.kind,
+            'status': self.status,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+        if self.status == 'completed':
+            data['result'] = self.result
+        elif self.status == 'failed':
+            data['error'] = self.error
+        return data
+
+
+class JobManager:
+    """Bounded background executor with TTL-limited result storage."""
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 100, result_ttl: float = 3600):
+        """
+        Initialize the job manager.
+
+        Args:
+            max_workers: Jobs run concurrently
+            max_pending: Queued + running jobs allowed before submissions are rejected
+            result_ttl: Seconds finished jobs are kept for polling
+        """
+        self.max_workers = max(1, int(max_workers))
+        self.max_pending = max(1, int(max_pending))
+        self.result_ttl = float(result_ttl)
+
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._pending = 0
+
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+
+    def submit(self, kind: str, fn: Callable, *args, **kwargs) -> Job:
+        """
+        Queue a job.
+
+        Args:
+            kind: Job type shown to clients (e.g. 'checkDeception')
+            fn: Callable producing the JSON-serializable result
+            *args, **kwargs: Arguments for fn
+
+        Returns:
+            Job: The queued job
+
+        Raises:
+            JobQueueFullError: If max_pending jobs are already queued or running
+        """
+        self.cleanup_expired()
+        job = Job(kind)
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise JobQueueFullError(f"Job queue is full ({self.max_pending} pending jobs)")
+            self._pending += 1
+            self._submitted += 1
+            self._jobs[job.job_id] = job
+
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job: Job, fn: Callable, args, kwargs):
+        """Execute a job and publish its outcome."""
+        with self._lock:
+            job.status = 'running'
+            job.started_at = time.time()
+
+        try:
+            result = fn(*args, **kwargs)
+            error = None
+        except Exception as e:
+            print(f"❌ Job {job.job_id} ({job.kind}) failed: {str(e)}")
+            result = None
+            error = str(e)
+
+        with self._changed:
+            job.finished_at = time.time()
+            if error is None:
+                job.status = 'completed'
+                job.result = result
+                self._completed += 1
+            else:
+                job.status = 'failed'
+                job.error = error
+                self._failed += 1
+            self._pending -= 1
+            self._changed.notify_all()
+
+        print(f"{'✅' if job.status == 'completed' else '❌'} Job {job.job_id} ({job.kind}) {job.status} in {job.finished_at - job.started_at:.3f}s "
+              f"(queued {job.started_at - job.created_at:.3f}s)")
+
+    def get(self, job_id: str, wait: float = 0) -> Optional[Dict[str, Any]]:
+        """
+        Get a job's state, optionally waiting for it to finish (long-poll).
+
+        Args:
+            job_id: Job ID returned by submit
+            wait: Seconds to wait for completion (0 = return immediately)
+
+        Returns:
+            Optional[Dict]: Job state, or None if unknown or expired
+        """
+        self.cleanup_expired()
+        deadline = time.time() + max(0.0, wait)
+        with self._changed:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            while not job.done:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._changed.wait(remaining)
+            return job.to_dict()
+
+    def cleanup_expired(self) -> int:
+        """
+        Drop finished jobs older than the result TTL.
+
+        Returns:
+            int: Number of removed jobs
+        """
+        now = time.time()
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.done and now - job.finished_at > self.result_ttl]
+            for job_id in expired:
+                del self._jobs[job_id]
+        return len(expired)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue and outcome counters."""
+        with self._lock:
+            return {
+                'workers': self.max_workers,
+                'max_pending': self.max_pending,
+                'result_ttl_seconds': self.result_ttl,
+                'pending': self._pending,
+                'stored': len(self._jobs),
+                'submitted': self._submitted,
+                'completed': self._completed,
+                'failed': self._failed,
+                'rejected': self._rejected,
+            }
+
+
+# Global job manager instance
+job_manager = JobManager(max_workers=JOB_WORKERS, max_pending=JOB_MAX_PENDING, result_ttl=JOB_RESULT_TTL)
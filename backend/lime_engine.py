@@ -0,0 +1,318 @@
+"""
+Native LIME Engine
+A vectorized implementation of LIME for text (the algorithm of
+lime.lime_text.LimeTextExplainer with bag-of-words features). The text is
+tokenized once; perturbations are a NumPy word-mask matrix from which the
+perturbed input IDs are assembled directly out of per-word token spans.
+Identical masks are scored once, in length-sorted batches, and the weighted
+ridge surrogate is fitted in closed form. In adaptive mode samples are drawn
+in rounds until the explanation stops changing.
+"""
+
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import (
+    LIME_NUM_SAMPLES, LIME_KERNEL_WIDTH, LIME_MIN_SAMPLES, LIME_ROUND_SAMPLES, LIME_TOLERANCE
+)
+from text_encoding import TextEncoding
+
+# LimeTextExplainer's default split_expression r'\W+' leaves the runs of word characters as words
+WORD_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+class LimeFeatures:
+    """The words of a text and the tokens that belong to each of them."""
+
+    def __init__(self, encoding: TextEncoding):
+        """
+        Map every token of an encoding to a bag-of-words feature.
+
+        Args:
+            encoding: Encoding of the text with character offsets
+        """
+        text = encoding.text
+        occurrences = [(m.group(), m.start(), m.end()) for m in WORD_PATTERN.finditer(text)]
+
+        self.vocab = []
+        feature_ids = {}
+        occurrence_features = np.empty(len(occurrences), dtype=np.int64)
+        for i, (word, _, _) in enumerate(occurrences):
+            if word not in feature_ids:
+                feature_ids[word] = len(self.vocab)
+                self.vocab.append(word)
+            occurrence_features[i] = feature_ids[word]
+
+        # Token -> feature (-1 for special tokens and punctuation, which are never removed)
+        starts = np.array([start for _, start, _ in occurrences], dtype=np.int64)
+        ends = np.array([end for _, _, end in occurrences], dtype=np.int64)
+        self.token_features = np.full(len(encoding.input_ids), -1, dtype=np.int64)
+        for t, (token_start, token_end) in enumerate(encoding.offsets):
+            if token_end <= token_start or not len(occurrences):
+                continue
+            i = int(np.searchsorted(ends, token_start, side='right'))
+            if i < len(occurrences) and starts[i] < token_end:
+                self.token_features[t] = occurrence_features[i]
+
+        self.input_ids = np.asarray(encoding.input_ids, dtype=np.int64)
+
+    @property
+    def num_features(self) -> int:
+        return len(self.vocab)
+
+    def perturbed_ids(self, masks: np.ndarray, max_length: int) -> List[List[int]]:
+        """
+        Build the input IDs of each perturbation (a removed word drops all of its tokens).
+
+        Args:
+            masks: Boolean matrix (samples x features), True = word kept
+            max_length: Longest input the model accepts (longer rows keep their last token)
+
+        Returns:
+            List[List[int]]: Input IDs per sample
+        """
+        always = self.token_features < 0
+        keep = masks[:, np.where(always, 0, self.token_features)] | always
+        rows = []
+        for row in keep:
+            ids = self.input_ids[row]
+            if len(ids) > max_length:
+                ids = np.concatenate([ids[:max_length - 1], ids[-1:]])
+            rows.append(ids.tolist())
+        return rows
+
+
+def sample_masks(num_features: int, num_samples: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Draw LIME perturbations: the first row keeps every word, each other row
+    removes a uniformly drawn number (1..d) of distinct words.
+
+    Returns:
+        np.ndarray: Boolean matrix (samples x features), True = word kept
+    """
+    masks = np.ones((num_samples, num_features), dtype=bool)
+    if num_samples < 2:
+        return masks
+    sizes = rng.integers(1, num_features + 1, num_samples - 1)
+    # Random ranks per row; a row removes the words whose rank is below its size
+    ranks = np.argsort(rng.random((num_samples - 1, num_features)), axis=1).argsort(axis=1)
+    masks[1:] = ranks >= sizes[:, None]
+    return masks
+
+
+def kernel_weights(masks: np.ndarray, kernel_width: float = LIME_KERNEL_WIDTH) -> np.ndarray:
+    """Exponential kernel on the cosine distance (x100) of each mask to the original text."""
+    kept = masks.sum(axis=1)
+    cosine = kept / np.sqrt(np.maximum(kept, 1) * masks.shape[1])
+    distances = (1.0 - cosine) * 100
+    return np.sqrt(np.exp(-(distances ** 2) / kernel_width ** 2))
+
+
+def weighted_ridge(X: np.ndarray, y: np.ndarray, weights: np.ndarray, alpha: float = 1.0) -> Tuple[np.ndarray, float]:
+    """
+    Weighted ridge regression with an unpenalized intercept, in closed form
+    (same solution as sklearn's Ridge with sample_weight).
+
+    Returns:
+        tuple: (coefficients, intercept)
+    """
+    total = weights.sum()
+    x_mean = weights @ X / total
+    y_mean = weights @ y / total
+    Xc = X - x_mean
+    yc = y - y_mean
+    Xw = Xc * weights[:, None]
+    gram = Xc.T @ Xw + alpha * np.eye(X.shape[1])
+    coef = np.linalg.lstsq(gram, Xw.T @ yc, rcond=None)[0]
+    return coef, float(y_mean - x_mean @ coef)
+
+
+def _weighted_r2(X: np.ndarray, y: np.ndarray, weights: np.ndarray, coef: np.ndarray, intercept: float) -> float:
+    """Weighted coefficient of determination of a linear fit."""
+    residual = weights @ (y - X @ coef - intercept) ** 2
+    y_mean = weights @ y / weights.sum()
+    total = weights @ (y - y_mean) ** 2
+    return 1.0 - residual / total if total > 0 else 0.0
+
+
+def select_features(X: np.ndarray, y: np.ndarray, weights: np.ndarray, num_features: int) -> List[int]:
+    """
+    LIME's 'auto' feature selection: forward selection for up to 6 features,
+    else the largest coefficients of a lightly regularized fit.
+    """
+    if num_features >= X.shape[1]:
+        return list(range(X.shape[1]))
+
+    if num_features <= 6:
+        selected = []
+        for _ in range(num_features):
+            best, best_score = None, -np.inf
+            for feature in range(X.shape[1]):
+                if feature in selected:
+                    continue
+                columns = selected + [feature]
+                coef, intercept = weighted_ridge(X[:, columns], y, weights, alpha=0.0)
+                score = _weighted_r2(X[:, columns], y, weights, coef, intercept)
+                if score > best_score:
+                    best, best_score = feature, score
+            selected.append(best)
+        return selected
+
+    coef, _ = weighted_ridge(X, y, weights, alpha=0.01)
+    return [int(i) for i in np.argsort(-np.abs(coef * X[0]), kind='stable')[:num_features]]
+
+
+class MaskScorer:
+    """Scores perturbation masks, running each distinct mask through the model once."""
+
+    def __init__(self, loaded_model, features: LimeFeatures, column: int, batch_size: int):
+        """
+        Args:
+            loaded_model: Served model
+            features: Words and token spans of the text
+            column: Probability column of the explained class
+            batch_size: Texts per forward pass
+        """
+        self.loaded_model = loaded_model
+        self.features = features
+        self.column = column
+        self.batch_size = batch_size
+        tokenizer = loaded_model.tokenizer
+        self.max_length = tokenizer.model_max_length if tokenizer.model_max_length < 100000 else 512
+        self._scores = {}
+
+    @property
+    def distinct(self) -> int:
+        """Distinct masks scored so far (forward-pass rows)."""
+        return len(self._scores)
+
+    def score(self, masks: np.ndarray) -> np.ndarray:
+        """Probability of the explained class for each mask (new distinct masks in one batched call)."""
+        unique_masks, inverse = np.unique(masks, axis=0, return_inverse=True)
+        keys = [row.tobytes() for row in np.packbits(unique_masks, axis=1)]
+        missing = [i for i, key in enumerate(keys) if key not in self._scores]
+        if missing:
+            input_ids = self.features.perturbed_ids(unique_masks[missing], self.max_length)
+            probs = self.loaded_model.predict_proba_ids(input_ids, batch_size=self.batch_size)[:, self.column]
+            self._scores.update((keys[i], float(p)) for i, p in zip(missing, probs))
+        return np.array([self._scores[key] for key in keys])[inverse.reshape(-1)]
+
+
+def fit_surrogate(masks: np.ndarray, y: np.ndarray, num_features: int) -> List[Tuple[int, float]]:
+    """
+    Fit LIME's weighted linear surrogate.
+
+    Returns:
+        List[Tuple[int, float]]: (feature, weight) sorted by |weight|
+    """
+    X = masks.astype(np.float64)
+    weights = kernel_weights(masks)
+    selected = select_features(X, y, weights, num_features)
+    coef, _ = weighted_ridge(X[:, selected], y, weights, alpha=1.0)
+    return sorted(((int(f), float(w)) for f, w in zip(selected, coef)), key=lambda item: -abs(item[1]))
+
+
+def compare_fits(previous: List[Tuple[int, float]], current: List[Tuple[int, float]], top_k: int,
+                 tolerance: float) -> Tuple[float, bool]:
+    """
+    Compare two surrogate fits.
+
+    The stability score is the overlap of the top-k features (Jaccard) times
+    one minus the largest top-k weight change relative to the largest weight.
+
+    Returns:
+        tuple: (stability in [0, 1], converged - same top-k ranking and every
+            top-k weight within tolerance)
+    """
+    previous_top = [f for f, _ in previous[:top_k]]
+    current_top = [f for f, _ in current[:top_k]]
+    overlap = len(set(previous_top) & set(current_top)) / max(1, len(set(previous_top) | set(current_top)))
+
+    previous_weights = dict(previous)
+    scale = max((abs(w) for _, w in current), default=0.0) or 1e-12
+    change = max((abs(w - previous_weights.get(f, 0.0)) for f, w in current[:top_k]), default=0.0) / scale
+
+    stability = overlap * max(0.0, 1.0 - change)
+    return stability, previous_top == current_top and change <= tolerance
+
+
+def explain(loaded_model, encoding: TextEncoding, label_mapping=None, num_features: Optional[int] = None,
+            num_samples: int = LIME_NUM_SAMPLES, seed: Optional[int] = None, batch_size: Optional[int] = None,
+            adaptive: bool = False, min_samples: int = LIME_MIN_SAMPLES, round_samples: int = LIME_ROUND_SAMPLES,
+            tolerance: float = LIME_TOLERANCE) -> Optional[Dict[str, Any]]:
+    """
+    Explain a prediction with LIME, scoring perturbed token IDs directly.
+
+    Like LimeTextExplainer.explain_instance, the explained class is CLASS_NAMES[1].
+    In adaptive mode perturbations are drawn in rounds and the surrogate is
+    refitted after each round until the top-k ranking and weights stop changing
+    (or num_samples is reached).
+
+    Args:
+        loaded_model: Served model (LoadedModel or RemoteModel)
+        encoding: Encoding of the text with character offsets
+        label_mapping: Mapping from model labels to CLASS_NAMES
+        num_features: Words to return (None = every word)
+        num_samples: Perturbations including the original text (the maximum in adaptive mode)
+        seed: Random seed (None = non-deterministic)
+        batch_size: Texts per forward pass (None = the model's explainer_batch_size)
+        adaptive: Stop early once the explanation is stable
+        min_samples: Perturbations drawn before convergence is checked (adaptive mode)
+        round_samples: Perturbations added per round (adaptive mode)
+        tolerance: Largest top-k weight change, relative to the largest weight, that counts as converged
+
+    Returns:
+        Optional[Dict]: 'words' ((word, weight) sorted by |weight|), 'samples' used,
+            'distinct_samples' scored by the model, 'stability' (see compare_fits;
+            in fixed mode the first half of the samples is compared with all of
+            them) and 'converged' - or None when the tokenizer reports no offsets
+            (use the lime package instead)
+    """
+    if encoding.offsets is None:
+        return None
+
+    start_time = time.time()
+    features = LimeFeatures(encoding)
+    if features.num_features == 0:
+        return {'words': [], 'samples': 0, 'distinct_samples': 0, 'stability': 1.0, 'converged': True}
+
+    num_features = min(num_features or features.num_features, features.num_features)
+    top_k = min(num_features, 10)
+    column = int(loaded_model.class_columns(label_mapping)[1])
+    scorer = MaskScorer(loaded_model, features, column, batch_size or loaded_model.explainer_batch_size)
+    rng = np.random.default_rng(seed)
+
+    if adaptive:
+        masks = sample_masks(features.num_features, min(min_samples, num_samples), rng)
+        y = scorer.score(masks)
+        current = fit_surrogate(masks, y, num_features)
+        stability, converged = 0.0, False
+        while len(masks) < num_samples:
+            # sample_masks always starts with the original text; drop that row
+            new_masks = sample_masks(features.num_features, min(round_samples, num_samples - len(masks)) + 1, rng)[1:]
+            masks = np.concatenate([masks, new_masks])
+            y = np.concatenate([y, scorer.score(new_masks)])
+            previous, current = current, fit_surrogate(masks, y, num_features)
+            stability, converged = compare_fits(previous, current, top_k, tolerance)
+            if converged:
+                break
+    else:
+        masks = sample_masks(features.num_features, num_samples, rng)
+        y = scorer.score(masks)
+        current = fit_surrogate(masks, y, num_features)
+        half = max(2, len(masks) // 2)
+        stability, converged = compare_fits(fit_surrogate(masks[:half], y[:half], num_features), current,
+                                            top_k, tolerance)
+
+    print(f"🧮 Native LIME: {features.num_features} words, {len(masks)} samples ({scorer.distinct} distinct), "
+          f"stability {stability:.3f}{' (converged)' if converged else ''} in {time.time() - start_time:.2f}s")
+    return {
+        'words': [(features.vocab[f], w) for f, w in current],
+        'samples': int(len(masks)),
+        'distinct_samples': scorer.distinct,
+        'stability': float(stability),
+        'converged': bool(converged),
+    }
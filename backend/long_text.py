@@ -0,0 +1,211 @@
+"""
+Long-Text Scoring
+Splits documents longer than the model limit into overlapping token windows,
+scores the uncached windows in one batched forward pass and aggregates the
+window probabilities into a single prediction.
+"""
+
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import (
+    LABEL_MAPPING, LONG_TEXT_MAX_CHARS, LONG_TEXT_WINDOW_TOKENS, LONG_TEXT_STRIDE,
+    LONG_TEXT_MAX_WINDOWS, LONG_TEXT_AGGREGATION
+)
+from ai_utils import get_loaded_model, get_token_probs
+from security import MAX_TEXT_LENGTH
+
+AGGREGATIONS = ('mean', 'max_deceptive', 'length_weighted')
+
+
+class LongTextError(ValueError):
+    """Raised when a text needs more windows than LONG_TEXT_MAX_WINDOWS."""
+
+
+def parse_long_text_options(options: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Read the long-text options of a request.
+
+    Args:
+        options: Request body (or its params) with optional 'long_text',
+            'aggregation' and 'stride' fields
+
+    Returns:
+        tuple: (options, error_message) - options is None when long-text mode is off
+    """
+    if not options.get('long_text', False):
+        return None, None
+
+    aggregation = options.get('aggregation') or LONG_TEXT_AGGREGATION
+    if aggregation not in AGGREGATIONS:
+        return None, f"aggregation must be one of: {', '.join(AGGREGATIONS)}"
+
+    stride = options.get('stride', LONG_TEXT_STRIDE)
+    if not isinstance(stride, int) or isinstance(stride, bool) or stride < 0 or stride >= LONG_TEXT_WINDOW_TOKENS // 2:
+        return None, f"stride must be an integer between 0 and {LONG_TEXT_WINDOW_TOKENS // 2 - 1}"
+
+    return {'aggregation': aggregation, 'stride': stride}, None
+
+
+def get_text_limit(options: Dict[str, Any]) -> int:
+    """Character limit for validate_text_input (raised in long-text mode)."""
+    return LONG_TEXT_MAX_CHARS if options.get('long_text', False) else MAX_TEXT_LENGTH
+
+
+def add_special_tokens(tokenizer, token_ids: List[int]) -> List[int]:
+    """Wrap content token IDs in the model's special tokens (e.g. [CLS] ... [SEP])."""
+    build_inputs = getattr(tokenizer, 'build_inputs_with_special_tokens', None)
+    if build_inputs is not None:
+        return build_inputs(token_ids)
+    # transformers 5 fast tokenizers dropped build_inputs_with_special_tokens; every
+    # supported family (BERT, RoBERTa, DeBERTa, ALBERT, DistilBERT) uses <cls> ... <sep>
+    if tokenizer.cls_token_id is not None and tokenizer.sep_token_id is not None:
+        return [tokenizer.cls_token_id] + list(token_ids) + [tokenizer.sep_token_id]
+    return list(token_ids)
+
+
+def split_windows(tokenizer, text: str, window_tokens: int = LONG_TEXT_WINDOW_TOKENS,
+                  stride: int = LONG_TEXT_STRIDE) -> List[Dict[str, Any]]:
+    """
+    Split a text into overlapping token windows.
+
+    Args:
+        tokenizer: The model's tokenizer
+        text: Text to split
+        window_tokens: Tokens per window, including special tokens
+        stride: Tokens shared by consecutive windows
+
+    Returns:
+        List[Dict]: Windows with 'input_ids', 'token_start', 'token_end' and
+            'text' (the window's span of the original text when the tokenizer
+            reports offsets, else the decoded tokens)
+    """
+    try:
+        encoding = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+        offsets = encoding['offset_mapping']
+    except NotImplementedError:
+        # Slow tokenizers have no offset mapping
+        encoding = tokenizer(text, add_special_tokens=False)
+        offsets = None
+    token_ids = encoding['input_ids']
+
+    content_tokens = window_tokens - tokenizer.num_special_tokens_to_add()
+    step = max(1, content_tokens - stride)
+
+    windows = []
+    start = 0
+    while True:
+        end = min(start + content_tokens, len(token_ids))
+        chunk = token_ids[start:end]
+        if offsets is not None and chunk:
+            window_text = text[offsets[start][0]:offsets[end - 1][1]]
+        else:
+            window_text = tokenizer.decode(chunk)
+        windows.append({
+            'input_ids': add_special_tokens(tokenizer, chunk),
+            'token_start': start,
+            'token_end': end,
+            'text': window_text,
+        })
+        if end >= len(token_ids):
+            return windows
+        start += step
+
+
+def aggregate_window_probs(probs: np.ndarray, lengths: List[int], aggregation: str,
+                           deceptive_index: int) -> Tuple[np.ndarray, int]:
+    """
+    Combine per-window probabilities into one distribution.
+
+    Args:
+        probs: Probabilities per window (windows x labels)
+        lengths: Content tokens per window
+        aggregation: 'mean', 'max_deceptive' (the most deceptive window decides)
+            or 'length_weighted' (mean weighted by window length)
+        deceptive_index: Column of the deceptive label
+
+    Returns:
+        tuple: (probabilities, decisive_window) - the decisive window is the one
+            most confident in the aggregated label
+    """
+    if aggregation == 'max_deceptive':
+        aggregated = probs[int(np.argmax(probs[:, deceptive_index]))]
+    elif aggregation == 'length_weighted':
+        aggregated = np.average(probs, axis=0, weights=np.asarray(lengths, dtype=np.float64))
+    else:
+        aggregated = probs.mean(axis=0)
+
+    decisive_window = int(np.argmax(probs[:, int(np.argmax(aggregated))]))
+    return aggregated, decisive_window
+
+
+def score_long_text(model_key: str, text: str, aggregation: str = LONG_TEXT_AGGREGATION,
+                    stride: int = LONG_TEXT_STRIDE, label_mapping=LABEL_MAPPING) -> Dict[str, Any]:
+    """
+    Score a text of any length with overlapping windows in one batched pass.
+
+    Args:
+        model_key: Key for the model
+        text: Validated text
+        aggregation: Window aggregation strategy (see aggregate_window_probs)
+        stride: Tokens shared by consecutive windows
+        label_mapping: Mapping from model labels to response labels
+
+    Returns:
+        Dict: 'prediction', 'confidence', 'aggregation', 'token_count',
+            'decisive_window' (index), 'decisive_text' and 'windows' (per-window
+            token range, prediction, confidence and deceptive score)
+
+    Raises:
+        LongTextError: If the text needs more than LONG_TEXT_MAX_WINDOWS windows
+    """
+    start_time = time.time()
+    loaded_model = get_loaded_model(model_key)
+    windows = split_windows(loaded_model.tokenizer, text, stride=stride)
+    if len(windows) > LONG_TEXT_MAX_WINDOWS:
+        raise LongTextError(f"Text needs {len(windows)} windows, but the limit is {LONG_TEXT_MAX_WINDOWS}. "
+                         f"Please reduce text length.")
+
+    # Through the prediction cache and micro-batcher, so a resubmitted document is not re-scored
+    probs = get_token_probs(model_key, [window['input_ids'] for window in windows])
+
+    id2label = loaded_model.config.id2label
+    labels = [label_mapping.get(str(id2label[i]), str(id2label[i])) for i in range(probs.shape[1])]
+    deceptive_index = labels.index('deceptive') if 'deceptive' in labels else 0
+
+    lengths = [window['token_end'] - window['token_start'] for window in windows]
+    aggregated, decisive_window = aggregate_window_probs(probs, lengths, aggregation, deceptive_index)
+    label_index = int(np.argmax(aggregated))
+
+    window_results = []
+    for index, (window, row) in enumerate(zip(windows, probs)):
+        window_label = int(np.argmax(row))
+        window_results.append({
+            'index': index,
+            'token_start': window['token_start'],
+            'token_end': window['token_end'],
+            'prediction': labels[window_label],
+            'confidence': float(row[window_label]),
+            'deceptive_score': float(row[deceptive_index]),
+        })
+
+    end_time = time.time()
+    print(f"📜 Long-text prediction in {end_time - start_time:.3f}s - Model: {model_key}, "
+          f"Windows: {len(windows)}, Tokens: {windows[-1]['token_end']}, Aggregation: {aggregation}")
+
+    return {
+        'prediction': labels[label_index],
+        'confidence': float(aggregated[label_index]),
+        'aggregation': aggregation,
+        'token_count': windows[-1]['token_end'],
+        'decisive_window': decisive_window,
+        'decisive_text': windows[decisive_window]['text'],
+        'windows': window_results,
+    }
+
+
+def long_text_details(result: Dict[str, Any]) -> Dict[str, Any]:
+    """The window details of a score_long_text result, as returned under 'long_text' in responses."""
+    return {key: result[key] for key in ('aggregation', 'token_count', 'decisive_window', 'windows')}
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Serving Model Manager
+Command-line utility for preparing models for serving (ONNX exports, int8
+quantized variants, safetensors conversion, early-exit heads, parity and
+accuracy checks).
+"""
+
+import sys
+import argparse
+from typing import List
+from config import AVAILABLE_MODELS, CUSTOM_MODELS_DIR
+from model_utils import get_model_path, is_artifact_current
+from onnx_backend import export_onnx, check_parity, is_export_current, is_onnxruntime_available
+from mmap_weights import ensure_safetensors, get_safetensors_path
+from quantization import build_quantized, compare_with_fp32, get_quantized_path, is_quantization_enabled
+from early_exit import (
+    train_early_exit, format_report, get_heads_path, get_early_exit_threshold, DEFAULT_THRESHOLDS
+)
+
+
+def resolve_model_keys(args) -> List[str]:
+    """Resolve the model keys selected on the command line."""
+    keys = list(args.models or [])
+    if args.all:
+        keys.extend(AVAILABLE_MODELS.keys())
+    if args.custom and CUSTOM_MODELS_DIR.exists():
+        keys.extend(f"custom_{d.name}" for d in sorted(CUSTOM_MODELS_DIR.iterdir())
+                    if (d / 'model').is_dir())
+    return list(dict.fromkeys(keys))
+
+
+def cmd_status(args):
+    """Show the ONNX and int8 artifact status of every model."""
+    print("🔍 Serving Model Status")
+    print("=" * 50)
+    print(f"onnxruntime installed: {'yes' if is_onnxruntime_available() else 'no'}")
+    print("✅ = current artifact, ⚪ = missing or stale (run convert-safetensors for missing safetensors)")
+    print()
+
+    args.all, args.custom, args.models = True, True, []
+    for model_key in resolve_model_keys(args):
+        try:
+            model_path = get_model_path(model_key)
+            onnx_status = "✅ onnx" if is_export_current(model_path) else "⚪ onnx"
+            int8_status = "✅ int8" if is_artifact_current(get_quantized_path(model_path), model_path) else "⚪ int8"
+            served = " (serving int8)" if is_quantization_enabled(model_key) else ""
+            st_status = "✅ safetensors" if get_safetensors_path(model_path).exists() else "⚪ safetensors"
+            exit_status = "✅ exit" if is_artifact_current(get_heads_path(model_path), model_path) else "⚪ exit"
+            threshold = get_early_exit_threshold(model_key)
+            served += f" (early exit at {threshold:g})" if threshold is not None else ""
+            status = f"{onnx_status}  {int8_status}  {st_status}  {exit_status}{served}"
+        except Exception as e:
+            status = f"❌ {str(e)}"
+        print(f"  {model_key:<30} {status}")
+
+
+def cmd_export(args):
+    """Export models to ONNX."""
+    failures = 0
+    for model_key in resolve_model_keys(args):
+        try:
+            export_onnx(get_model_path(model_key), force=args.force)
+        except Exception as e:
+            print(f"❌ Export failed for {model_key}: {str(e)}")
+            failures += 1
+    return failures
+
+
+def cmd_parity(args):
+    """Compare ONNX Runtime outputs with PyTorch."""
+    failures = 0
+    for model_key in resolve_model_keys(args):
+        try:
+            result = check_parity(get_model_path(model_key), atol=args.atol)
+        except Exception as e:
+            print(f"❌ Parity check failed for {model_key}: {str(e)}")
+            failures += 1
+            continue
+
+        status = "✅" if result['passed'] else "❌"
+        print(f"{status} {model_key}: max |Δp| = {result['max_abs_diff']:.2e}, "
+              f"label agreement = {result['label_agreement']:.0%}")
+        if not result['passed']:
+            failures += 1
+    return failures
+
+
+def cmd_quantize(args):
+    """Build int8 quantized variants."""
+    failures = 0
+    for model_key in resolve_model_keys(args):
+        try:
+            build_quantized(get_model_path(model_key), force=args.force)
+        except Exception as e:
+            print(f"❌ Quantization failed for {model_key}: {str(e)}")
+            failures += 1
+    return failures
+
+
+def cmd_convert(args):
+    """Convert pytorch_model.bin weights to safetensors for memory-mapped loading."""
+    failures = 0
+    for model_key in resolve_model_keys(args):
+        try:
+            if ensure_safetensors(get_model_path(model_key)) is None:
+                print(f"⚠️ {model_key}: no local pytorch_model.bin or model.safetensors to convert")
+            else:
+                print(f"✅ {model_key}: {get_safetensors_path(get_model_path(model_key))}")
+        except Exception as e:
+            print(f"❌ Conversion failed for {model_key}: {str(e)}")
+            failures += 1
+    return failures
+
+
+def cmd_quantize_report(args):
+    """Report the accuracy delta of the int8 variants on a held-out CSV."""
+    failures = 0
+    for model_key in resolve_model_keys(args):
+        try:
+            report = compare_with_fp32(get_model_path(model_key), args.csv,
+                                       batch_size=args.batch_size, max_rows=args.max_rows)
+        except Exception as e:
+            print(f"❌ Report failed for {model_key}: {str(e)}")
+            failures += 1
+            continue
+
+        passed = report['accuracy_delta'] >= -args.max_drop
+        status = "✅" if passed else "❌"
+        speedup = f"{report['speedup']:.2f}x" if report['speedup'] else "n/a"
+        print(f"{status} {model_key} ({report['rows']} rows)")
+        print(f"   Accuracy: fp32 {report['fp32_accuracy']:.4f} -> int8 {report['int8_accuracy']:.4f} "
+              f"(Δ {report['accuracy_delta']:+.4f})")
+        print(f"   Label agreement: {report['label_agreement']:.2%}, "
+              f"max |Δp| = {report['max_abs_prob_diff']:.4f}, mean |Δp| = {report['mean_abs_prob_diff']:.4f}")
+        print(f"   Latency: {report['fp32_ms_per_text']:.1f} -> {report['int8_ms_per_text']:.1f} ms/text ({speedup})")
+        print(f"   Size: {report['fp32_size_mb']:.0f} MB -> {report['int8_size_mb']:.0f} MB")
+        if not passed:
+            failures += 1
+    return failures
+
+
+def cmd_early_exit(args):
+    """Train early-exit heads on a labeled CSV and report accuracy/latency per threshold."""
+    import pandas as pd
+    from sklearn.model_selection import train_test_split
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+    from gpu_utils import get_torch_device
+
+    df = pd.read_csv(args.csv, nrows=args.max_rows)
+    if 'text' not in df.columns or 'label' not in df.columns:
+        print("❌ CSV must contain 'text' and 'label' columns")
+        return 1
+    label_mapping = {'deceptive': 0, '0': 0, 0: 0, 'truthful': 1, '1': 1, 1: 1}
+    df['label'] = df['label'].map(label_mapping)
+    df = df.dropna(subset=['text', 'label'])
+    train_texts, val_texts, train_labels, val_labels = train_test_split(
+        df['text'].astype(str).tolist(), df['label'].astype(int).tolist(),
+        test_size=args.validation_split, random_state=42, stratify=df['label']
+    )
+
+    layers = [int(layer) for layer in args.layers.split(',')] if args.layers else None
+    thresholds = [float(t) for t in args.thresholds.split(',')] if args.thresholds else DEFAULT_THRESHOLDS
+
+    failures = 0
+    for model_key in resolve_model_keys(args):
+        try:
+            model_path = get_model_path(model_key)
+            tokenizer = AutoTokenizer.from_pretrained(model_path)
+            model = AutoModelForSequenceClassification.from_pretrained(model_path).to(get_torch_device())
+            report = train_early_exit(model, tokenizer, model_path, train_texts, train_labels, val_texts, val_labels,
+                                      layers=layers, thresholds=thresholds,
+                                      latency_samples=args.latency_samples, max_drop=args.max_drop)
+        except Exception as e:
+            print(f"❌ Early-exit training failed for {model_key}: {str(e)}")
+            failures += 1
+            continue
+
+        recommended = report['recommended_threshold']
+        status = "✅" if recommended is not None else "⚠️"
+        print(f"{status} {model_key}")
+        for line in format_report(report):
+            print(line)
+        if recommended is not None:
+            print(f"   Serve with: EARLY_EXIT_THRESHOLDS={model_key}={recommended:g}")
+        else:
+            print(f"   No threshold stays within {args.max_drop} of the full model's accuracy")
+    return failures
+
+
+def main():
+    """Main CLI interface."""
+    parser = argparse.ArgumentParser(
+        description="Prepare models for serving",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python manage_serving_models.py status                  # Show artifact status
+  python manage_serving_models.py export-onnx --all       # Export all pretrained models
+  python manage_serving_models.py export-onnx --custom    # Export all custom models
+  python manage_serving_models.py parity covid --atol 1e-4 # Check ONNX vs PyTorch outputs
+  python manage_serving_models.py quantize --all          # Build int8 variants
+  python manage_serving_models.py convert-safetensors --all --custom  # Prepare memory-mapped loading
+  python manage_serving_models.py quantize-report covid --csv heldout.csv  # Int8 accuracy delta
+  python manage_serving_models.py early-exit bert-covid-1 --csv covid.csv  # Train exit heads + threshold report
+        """
+    )
+
+    subparsers = parser.add_subparsers(dest='command', help='Available commands')
+
+    # Status command
+    subparsers.add_parser('status', help='Show ONNX and int8 artifact status')
+
+    # Model commands share the model selection arguments
+    for name, help_text in (('export-onnx', 'Export models to ONNX'),
+                            ('parity', 'Check ONNX Runtime outputs against PyTorch'),
+                            ('quantize', 'Build dynamically quantized int8 variants'),
+                            ('convert-safetensors', 'Convert pytorch_model.bin to safetensors for mmap loading'),
+                            ('quantize-report', 'Compare int8 variants with fp32 on a held-out CSV'),
+                            ('early-exit', 'Train early-exit heads and report accuracy/latency per threshold')):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument('models', nargs='*', help='Model keys (e.g. covid, custom_AB12CD)')
+        sub.add_argument('--all', action='store_true', help='Include all pretrained models')
+        sub.add_argument('--custom', action='store_true', help='Include all custom models')
+        if name in ('export-onnx', 'quantize'):
+            sub.add_argument('--force', action='store_true', help='Rebuild even if a current artifact exists')
+        elif name == 'parity':
+            sub.add_argument('--atol', type=float, default=1e-3, help='Maximum allowed probability difference')
+        elif name == 'quantize-report':
+            sub.add_argument('--csv', required=True, help='Held-out CSV with text and label columns')
+            sub.add_argument('--max-rows', type=int, default=None, help='Only use the first N rows')
+            sub.add_argument('--batch-size', type=int, default=32, help='Texts per forward pass')
+            sub.add_argument('--max-drop', type=float, default=0.01,
+                             help='Maximum allowed accuracy drop before the command fails')
+        elif name == 'early-exit':
+            sub.add_argument('--csv', required=True, help='Labeled CSV with text and label columns (e.g. the training CSV)')
+            sub.add_argument('--max-rows', type=int, default=None, help='Only use the first N rows')
+            sub.add_argument('--validation-split', type=float, default=0.2, help='Rows held out for the report')
+            sub.add_argument('--layers', default=None, help='Comma-separated exit layers (default: every second layer)')
+            sub.add_argument('--thresholds', default=None, help='Comma-separated thresholds to report')
+            sub.add_argument('--latency-samples', type=int, default=64, help='Held-out texts timed per threshold')
+            sub.add_argument('--max-drop', type=float, default=0.005,
+                             help='Accuracy the recommended threshold may give up against the full model')
+
+    args = parser.parse_args()
+
+    if not args.command:
+        parser.print_help()
+        return
+
+    if args.command == 'status':
+        cmd_status(args)
+        return
+
+    if not resolve_model_keys(args):
+        parser.error("no models selected (pass model keys, --all or --custom)")
+
+    command_functions = {
+        'export-onnx': cmd_export,
+        'parity': cmd_parity,
+        'quantize': cmd_quantize,
+        'convert-safetensors': cmd_convert,
+        'quantize-report': cmd_quantize_report,
+        'early-exit': cmd_early_exit
+    }
+
+    failures = command_functions[args.command](args)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
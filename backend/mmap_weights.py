@@ -0,0 +1,222 @@
+"""
+Memory-Mapped Model Weights
+Loads model weights straight from memory-mapped safetensors files so every
+process on a host shares one copy through the page cache, and reports how much
+of each mapped model is shared vs private per process.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+import torch
+
+SAFETENSORS_FILENAME = 'model.safetensors'
+PYTORCH_BIN_FILENAME = 'pytorch_model.bin'
+
+# safetensors dtype -> (numpy storage dtype, torch dtype)
+_DTYPES = {
+    'F64': (np.float64, torch.float64),
+    'F32': (np.float32, torch.float32),
+    'F16': (np.float16, torch.float16),
+    'BF16': (np.uint16, torch.bfloat16),  # numpy has no bfloat16; reinterpret the bits
+    'I64': (np.int64, torch.int64),
+    'I32': (np.int32, torch.int32),
+    'I16': (np.int16, torch.int16),
+    'I8': (np.int8, torch.int8),
+    'U8': (np.uint8, torch.uint8),
+    'BOOL': (np.bool_, torch.bool),
+}
+
+
+def get_safetensors_path(model_path: str) -> Path:
+    """Get the path of a local model's safetensors weights."""
+    return Path(model_path) / SAFETENSORS_FILENAME
+
+
+def ensure_safetensors(model_path: str) -> Optional[Path]:
+    """
+    Make sure a local model has safetensors weights, converting pytorch_model.bin once.
+
+    Run by the trainer and by `manage_serving_models.py convert-safetensors`,
+    never on the serving path. The original .bin file is kept; transformers prefers the safetensors file
+    when both exist. The new file takes the .bin file's modification time so
+    existing ONNX and int8 artifacts still count as current.
+
+    Args:
+        model_path: Local model directory
+
+    Returns:
+        Optional[Path]: The safetensors file, or None if the model has neither format
+    """
+    model_dir = Path(model_path)
+    bin_path = model_dir / PYTORCH_BIN_FILENAME
+    safetensors_path = get_safetensors_path(model_path)
+    if safetensors_path.exists():
+        return safetensors_path
+    if not bin_path.exists():
+        return None
+
+    from transformers import AutoModelForSequenceClassification
+
+    print(f"🔄 Converting {model_dir.name} weights to safetensors...")
+    start_time = time.time()
+    model = AutoModelForSequenceClassification.from_pretrained(str(model_dir))
+
+    # save_pretrained handles tied/shared tensors; only the weights file is moved in,
+    # so config and tokenizer files stay untouched
+    tmp_dir = tempfile.mkdtemp(dir=str(model_dir), prefix='.convert-')
+    try:
+        model.save_pretrained(tmp_dir, safe_serialization=True)
+        converted_path = Path(tmp_dir) / SAFETENSORS_FILENAME
+        bin_stat = bin_path.stat()
+        os.utime(converted_path, ns=(bin_stat.st_atime_ns, bin_stat.st_mtime_ns))
+        os.replace(converted_path, safetensors_path)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print(f"✅ Converted {model_dir.name} to safetensors in {time.time() - start_time:.2f}s")
+    return safetensors_path
+
+
+def mmap_state_dict(safetensors_path: Path) -> Dict[str, torch.Tensor]:
+    """
+    Map a safetensors file and return tensors that view the mapping (no copy).
+
+    The file is mapped copy-on-write: pages stay shared through the page cache
+    until a process writes to them, which inference never does.
+
+    Args:
+        safetensors_path: Path to a .safetensors file
+
+    Returns:
+        Dict[str, torch.Tensor]: Tensors backed by the mapped file
+    """
+    with open(safetensors_path, 'rb') as f:
+        header_size = int.from_bytes(f.read(8), 'little')
+        header = json.loads(f.read(header_size))
+
+    data = np.memmap(safetensors_path, dtype=np.uint8, mode='c')
+    data_start = 8 + header_size
+
+    state_dict = {}
+    for name, info in header.items():
+        if name == '__metadata__':
+            continue
+        if info['dtype'] not in _DTYPES:
+            raise ValueError(f"Unsupported safetensors dtype {info['dtype']} for {name}")
+        np_dtype, torch_dtype = _DTYPES[info['dtype']]
+        start, end = info['data_offsets']
+        array = data[data_start + start:data_start + end].view(np_dtype).reshape(info['shape'])
+        tensor = torch.from_numpy(array)
+        if torch_dtype == torch.bfloat16:
+            tensor = tensor.view(torch.bfloat16)
+        state_dict[name] = tensor
+    return state_dict
+
+
+def load_mmap_model(model_path: str):
+    """
+    Build a sequence-classification model whose weights view a mapped safetensors file.
+
+    Args:
+        model_path: Local model directory
+
+    Returns:
+        The model in eval mode, or None if the model cannot be memory-mapped
+        (callers fall back to from_pretrained)
+    """
+    # Converting here would write into the model directory on the request path and change
+    # its fingerprint, so models still on pytorch_model.bin are loaded the regular way
+    safetensors_path = get_safetensors_path(model_path)
+    if not safetensors_path.exists():
+        print(f"ℹ️ {Path(model_path).name} has no {SAFETENSORS_FILENAME}, loading without memory mapping "
+              f"(convert with: python manage_serving_models.py convert-safetensors)")
+        return None
+
+    from transformers import AutoConfig, AutoModelForSequenceClassification
+
+    config = AutoConfig.from_pretrained(str(model_path))
+    try:
+        from transformers.modeling_utils import no_init_weights
+    except ImportError:
+        no_init_weights = None
+
+    # Skip random initialisation: every parameter is replaced by a mapped tensor below
+    if no_init_weights is not None:
+        with no_init_weights():
+            model = AutoModelForSequenceClassification.from_config(config)
+    else:
+        model = AutoModelForSequenceClassification.from_config(config)
+
+    state_dict = mmap_state_dict(safetensors_path)
+    try:
+        missing, _ = model.load_state_dict(state_dict, strict=False, assign=True)
+    except TypeError:
+        # load_state_dict(assign=...) needs torch>=2.1; copying would defeat the mapping
+        print(f"⚠️ torch {torch.__version__} cannot assign mapped weights, loading without memory mapping")
+        return None
+    model.tie_weights()
+
+    tied = set(getattr(model, '_tied_weights_keys', None) or [])
+    missing = [key for key in missing if key not in tied]
+    if missing:
+        print(f"⚠️ {Path(model_path).name}: {len(missing)} weights missing from {SAFETENSORS_FILENAME}, "
+              f"loading without memory mapping")
+        return None
+
+    model.eval()
+    return model
+
+
+def _read_smaps(pid) -> Dict[str, Dict[str, int]]:
+    """Sum Rss/Pss/Shared/Private kB per mapped file from /proc/<pid>/smaps."""
+    files = {}
+    current = None
+    try:
+        with open(f'/proc/{pid}/smaps', 'r') as f:
+            for line in f:
+                fields = line.split()
+                if not fields:
+                    continue
+                if '-' in fields[0] and len(fields) >= 5:
+                    # Mapping header: address perms offset dev inode [path]
+                    current = files.setdefault(fields[5], {}) if len(fields) >= 6 else None
+                elif current is not None and fields[0].endswith(':') and len(fields) >= 2 and fields[1].isdigit():
+                    key = fields[0][:-1]
+                    current[key] = current.get(key, 0) + int(fields[1])
+    except OSError:
+        return {}
+    return files
+
+
+def get_mapped_weights_memory(model_paths: Dict[str, str], pid='self') -> Dict[str, Dict[str, float]]:
+    """
+    Report shared vs private memory of each model's mapped weights in one process.
+
+    Args:
+        model_paths: Model key -> local model directory
+        pid: Process ID to inspect ('self' for this process)
+
+    Returns:
+        Dict[str, Dict[str, float]]: Model key -> rss/pss/shared/private MB
+            (only models whose weights are mapped in that process)
+    """
+    files = _read_smaps(pid)
+    report = {}
+    for model_key, model_path in model_paths.items():
+        usage = files.get(str(get_safetensors_path(model_path).resolve()))
+        if not usage:
+            continue
+        report[model_key] = {
+            'rss_mb': round(usage.get('Rss', 0) / 1024, 1),
+            'pss_mb': round(usage.get('Pss', 0) / 1024, 1),
+            'shared_mb': round((usage.get('Shared_Clean', 0) + usage.get('Shared_Dirty', 0)) / 1024, 1),
+            'private_mb': round((usage.get('Private_Clean', 0) + usage.get('Private_Dirty', 0)) / 1024, 1),
+        }
+    return report
@@ -0,0 +1,238 @@
+"""
+Model Cache
+Thread-safe LRU cache for loaded models with a parameter-byte memory budget,
+idle-TTL eviction and pinning for the pretrained models.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+def get_entry_bytes(value: Any) -> int:
+    """Get the parameter bytes held by a cache entry (0 if it does not report them)."""
+    return int(getattr(value, 'param_bytes', 0) or 0)
+
+
+class ModelCache:
+    """LRU model cache bounded by parameter bytes and idle time."""
+
+    def __init__(self, max_bytes: int = 0, idle_ttl: float = 0, pinned: Optional[Iterable[str]] = None,
+                 on_evict: Optional[Callable[[str, Any, str], None]] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_bytes: Memory budget in parameter bytes (0 = unlimited)
+            idle_ttl: Seconds an unpinned entry may stay unused before eviction (0 = never)
+            pinned: Keys that are never evicted by the LRU or idle policies
+            on_evict: Optional callback(key, value, reason) run after an entry is evicted
+        """
+        self.max_bytes = int(max_bytes)
+        self.idle_ttl = float(idle_ttl)
+        self.on_evict = on_evict
+
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()  # key -> value, least recently used first
+        self._sizes = {}
+        self._last_used = {}
+        self._pinned = set(pinned or [])
+        self._total_bytes = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = {'lru': 0, 'idle': 0, 'explicit': 0}
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.put(key, value)
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            return list(self._entries.keys())
+
+    def items(self) -> List[Tuple[str, Any]]:
+        """Snapshot of (key, value) pairs without touching LRU order."""
+        with self._lock:
+            return list(self._entries.items())
+
+    def pin(self, key: str) -> None:
+        """Protect a key from LRU and idle eviction."""
+        with self._lock:
+            self._pinned.add(key)
+
+    def is_pinned(self, key: str) -> bool:
+        with self._lock:
+            return key in self._pinned
+
+    def headroom(self, keep: Iterable[str] = ()) -> Optional[int]:
+        """
+        Get the bytes a new entry could use if every evictable entry were evicted.
+
+        Args:
+            keep: Keys that must stay cached (counted like pinned entries)
+
+        Returns:
+            Optional[int]: Budget left beside the pinned and kept entries (None = unlimited)
+        """
+        if self.max_bytes <= 0:
+            return None
+        keep = set(keep)
+        with self._lock:
+            held = sum(size for key, size in self._sizes.items() if key in self._pinned or key in keep)
+        return self.max_bytes - held
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Get an entry and mark it as most recently used.
+
+        Args:
+            key: Cache key
+            default: Value returned on a miss
+
+        Returns:
+            The cached value or default
+        """
+        self.evict_idle()
+        with self._lock:
+            if key not in self._entries:
+                self._misses += 1
+                return default
+            self._hits += 1
+            self._entries.move_to_end(key)
+            self._last_used[key] = time.time()
+            return self._entries[key]
+
+    def put(self, key: str, value: Any) -> None:
+        """
+        Insert an entry, then evict least recently used entries over the memory budget.
+
+        Args:
+            key: Cache key
+            value: Value to cache (its param_bytes attribute is used for sizing)
+        """
+        evicted = []
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._sizes[key]
+            size = get_entry_bytes(value)
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._sizes[key] = size
+            self._last_used[key] = time.time()
+            self._total_bytes += size
+
+            if self.max_bytes > 0:
+                for candidate in list(self._entries.keys()):
+                    if self._total_bytes <= self.max_bytes:
+                        break
+                    if candidate == key or candidate in self._pinned:
+                        continue
+                    evicted.append((candidate, self._remove(candidate), 'lru'))
+
+                if self._total_bytes > self.max_bytes:
+                    print(f"⚠️ Model cache over budget: {self._total_bytes / 1024**2:.0f} MB "
+                          f"used, {self.max_bytes / 1024**2:.0f} MB allowed (only pinned entries and {key} remain)")
+
+        self._notify(evicted)
+        self.evict_idle()
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        """
+        Explicitly evict an entry (e.g. when its model files are deleted).
+
+        Args:
+            key: Cache key
+            default: Value returned if the key is not cached
+
+        Returns:
+            The evicted value or default
+        """
+        with self._lock:
+            if key not in self._entries:
+                return default
+            value = self._remove(key)
+        self._notify([(key, value, 'explicit')])
+        return value
+
+    def evict_idle(self) -> int:
+        """
+        Evict unpinned entries that have not been used for idle_ttl seconds.
+
+        Returns:
+            int: Number of evicted entries
+        """
+        if self.idle_ttl <= 0:
+            return 0
+
+        now = time.time()
+        evicted = []
+        with self._lock:
+            for key in list(self._entries.keys()):
+                if key in self._pinned:
+                    continue
+                if now - self._last_used[key] > self.idle_ttl:
+                    evicted.append((key, self._remove(key), 'idle'))
+
+        self._notify(evicted)
+        return len(evicted)
+
+    def _remove(self, key: str) -> Any:
+        """Remove an entry and update accounting. Caller must hold the lock."""
+        value = self._entries.pop(key)
+        self._total_bytes -= self._sizes.pop(key)
+        self._last_used.pop(key, None)
+        return value
+
+    def _notify(self, evicted: List) -> None:
+        """Count evictions and run the eviction callback outside the lock."""
+        if not evicted:
+            return
+        with self._lock:
+            for _, _, reason in evicted:
+                self._evictions[reason] += 1
+        for key, value, reason in evicted:
+            print(f"🗑️ Evicted {key} from model cache ({reason})")
+            if self.on_evict:
+                try:
+                    self.on_evict(key, value, reason)
+                except Exception as e:
+                    print(f"❌ Model cache eviction callback error for {key}: {str(e)}")
+
+    def get_stats(self) -> Dict:
+        """Get hit/miss/eviction counters and per-entry usage."""
+        now = time.time()
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'used_mb': round(self._total_bytes / 1024**2, 1),
+                'max_mb': round(self.max_bytes / 1024**2, 1) if self.max_bytes > 0 else None,
+                'idle_ttl_seconds': self.idle_ttl if self.idle_ttl > 0 else None,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 3) if lookups else 0.0,
+                'evictions': dict(self._evictions),
+                'models': {
+                    key: {
+                        'size_mb': round(self._sizes[key] / 1024**2, 1),
+                        'pinned': key in self._pinned,
+                        'idle_seconds': round(now - self._last_used[key], 1)
+                    }
+                    for key in reversed(self._entries.keys())
+                }
+            }
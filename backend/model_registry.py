@@ -0,0 +1,242 @@
+"""
+Model Registry
+Loads the weights and tokenizer of each model once and exposes the label,
+probability and explainer views on top of that single instance.
+"""
+
+import threading
+from pathlib import Path
+import numpy as np
+from typing import List
+from config import CLASS_NAMES, INFERENCE_BATCH_SIZE, MMAP_WEIGHTS, EXPLAINER_BATCH_SIZE, EXPLAINER_BATCH_SIZES
+from mmap_weights import load_mmap_model
+from onnx_backend import select_backend, get_onnx_path, OnnxRunner
+from quantization import is_quantization_enabled, load_quantized, get_model_bytes
+from early_exit import is_early_exit_enabled, load_early_exit
+from shap_engine import PartitionTreeCache
+
+
+def softmax(logits: np.ndarray) -> np.ndarray:
+    """Row-wise softmax of a logits matrix."""
+    shifted = logits - logits.max(axis=-1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+class ModelHandle:
+    """Tokenizer, encoding and explainer views shared by every kind of served model."""
+
+    def _init_explainers(self):
+        """Initialize the lazily created explainers."""
+        self._explainer_lock = threading.Lock()
+        self._lime_explainer = None
+        self._shap_explainer = None
+
+    def encode(self, texts: List[str]) -> List[List[int]]:
+        """Tokenize texts into input IDs (with special tokens, truncated to the model limit)."""
+        return self.tokenizer(texts, truncation=True)['input_ids']
+
+    @property
+    def explainer_batch_size(self) -> int:
+        """Texts per forward pass when scoring explainer inputs (EXPLAINER_BATCH_SIZES)."""
+        return EXPLAINER_BATCH_SIZES.get(self.model_key, EXPLAINER_BATCH_SIZE)
+
+    def class_columns(self, label_mapping=None) -> np.ndarray:
+        """Column of each CLASS_NAMES entry in this model's probability rows (label-ID order)."""
+        labels = [str(self.config.id2label[i]) for i in range(len(self.config.id2label))]
+        if label_mapping:
+            labels = [label_mapping.get(label, label) for label in labels]
+        return np.array([labels.index(name) if name in labels else i for i, name in enumerate(CLASS_NAMES)])
+
+    def predict_proba_texts(self, texts: List[str]) -> np.ndarray:
+        """
+        Score raw texts for explainers: one tokenizer call, then length-sorted
+        batches of explainer_batch_size, bypassing the prediction cache.
+
+        Args:
+            texts: Texts to score (perturbed or masked inputs)
+
+        Returns:
+            np.ndarray: Contiguous probabilities per text, columns ordered by model label ID
+        """
+        return np.ascontiguousarray(
+            self.predict_proba_ids(self.encode([str(t) for t in texts]), batch_size=self.explainer_batch_size)
+        )
+
+    def get_lime_explainer(self):
+        """Get the LIME explainer for this model, creating it on first use."""
+        with self._explainer_lock:
+            if self._lime_explainer is None:
+                from lime.lime_text import LimeTextExplainer
+                self._lime_explainer = LimeTextExplainer(class_names=CLASS_NAMES)
+                print(f"✅ LIME explainer created for {self.model_key}")
+            return self._lime_explainer
+
+    def _build_shap_explainer(self):
+        """Create a SHAP explainer over the batched probability function with a Text masker (cached partition trees)."""
+        import shap
+        labels = [self.config.id2label[i] for i in range(len(self.config.id2label))]
+        masker = shap.maskers.Text(self.tokenizer)
+        masker.clustering = PartitionTreeCache(masker.clustering, masker.token_segments)
+        return shap.Explainer(self.predict_proba_texts, masker, output_names=labels)
+
+    def get_shap_explainer(self):
+        """Get the SHAP explainer for this model, creating it on first use."""
+        with self._explainer_lock:
+            if self._shap_explainer is None:
+                self._shap_explainer = self._build_shap_explainer()
+                print(f"✅ SHAP explainer created for {self.model_key}")
+            return self._shap_explainer
+
+    def has_shap_explainer(self) -> bool:
+        """Check whether the SHAP explainer has already been built."""
+        return self._shap_explainer is not None
+
+
+class LoadedModel(ModelHandle):
+    """One in-memory model instance shared by every view of a model key."""
+
+    def __init__(self, model_key: str, model_path: str, device: int, tokenizer=None):
+        """
+        Load the model weights and tokenizer.
+
+        On CPU, models listed in QUANTIZED_MODELS are served from their int8
+        variant. Otherwise the forward pass runs on ONNX Runtime when a current
+        export is available (see onnx_backend.select_backend), else on PyTorch,
+        with local fp32 weights memory-mapped from safetensors when MMAP_WEIGHTS
+        is enabled. Models with an EARLY_EXIT_THRESHOLDS entry and trained exit
+        heads run on PyTorch with early exit.
+
+        Args:
+            model_key: The key the model is registered under
+            model_path: Local path or HF model id
+            device: Device ID (0+ for GPU, -1 for CPU)
+            tokenizer: Already loaded tokenizer to share (loaded from model_path if None)
+        """
+        from transformers import AutoConfig, AutoTokenizer
+
+        self.model_key = model_key
+        self.model_path = str(model_path)
+        self.device = device
+
+        self.config = AutoConfig.from_pretrained(self.model_path)
+        self.tokenizer = tokenizer if tokenizer is not None else AutoTokenizer.from_pretrained(self.model_path)
+
+        self._model_lock = threading.RLock()  # also guards the lazily built pipeline views
+        self._model = None
+        self._classifier = None
+        self._prob_classifier = None
+        self._onnx_runner = None
+        self._early_exit = None
+        self.mmapped = False
+
+        self.quantized = device < 0 and is_quantization_enabled(model_key)
+        self.early_exit_enabled = Path(self.model_path).is_dir() and is_early_exit_enabled(model_key, self.model_path)
+        if self.quantized:
+            self.backend = 'torch_int8'
+        elif self.early_exit_enabled:
+            self.backend = 'torch'
+        else:
+            self.backend = select_backend(self.model_path, device)
+        if self.backend == 'onnx':
+            self._onnx_runner = OnnxRunner(get_onnx_path(self.model_path))
+            self.param_bytes = self._onnx_runner.size_bytes
+        else:
+            self.param_bytes = get_model_bytes(self.model)
+
+        self._init_explainers()
+
+    @property
+    def model(self):
+        """The PyTorch model (loaded on first use when serving from ONNX)."""
+        with self._model_lock:
+            if self._model is None:
+                if self.quantized:
+                    self._model = load_quantized(self.model_path)
+                elif MMAP_WEIGHTS and self.device < 0 and Path(self.model_path).is_dir():
+                    self._model = load_mmap_model(self.model_path)
+                    self.mmapped = self._model is not None
+                if self._model is None:
+                    from transformers import AutoModelForSequenceClassification
+                    self._model = AutoModelForSequenceClassification.from_pretrained(self.model_path)
+                    self._model.eval()
+            return self._model
+
+    @property
+    def early_exit(self):
+        """The early-exit runner (None when early exit is off or unavailable)."""
+        with self._model_lock:
+            if self.early_exit_enabled and self._early_exit is None:
+                self._early_exit = load_early_exit(self.model_key, self.model_path, self.model)
+                if self._early_exit is None:
+                    self.early_exit_enabled = False
+            return self._early_exit
+
+    @property
+    def classifier(self):
+        """Label view (top-1) pipeline sharing the model weights."""
+        with self._model_lock:
+            if self._classifier is None:
+                from transformers import pipeline
+                self._classifier = pipeline(
+                    "text-classification",
+                    model=self.model,
+                    tokenizer=self.tokenizer,
+                    device=self.device
+                )
+            return self._classifier
+
+    @property
+    def prob_classifier(self):
+        """Probability view (all labels) pipeline sharing the model weights."""
+        with self._model_lock:
+            if self._prob_classifier is None:
+                from transformers import pipeline
+                self._prob_classifier = pipeline(
+                    "text-classification",
+                    model=self.model,
+                    tokenizer=self.tokenizer,
+                    top_k=None,
+                    device=self.device
+                )
+            return self._prob_classifier
+
+    def _forward_logits(self, input_ids: List[List[int]]) -> np.ndarray:
+        """Run one padded forward pass on the active backend."""
+        if self._onnx_runner is not None:
+            batch = self.tokenizer.pad({'input_ids': input_ids}, return_tensors='np')
+            return self._onnx_runner.logits(dict(batch))
+
+        import torch
+        model = self.model
+        batch = self.tokenizer.pad({'input_ids': input_ids}, return_tensors='pt')
+        batch = {name: tensor.to(model.device) for name, tensor in batch.items()}
+        early_exit = self.early_exit
+        if early_exit is not None:
+            return early_exit.logits(batch)
+        with torch.inference_mode():
+            return model(**batch).logits.float().cpu().numpy()
+
+    def predict_proba_ids(self, input_ids: List[List[int]], batch_size: int = INFERENCE_BATCH_SIZE) -> np.ndarray:
+        """
+        Run batched forward passes over pre-tokenized inputs.
+
+        Inputs are sorted by length before padding so similar lengths share a batch.
+
+        Args:
+            input_ids: Token IDs per text
+            batch_size: Maximum texts per forward pass
+
+        Returns:
+            np.ndarray: Probabilities per text (in input order), columns ordered by model label ID
+        """
+        order = sorted(range(len(input_ids)), key=lambda i: len(input_ids[i]))
+        sorted_probs = []
+        for start in range(0, len(order), batch_size):
+            chunk = [input_ids[i] for i in order[start:start + batch_size]]
+            sorted_probs.append(softmax(self._forward_logits(chunk)))
+
+        sorted_probs = np.concatenate(sorted_probs)
+        probs = np.empty_like(sorted_probs)
+        probs[order] = sorted_probs
+        return probs
@@ -1,7 +1,5 @@
 import os
 import json
-import torch
-import pandas as pd
 import numpy as np
 import time
 from datetime import datetime, timedelta
@@ -9,16 +7,16 @@ from pathlib import Path
 import random
 import string
 import shutil
-from typing import Dict, List, Optional, Tuple
-from datasets import Dataset
-from transformers import (
-    AutoTokenizer, AutoModelForSequenceClassification, 
-    TrainingArguments, Trainer, DataCollatorWithPadding
-)
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score, classification_report
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 import time
 from base_model_cache import get_cached_model_path, download_base_model, is_model_cached
+from config import CUSTOM_MODELS_DIR, INFERENCE_BACKEND
+
+# The training stack (torch, transformers, pandas, datasets, sklearn) and the serving
+# artifact builders (ONNX, int8, early exit) are imported inside the functions that
+# train, so importing this module stays cheap for the API
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 # Configuration for fine-tuning models
@@ -30,7 +28,6 @@ FINETUNING_MODELS = {
     'distilbert-base-uncased': 'DistilBERT Base'
 }
 
-CUSTOM_MODELS_DIR = Path(__file__).parent / 'custom_models'
 ZIP_EXPIRY_HOURS = 24
 # --- ZIP Cleanup Logic ---
 def cleanup_expired_zips():
@@ -65,7 +62,7 @@ def generate_model_code() -> str:
             return code
 
 
-def validate_csv_data(df: pd.DataFrame) -> Tuple[bool, str]:
+def validate_csv_data(df: 'pd.DataFrame') -> Tuple[bool, str]:
     """
     Validate CSV data for training.
     
@@ -120,7 +117,7 @@ def validate_csv_data(df: pd.DataFrame) -> Tuple[bool, str]:
     return True, ""
 
 
-def preprocess_data(df: pd.DataFrame) -> pd.DataFrame:
+def preprocess_data(df: 'pd.DataFrame') -> 'pd.DataFrame':
     """
     Preprocess the DataFrame for training.
     
@@ -165,6 +162,7 @@ def tokenize_data(texts: List[str], tokenizer, max_length: int = MAX_SEQUENCE_LE
 
 def compute_metrics(eval_pred):
     """Compute metrics for evaluation."""
+    from sklearn.metrics import accuracy_score
     predictions, labels = eval_pred
     predictions = np.argmax(predictions, axis=1)
     return {
@@ -215,7 +213,32 @@ class ModelTrainer:
         with open(self.model_dir / 'metadata.json', 'w') as f:
             json.dump(self.metadata, f, indent=2)
     
-    def train(self, df: pd.DataFrame) -> Dict:
+    def _train_early_exit(self, model, tokenizer, model_path: Path, train_texts: List[str], train_labels: List[int],
+                          val_texts: List[str], val_labels: List[int]):
+        """Train exit heads for the fine-tuned model and record the per-threshold report in the metadata."""
+        from early_exit import train_early_exit, SUPPORTED_MODEL_TYPES
+        
+        if model.config.model_type not in SUPPORTED_MODEL_TYPES:
+            print(f"⚠️ Early exit skipped for model {self.model_code}: {model.config.model_type} is not supported")
+            self.metadata['early_exit'] = {'error': f"Not supported for {model.config.model_type} models"}
+            return
+
+        try:
+            report = train_early_exit(model, tokenizer, str(model_path), train_texts, train_labels,
+                                      val_texts, val_labels)
+            self.metadata['early_exit'] = {
+                'recommended_threshold': report['recommended_threshold'],
+                'exit_layers': report['exit_layers'],
+                'full_accuracy': report['full']['accuracy'],
+                'thresholds': [{key: r[key] for key in ('threshold', 'accuracy', 'avg_layers', 'speedup')}
+                               for r in report['thresholds']],
+            }
+        except Exception as e:
+            print(f"⚠️ Early-exit training failed for model {self.model_code}: {str(e)}")
+            self.metadata['early_exit'] = {'error': str(e)}
+        self._save_metadata()
+
+    def train(self, df: 'pd.DataFrame') -> Dict:
         """
         Train the model with provided data.
         
@@ -225,6 +248,14 @@ class ModelTrainer:
         Returns:
             Dict: Training results
         """
+        from datasets import Dataset
+        from sklearn.model_selection import train_test_split
+        from transformers import (
+            AutoTokenizer, AutoModelForSequenceClassification, TrainingArguments, Trainer, DataCollatorWithPadding
+        )
+        from onnx_backend import export_onnx, is_onnxruntime_available
+        from quantization import build_quantized
+        
         print(f"🚀 Starting training for model {self.model_code}")
         start_time = time.time()
         
@@ -382,7 +413,32 @@ class ModelTrainer:
             final_model_path = self.model_dir / 'model'
             trainer.save_model(str(final_model_path))
             tokenizer.save_pretrained(str(final_model_path))
-            
+
+            # Serving memory-maps safetensors weights and never converts on load
+            try:
+                from mmap_weights import ensure_safetensors
+                ensure_safetensors(str(final_model_path))
+            except Exception as e:
+                print(f"⚠️ Safetensors conversion failed for model {self.model_code}: {str(e)}")
+
+            # Train early-exit heads on the same split (optional, never fails the training run)
+            if self.config.get('early_exit', False):
+                self._train_early_exit(trainer.model, tokenizer, final_model_path,
+                                       train_texts, train_labels, val_texts, val_labels)
+
+            # Prepare the ONNX export for CPU serving (optional, never fails the training run)
+            if INFERENCE_BACKEND != 'torch' and is_onnxruntime_available():
+                try:
+                    export_onnx(str(final_model_path))
+                except Exception as e:
+                    print(f"⚠️ ONNX export failed for model {self.model_code}: {str(e)}")
+
+            # Build the int8 variant so it is ready whenever quantized serving is enabled
+            try:
+                build_quantized(str(final_model_path))
+            except Exception as e:
+                print(f"⚠️ Int8 quantization failed for model {self.model_code}: {str(e)}")
+
             # Update metadata
             end_time = time.time()
             training_time = end_time - start_time
@@ -491,6 +547,10 @@ def cleanup_expired_models():
                     shutil.rmtree(model_dir)
                     print(f"🗑️ Cleaned up expired model: {model_dir.name}")
                     cleaned_count += 1
+                    
+                    # Drop the loaded instance so its weights are released too
+                    from ai_utils import evict_model
+                    evict_model(f"custom_{model_dir.name}")
                 except Exception as e:
                     print(f"❌ Error cleaning up model {model_dir.name}: {str(e)}")
     
@@ -1,4 +1,5 @@
-from config import AVAILABLE_MODELS
+from pathlib import Path
+from config import AVAILABLE_MODELS, CUSTOM_MODELS_DIR
 
 
 def get_model_path(model_key: str) -> str:
@@ -6,7 +7,8 @@ def get_model_path(model_key: str) -> str:
     Get the path to a local model in the backend folder.
     
     Args:
-        model_key: The key identifying the model (e.g., 'covid', 'climate', 'combined')
+        model_key: The key identifying the model (e.g., 'covid', 'climate', 'combined'),
+            or 'custom_<code>' for a trained custom model
         
     Returns:
         str: Path to the local model
@@ -14,6 +16,13 @@ def get_model_path(model_key: str) -> str:
     Raises:
         ValueError: If model is not found locally
     """
+    if model_key.startswith('custom_'):
+        model_code = model_key.replace('custom_', '', 1)
+        custom_path = CUSTOM_MODELS_DIR / model_code / 'model'
+        if custom_path.exists():
+            return str(custom_path)
+        raise ValueError(f"Custom model {model_code} not found at {custom_path}")
+
     model_entry = AVAILABLE_MODELS.get(model_key)
     
     if not model_entry:
@@ -38,3 +47,25 @@ def get_model_path(model_key: str) -> str:
         return hf_id
     
     raise ValueError(f"Model {model_key} not found locally at {local_path}. Please download the model first.")
+
+
+def is_artifact_current(artifact_path: Path, model_path: str) -> bool:
+    """
+    Check whether a file derived from a model (ONNX export, quantized weights)
+    exists and is newer than the model's top-level weight and config files.
+
+    Args:
+        artifact_path: Path to the derived file
+        model_path: Local model directory
+
+    Returns:
+        bool: True if the derived file can be used as is
+    """
+    artifact_path = Path(artifact_path)
+    if not artifact_path.exists():
+        return False
+
+    artifact_mtime = artifact_path.stat().st_mtime
+    model_files = [p for p in Path(model_path).iterdir()
+                   if p.is_file() and p.suffix in ('.bin', '.safetensors', '.json')]
+    return all(p.stat().st_mtime <= artifact_mtime for p in model_files)
@@ -0,0 +1,209 @@
+"""
+ONNX Runtime Inference Backend
+Exports sequence-classification models to ONNX once (cached next to the model)
+and serves them through onnxruntime on CPU.
+"""
+
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config import INFERENCE_BACKEND
+from model_utils import is_artifact_current
+
+ONNX_SUBDIR = 'onnx'
+ONNX_FILENAME = 'model.onnx'
+ONNX_OPSET = 14
+
+
+def is_onnxruntime_available() -> bool:
+    """Check whether onnxruntime is installed."""
+    try:
+        import onnxruntime  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def get_onnx_path(model_path: str) -> Path:
+    """Get the path of the cached ONNX export for a local model directory."""
+    return Path(model_path) / ONNX_SUBDIR / ONNX_FILENAME
+
+
+def is_export_current(model_path: str) -> bool:
+    """
+    Check whether an ONNX export exists and is newer than the model weights.
+
+    Args:
+        model_path: Local model directory
+
+    Returns:
+        bool: True if the cached export can be served
+    """
+    return is_artifact_current(get_onnx_path(model_path), model_path)
+
+
+def export_onnx(model_path: str, force: bool = False) -> Path:
+    """
+    Export a sequence-classification model to ONNX (skipped if a current export exists).
+
+    Args:
+        model_path: Local model directory
+        force: Re-export even if a current export exists
+
+    Returns:
+        Path: Path to the ONNX file
+    """
+    import torch
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+    model_dir = Path(model_path)
+    if not model_dir.is_dir():
+        raise ValueError(f"ONNX export needs a local model directory, got: {model_path}")
+
+    onnx_path = get_onnx_path(model_path)
+    if not force and is_export_current(model_path):
+        return onnx_path
+
+    print(f"📦 Exporting {model_dir.name} to ONNX...")
+    start_time = time.time()
+
+    tokenizer = AutoTokenizer.from_pretrained(str(model_dir))
+    model = AutoModelForSequenceClassification.from_pretrained(str(model_dir))
+    model.eval()
+
+    dummy = tokenizer(["Export sample text for tracing."], return_tensors='pt')
+    input_names = ['input_ids', 'attention_mask']
+    onnx_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = onnx_path.with_suffix('.onnx.tmp')
+
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (dummy['input_ids'], dummy['attention_mask']),
+            str(tmp_path),
+            input_names=input_names,
+            output_names=['logits'],
+            dynamic_axes={
+                'input_ids': {0: 'batch', 1: 'sequence'},
+                'attention_mask': {0: 'batch', 1: 'sequence'},
+                'logits': {0: 'batch'}
+            },
+            opset_version=ONNX_OPSET,
+            do_constant_folding=True
+        )
+
+    # Atomic replace so concurrent loaders never see a partial file
+    os.replace(tmp_path, onnx_path)
+    print(f"✅ ONNX export for {model_dir.name} written in {time.time() - start_time:.2f}s: {onnx_path}")
+    return onnx_path
+
+
+def select_backend(model_path: str, device: int) -> str:
+    """
+    Pick the inference backend for a model according to INFERENCE_BACKEND.
+
+    'auto' serves ONNX on CPU when onnxruntime is installed and a current
+    export exists; 'onnx' also exports on first load; 'torch' never uses ONNX.
+
+    Args:
+        model_path: Local model directory or HF model id
+        device: Device ID (0+ for GPU, -1 for CPU)
+
+    Returns:
+        str: 'onnx' or 'torch'
+    """
+    if INFERENCE_BACKEND == 'torch' or device >= 0:
+        return 'torch'
+    if not Path(model_path).is_dir() or not is_onnxruntime_available():
+        return 'torch'
+
+    if is_export_current(model_path):
+        return 'onnx'
+
+    if INFERENCE_BACKEND == 'onnx':
+        try:
+            export_onnx(model_path)
+            return 'onnx'
+        except Exception as e:
+            print(f"⚠️ ONNX export failed for {model_path}, falling back to PyTorch: {str(e)}")
+    return 'torch'
+
+
+class OnnxRunner:
+    """Runs an exported classification model with onnxruntime."""
+
+    def __init__(self, onnx_path: Path):
+        """
+        Create the inference session.
+
+        Args:
+            onnx_path: Path to the exported ONNX model
+        """
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(str(onnx_path), options, providers=['CPUExecutionProvider'])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.size_bytes = Path(onnx_path).stat().st_size
+
+    def logits(self, batch: Dict[str, np.ndarray]) -> np.ndarray:
+        """
+        Run the model on one padded batch.
+
+        Args:
+            batch: Padded numpy inputs (input_ids, attention_mask, ...)
+
+        Returns:
+            np.ndarray: Logits of shape (batch, num_labels)
+        """
+        feed = {name: value.astype(np.int64) for name, value in batch.items() if name in self.input_names}
+        return self.session.run(['logits'], feed)[0]
+
+
+def check_parity(model_path: str, texts: Optional[List[str]] = None, atol: float = 1e-3) -> Dict:
+    """
+    Compare ONNX Runtime probabilities with PyTorch for a model.
+
+    Args:
+        model_path: Local model directory (exported on demand)
+        texts: Sample texts (a built-in set is used if None)
+        atol: Maximum allowed absolute probability difference
+
+    Returns:
+        Dict: max_abs_diff, label_agreement and passed
+    """
+    import torch
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+    texts = texts or [
+        "The vaccine was tested on thousands of volunteers before approval.",
+        "Scientists admitted that climate change was invented to raise taxes.",
+        "I was at home all evening and did not see anyone.",
+        "Short text.",
+    ]
+
+    tokenizer = AutoTokenizer.from_pretrained(str(model_path))
+    model = AutoModelForSequenceClassification.from_pretrained(str(model_path))
+    model.eval()
+    runner = OnnxRunner(export_onnx(model_path))
+
+    batch = tokenizer(texts, padding=True, truncation=True, return_tensors='pt')
+    with torch.no_grad():
+        torch_probs = torch.softmax(model(**batch).logits.float(), dim=-1).numpy()
+
+    onnx_logits = runner.logits({name: tensor.numpy() for name, tensor in batch.items()})
+    onnx_logits = onnx_logits - onnx_logits.max(axis=-1, keepdims=True)
+    onnx_probs = np.exp(onnx_logits) / np.exp(onnx_logits).sum(axis=-1, keepdims=True)
+
+    max_abs_diff = float(np.abs(torch_probs - onnx_probs).max())
+    label_agreement = float((torch_probs.argmax(axis=-1) == onnx_probs.argmax(axis=-1)).mean())
+    return {
+        'max_abs_diff': max_abs_diff,
+        'label_agreement': label_agreement,
+        'passed': max_abs_diff <= atol and label_agreement == 1.0
+    }
@@ -0,0 +1,206 @@
+"""
+Dynamic Int8 Quantization
+Builds, caches and loads dynamically quantized (int8 Linear layers) variants of
+sequence-classification models for CPU serving, and reports their accuracy
+against the fp32 model.
+"""
+
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config import QUANTIZED_MODELS
+from model_utils import is_artifact_current
+
+QUANTIZED_SUBDIR = 'quantized'
+QUANTIZED_FILENAME = 'model_int8.pt'
+
+
+def is_quantization_enabled(model_key: str) -> bool:
+    """
+    Check whether a model is configured to serve its int8 variant (QUANTIZED_MODELS).
+
+    Args:
+        model_key: Model key (e.g. 'bert-covid-1' or 'custom_<code>')
+
+    Returns:
+        bool: True if the quantized variant should be served on CPU
+    """
+    if 'all' in QUANTIZED_MODELS or model_key in QUANTIZED_MODELS:
+        return True
+    return model_key.startswith('custom_') and 'custom' in QUANTIZED_MODELS
+
+
+def get_quantized_path(model_path: str) -> Path:
+    """Get the path of the cached quantized weights for a local model directory."""
+    return Path(model_path) / QUANTIZED_SUBDIR / QUANTIZED_FILENAME
+
+
+def quantize_model(model):
+    """Apply dynamic int8 quantization to the Linear layers of a model."""
+    import torch
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def get_model_bytes(model) -> int:
+    """Get the bytes held by a model's state dict (counts packed int8 weights, tied weights once)."""
+    import torch
+    total = 0
+    seen = set()
+    for value in model.state_dict().values():
+        tensors = value if isinstance(value, (tuple, list)) else (value,)
+        for tensor in tensors:
+            if isinstance(tensor, torch.Tensor) and tensor.data_ptr() not in seen:
+                seen.add(tensor.data_ptr())
+                total += tensor.numel() * tensor.element_size()
+    return total
+
+
+def build_quantized(model_path: str, force: bool = False) -> Path:
+    """
+    Quantize a model and cache the int8 weights next to it (skipped if current).
+
+    Args:
+        model_path: Local model directory
+        force: Rebuild even if a current variant exists
+
+    Returns:
+        Path: Path to the quantized weights
+    """
+    import torch
+    from transformers import AutoModelForSequenceClassification
+
+    model_dir = Path(model_path)
+    if not model_dir.is_dir():
+        raise ValueError(f"Quantization cache needs a local model directory, got: {model_path}")
+
+    quantized_path = get_quantized_path(model_path)
+    if not force and is_artifact_current(quantized_path, model_path):
+        return quantized_path
+
+    print(f"🗜️ Building int8 variant of {model_dir.name}...")
+    start_time = time.time()
+
+    model = AutoModelForSequenceClassification.from_pretrained(str(model_dir))
+    model.eval()
+    quantized = quantize_model(model)
+
+    quantized_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = quantized_path.with_suffix('.pt.tmp')
+    torch.save(quantized.state_dict(), tmp_path)
+    # Atomic replace so concurrent loaders never see a partial file
+    os.replace(tmp_path, quantized_path)
+
+    print(f"✅ Int8 variant of {model_dir.name} written in {time.time() - start_time:.2f}s "
+          f"({quantized_path.stat().st_size / 1024**2:.0f} MB)")
+    return quantized_path
+
+
+def load_quantized(model_path: str):
+    """
+    Load the int8 variant of a model, building and caching it first if needed.
+
+    HF model ids (no local directory) are quantized in memory without caching.
+
+    Args:
+        model_path: Local model directory or HF model id
+
+    Returns:
+        torch.nn.Module: Quantized model in eval mode (CPU only)
+    """
+    import torch
+    from transformers import AutoConfig, AutoModelForSequenceClassification
+
+    if not Path(model_path).is_dir():
+        model = AutoModelForSequenceClassification.from_pretrained(str(model_path))
+        model.eval()
+        return quantize_model(model)
+
+    quantized_path = build_quantized(model_path)
+    model = AutoModelForSequenceClassification.from_config(AutoConfig.from_pretrained(str(model_path)))
+    model.eval()
+    model = quantize_model(model)
+    model.load_state_dict(torch.load(quantized_path, map_location='cpu', weights_only=False))
+    return model
+
+
+def _predict_probs(model, tokenizer, texts: List[str], batch_size: int) -> np.ndarray:
+    """Get class probabilities for texts with a model on CPU."""
+    import torch
+    probs = []
+    for start in range(0, len(texts), batch_size):
+        batch = tokenizer(texts[start:start + batch_size], padding=True, truncation=True, return_tensors='pt')
+        with torch.no_grad():
+            probs.append(torch.softmax(model(**batch).logits.float(), dim=-1).numpy())
+    return np.concatenate(probs)
+
+
+def compare_with_fp32(model_path: str, csv_path: str, batch_size: int = 32,
+                      max_rows: Optional[int] = None) -> Dict:
+    """
+    Measure the accuracy and latency difference between the fp32 and int8 variants.
+
+    The CSV uses the training format: a 'text' column and a 'label' column
+    (0/1 or deceptive/truthful, where 0 = deceptive).
+
+    Args:
+        model_path: Local model directory or HF model id
+        csv_path: Held-out CSV file
+        batch_size: Texts per forward pass
+        max_rows: Only use the first max_rows rows
+
+    Returns:
+        Dict: Accuracy of both variants, their delta, prediction agreement,
+            probability differences, latency and size
+    """
+    import pandas as pd
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+    df = pd.read_csv(csv_path, nrows=max_rows)
+    if 'text' not in df.columns or 'label' not in df.columns:
+        raise ValueError("CSV must contain 'text' and 'label' columns")
+
+    label_mapping = {'deceptive': 0, '0': 0, 0: 0, 'truthful': 1, '1': 1, 1: 1}
+    df['label'] = df['label'].map(label_mapping)
+    df = df.dropna(subset=['text', 'label'])
+    texts = df['text'].astype(str).tolist()
+    labels = df['label'].astype(int).to_numpy()
+    if not texts:
+        raise ValueError("CSV contains no usable rows")
+
+    tokenizer = AutoTokenizer.from_pretrained(str(model_path))
+    fp32_model = AutoModelForSequenceClassification.from_pretrained(str(model_path))
+    fp32_model.eval()
+    int8_model = load_quantized(model_path)
+
+    start_time = time.time()
+    fp32_probs = _predict_probs(fp32_model, tokenizer, texts, batch_size)
+    fp32_time = time.time() - start_time
+
+    start_time = time.time()
+    int8_probs = _predict_probs(int8_model, tokenizer, texts, batch_size)
+    int8_time = time.time() - start_time
+
+    fp32_preds = fp32_probs.argmax(axis=-1)
+    int8_preds = int8_probs.argmax(axis=-1)
+    fp32_accuracy = float((fp32_preds == labels).mean())
+    int8_accuracy = float((int8_preds == labels).mean())
+    prob_diff = np.abs(fp32_probs - int8_probs)
+
+    return {
+        'rows': len(texts),
+        'fp32_accuracy': fp32_accuracy,
+        'int8_accuracy': int8_accuracy,
+        'accuracy_delta': int8_accuracy - fp32_accuracy,
+        'label_agreement': float((fp32_preds == int8_preds).mean()),
+        'max_abs_prob_diff': float(prob_diff.max()),
+        'mean_abs_prob_diff': float(prob_diff.mean()),
+        'fp32_ms_per_text': fp32_time / len(texts) * 1000,
+        'int8_ms_per_text': int8_time / len(texts) * 1000,
+        'speedup': fp32_time / int8_time if int8_time > 0 else None,
+        'fp32_size_mb': get_model_bytes(fp32_model) / 1024**2,
+        'int8_size_mb': get_model_bytes(int8_model) / 1024**2,
+    }
@@ -0,0 +1,275 @@
+"""
+Result Cache
+Two-tier (in-process LRU + on-disk SQLite) cache for model results, keyed by a
+content fingerprint of the model files and a hash of the normalized input text.
+The SQLite tier survives restarts and is shared by all workers on the host.
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text for cache keys (Unicode NFC, collapsed whitespace, stripped)."""
+    text = unicodedata.normalize('NFC', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def text_hash(text: str) -> str:
+    """Get the hash of the normalized text."""
+    return hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()
+
+
+class TwoTierCache:
+    """In-memory LRU in front of a SQLite key/value table."""
+
+    def __init__(self, db_path: Path, table: str, max_memory_entries: int = 10000,
+                 max_disk_entries: int = 500000):
+        """
+        Initialize the cache.
+
+        Args:
+            db_path: SQLite database file (created if missing)
+            table: Table name for this cache's entries
+            max_memory_entries: Entries kept in the in-process LRU tier
+            max_disk_entries: Entries kept on disk before the oldest are pruned (0 = unlimited)
+        """
+        self.db_path = Path(db_path)
+        self.table = table
+        self.max_memory_entries = max(0, int(max_memory_entries))
+        self.max_disk_entries = max(0, int(max_disk_entries))
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._disk_enabled = True
+        self._writes_since_prune = 0
+
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+
+        try:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = self._connect()
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_created ON {self.table} (created_at)")
+            conn.commit()
+        except Exception as e:
+            print(f"⚠️ Disk cache {self.db_path}:{self.table} unavailable, using memory only: {str(e)}")
+            self._disk_enabled = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's SQLite connection."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, key: str, value: Any) -> None:
+        """Store a value in the memory tier. Caller must hold the lock."""
+        if self.max_memory_entries == 0:
+            return
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get one value, or None on a miss."""
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """
+        Look up several keys, checking memory first and then disk.
+
+        Args:
+            keys: Cache keys
+
+        Returns:
+            Dict[str, Any]: Found values (missing keys are absent)
+        """
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+            self._memory_hits += len(found)
+
+        remaining = [key for key in keys if key not in found]
+        if remaining and self._disk_enabled:
+            try:
+                conn = self._connect()
+                disk_found = {}
+                for start in range(0, len(remaining), 500):
+                    chunk = remaining[start:start + 500]
+                    placeholders = ','.join('?' * len(chunk))
+                    rows = conn.execute(
+                        f"SELECT key, value FROM {self.table} WHERE key IN ({placeholders})", chunk
+                    ).fetchall()
+                    disk_found.update((key, json.loads(value)) for key, value in rows)
+                with self._lock:
+                    for key, value in disk_found.items():
+                        self._remember(key, value)
+                    self._disk_hits += len(disk_found)
+                found.update(disk_found)
+            except Exception as e:
+                print(f"⚠️ Disk cache read error ({self.table}): {str(e)}")
+
+        with self._lock:
+            self._misses += len(keys) - len(found)
+        return found
+
+    def put(self, key: str, value: Any) -> None:
+        """Store one value in both tiers."""
+        self.put_many({key: value})
+
+    def put_many(self, items: Dict[str, Any]) -> None:
+        """
+        Store several values in both tiers (one disk transaction).
+
+        Args:
+            items: Mapping of cache key to JSON-serializable value
+        """
+        if not items:
+            return
+        with self._lock:
+            for key, value in items.items():
+                self._remember(key, value)
+
+        if not self._disk_enabled:
+            return
+        try:
+            now = time.time()
+            conn = self._connect()
+            conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created_at) VALUES (?, ?, ?)",
+                [(key, json.dumps(value), now) for key, value in items.items()]
+            )
+            conn.commit()
+
+            with self._lock:
+                self._writes_since_prune += len(items)
+                should_prune = self.max_disk_entries > 0 and self._writes_since_prune >= 1000
+                if should_prune:
+                    self._writes_since_prune = 0
+            if should_prune:
+                self._prune(conn)
+        except Exception as e:
+            print(f"⚠️ Disk cache write error ({self.table}): {str(e)}")
+
+    def _prune(self, conn: sqlite3.Connection) -> None:
+        """Delete the oldest disk entries beyond max_disk_entries."""
+        conn.execute(
+            f"DELETE FROM {self.table} WHERE key IN ("
+            f"SELECT key FROM {self.table} ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,)
+        )
+        conn.commit()
+
+    def get_stats(self) -> Dict:
+        """Get hit/miss counters for both tiers."""
+        with self._lock:
+            lookups = self._memory_hits + self._disk_hits + self._misses
+            return {
+                'memory_entries': len(self._memory),
+                'max_memory_entries': self.max_memory_entries,
+                'disk_enabled': self._disk_enabled,
+                'memory_hits': self._memory_hits,
+                'disk_hits': self._disk_hits,
+                'misses': self._misses,
+                'hit_rate': round((self._memory_hits + self._disk_hits) / lookups, 3) if lookups else 0.0,
+            }
+
+
+class ModelFingerprints:
+    """Content fingerprints of model directories, re-hashed only when files change."""
+
+    def __init__(self, db_path: Path):
+        """
+        Initialize the fingerprint store.
+
+        Args:
+            db_path: SQLite database file that persists digests across restarts
+        """
+        self._store = TwoTierCache(db_path, 'model_fingerprints', max_memory_entries=256, max_disk_entries=0)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _model_files(model_dir: Path) -> List[Path]:
+        """Files that define a model's behaviour (top-level weights, config and tokenizer files)."""
+        return sorted(p for p in model_dir.iterdir() if p.is_file() and not p.name.startswith('.'))
+
+    def get(self, model_path: str) -> str:
+        """
+        Get the content fingerprint of a model.
+
+        Args:
+            model_path: Local model directory or HF model id
+
+        Returns:
+            str: Hex digest that changes whenever the model files change
+        """
+        model_dir = Path(model_path)
+        if not model_dir.is_dir():
+            # HF model id - the id itself is the best identity we have
+            return hashlib.sha256(str(model_path).encode('utf-8')).hexdigest()
+        return self._digest(model_dir, self._model_files(model_dir), f"model {model_dir.name}")
+
+    def get_file(self, path: Path) -> str:
+        """
+        Get the content fingerprint of a single artifact file (e.g. early-exit heads
+        stored in a model subdirectory, which get() does not cover).
+
+        Args:
+            path: Existing file
+
+        Returns:
+            str: Hex digest that changes whenever the file changes
+        """
+        path = Path(path)
+        return self._digest(path, [path], f"{path.parent.name}/{path.name}")
+
+    def _digest(self, identity: Path, files: List[Path], label: str) -> str:
+        """Hash files, memoized on their names, sizes and modification times."""
+        signature = json.dumps([
+            [f.name, f.stat().st_size, f.stat().st_mtime_ns] for f in files
+        ])
+        store_key = f"{identity.resolve()}:{hashlib.sha256(signature.encode('utf-8')).hexdigest()}"
+
+        digest = self._store.get(store_key)
+        if digest is not None:
+            return digest
+
+        with self._lock:
+            digest = self._store.get(store_key)
+            if digest is not None:
+                return digest
+
+            start_time = time.time()
+            hasher = hashlib.sha256()
+            for f in files:
+                hasher.update(f.name.encode('utf-8'))
+                with open(f, 'rb') as fh:
+                    for chunk in iter(lambda: fh.read(1024 * 1024), b''):
+                        hasher.update(chunk)
+            digest = hasher.hexdigest()
+            self._store.put(store_key, digest)
+            print(f"🔑 Fingerprinted {label} in {time.time() - start_time:.2f}s")
+            return digest
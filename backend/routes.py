@@ -1,12 +1,30 @@
 from flask import request, jsonify
 import traceback
 import time
-from transformers import AutoTokenizer
-from config import AVAILABLE_MODELS, LABEL_MAPPING, RATE_LIMIT_ANALYSIS, RATE_LIMIT_DEFAULT
-from model_utils import get_model_path
-from ai_utils import hf_pretrained_classify
-from explanations import get_lime_explanation, get_shap_explanation
+from config import (
+    AVAILABLE_MODELS, LABEL_MAPPING, RATE_LIMIT_ANALYSIS, RATE_LIMIT_DEFAULT, RATE_LIMIT_BATCH_TEXTS,
+    MAX_BATCH_EXPLAINED_TEXTS, JOB_MAX_WAIT, HEALTH_REQUIRE_READY
+)
+from ai_utils import (
+    hf_pretrained_classify,
+    get_batching_stats, get_model_cache_stats, get_prediction_cache_stats, get_inference_worker_stats,
+    get_model_memory_stats, get_model_load_stats, get_early_exit_stats
+)
+from text_scoring import check_text_length, get_batch_cost, validate_batch_texts, score_text_batch
+from long_text import (
+    parse_long_text_options, get_text_limit, score_long_text, long_text_details, LongTextError
+)
+# explain_lime is aliased: register_routes defines an explain_lime view that would shadow it
+from explanations import (
+    get_lime_explanation, get_shap_explanation, parse_lime_options, parse_shap_options,
+    get_explanation_cache_stats, explain_lime as run_lime_explanation
+)
+from ensemble import score_ensemble, TokenLimitError
+from cascade import is_cascade, get_entry_model, get_public_models, score_cascade, get_cascade_stats
+from jobs import job_manager, JobQueueFullError
+from warmup import warmup_manager
 from training_routes import register_training_routes
+from stream_routes import register_stream_routes
 from security import (
     validate_text_input, 
     validate_model_key, 
@@ -15,34 +33,77 @@ from security import (
     authenticate_user
 )
 
-def check_text_length(text, model_key, max_tokens=512):
+def run_check_deception(model_key, cleaned_text, top_n_words=None, encoding=None, long_text=None, word_level=False,
+                        lime_options=None):
     """
-    Check if text will exceed the model's token limit
+    Run prediction, SHAP and LIME for one validated text.
+    
+    Used directly by checkDeception and as the body of its async jobs.
     
     Args:
-        text: Input text to check
-        model_key: Key for the model (for tokenizer)
-        max_tokens: Maximum tokens allowed (default 512 for BERT)
+        model_key: Validated model key or cascade name (explanations then use
+            the model that decided)
+        cleaned_text: Validated text
+        top_n_words: Limit of explanation words (None = all words)
+        encoding: TextEncoding from check_text_length, reused by prediction and
+            explanation so the text is tokenized once
+        long_text: Options from parse_long_text_options; the text is scored in
+            windows and the most decisive window is explained
+        word_level: Aggregate SHAP token attributions into whole words
+        lime_options: LIME sample budget options from parse_lime_options
         
     Returns:
-        tuple: (is_valid, token_count, error_message)
+        dict: checkDeception response body
     """
-    try:
-        model_path = get_model_path(model_key)
-        tokenizer = AutoTokenizer.from_pretrained(model_path)
-        tokens = tokenizer.encode(text, truncation=False, add_special_tokens=True)
-        token_count = len(tokens)
-        
-        if token_count > max_tokens:
-            return False, token_count, f"Text contains {token_count} tokens, but model limit is {max_tokens}. Please reduce text length."
-        
-        return True, token_count, None
-        
-    except Exception as e:
-        # Fallback to character count if tokenizer fails
-        if len(text) > 1300:
-            return False, -1, "Text is too long. Please limit to 1300 characters."
-        return True, -1, None
+    start_time = time.time()
+    
+    # Run prediction
+    long_result = None
+    cascade_result = None
+    if is_cascade(model_key):
+        cascade_result = score_cascade(model_key, cleaned_text, encoding=encoding)
+        prediction = {'label': cascade_result['prediction'], 'score': cascade_result['confidence']}
+        model_key = cascade_result['model_used']
+        explained_text = cleaned_text
+        if encoding is not None and encoding.model_key != model_key:
+            encoding = None
+    elif long_text:
+        long_result = score_long_text(model_key, cleaned_text, **long_text)
+        prediction = {'label': long_result['prediction'], 'score': long_result['confidence']}
+        explained_text = long_result['decisive_text']
+        encoding = None
+    else:
+        input_ids = encoding.input_ids if encoding is not None else None
+        results = hf_pretrained_classify(model_key, cleaned_text, LABEL_MAPPING, input_ids=input_ids)
+        prediction = results[0]
+        explained_text = cleaned_text
+    
+    # Run SHAP explanation
+    shap_explanation = get_shap_explanation(model_key, explained_text, top_n_words=top_n_words,
+                                            encoding=encoding, word_level=word_level)
+    
+    # Run LIME explanation
+    lime_result = run_lime_explanation(model_key, explained_text, LABEL_MAPPING, top_n_words=top_n_words,
+                               encoding=encoding, **(lime_options or {}))
+    
+    end_time = time.time()
+    print(f"✅ checkDeception completed in {end_time - start_time:.3f}s - Model: {model_key}, Result: {prediction['label']}, Confidence: {prediction['score']:.3f}")
+    
+    # Build response
+    response = {
+        'is_deceptive': prediction['label'].lower() == 'deceptive',
+        'confidence': prediction['score'],
+        'shap_words': shap_explanation,
+        'lime_words': lime_result['words'],
+        'lime_samples': lime_result['samples'],
+        'lime_stability': lime_result['stability'],
+        'model_used': model_key
+    }
+    if long_result is not None:
+        response['long_text'] = long_text_details(long_result)
+    if cascade_result is not None:
+        response['cascade'] = cascade_result['cascade']
+    return response
 
 
 def register_routes(app):
@@ -51,15 +112,39 @@ def register_routes(app):
     # Register training routes
     register_training_routes(app)
 
+    # Register streaming bulk scoring route
+    register_stream_routes(app)
+
     # ===================== HEALTH CHECK =====================
 
     @app.route('/api/health', methods=['GET'])
     def health_check():
-        """Health check endpoint for Docker and monitoring."""
+        """Health check endpoint for Docker and monitoring.
+
+        Query parameters:
+          ready: If true, respond 503 until every model has warmed up, and
+                 keep responding 503 if any warm-up failed ('degraded', with
+                 the keys in warmup.failed_models). Always on when
+                 HEALTH_REQUIRE_READY is set.
+        """
+        warmup = warmup_manager.get_status()
+        require_ready = HEALTH_REQUIRE_READY or request.args.get('ready', '').lower() in ('1', 'true', 'yes')
+        status_code = 503 if require_ready and not warmup['ready'] else 200
         return jsonify({
-            'status': 'healthy',
-            'service': 'deception-detector-backend'
-        }), 200
+            'status': 'healthy' if warmup['ready'] else 'degraded' if warmup['degraded'] else 'warming_up',
+            'service': 'deception-detector-backend',
+            'warmup': warmup,
+            'batching': get_batching_stats(),
+            'model_cache': get_model_cache_stats(),
+            'model_loads': get_model_load_stats(),
+            'prediction_cache': get_prediction_cache_stats(),
+            'explanation_cache': get_explanation_cache_stats(),
+            'jobs': job_manager.get_stats(),
+            'inference_workers': get_inference_worker_stats(),
+            'model_memory': get_model_memory_stats(),
+            'early_exit': get_early_exit_stats(),
+            'cascades': get_cascade_stats()
+        }), status_code
 
     # ===================== PUBLIC API - JWT Auth =====================
 
@@ -105,15 +190,37 @@ def register_routes(app):
           {
             "text": "<text_to_analyze>",
             "modelName": "<model_key>",
-            "params": { ... optional extra params ... }
+            "params": { "top_n_words": null, "async": false, "long_text": false, "word_level": false,
+                        "num_samples": null, "adaptive": null }
           }
         
+        With "params": {"async": true} the response is 202 with
+        {"job_id", "status", "status_url"}; poll /api/public/jobs/<job_id>.
+        
+        With "params": {"long_text": true, "aggregation": "mean", "stride": 128}
+        texts over the token limit are scored in overlapping windows; the
+        explanations cover the most decisive window and the response adds a
+        "long_text" object with per-window scores.
+        
+        With "params": {"word_level": true} SHAP attributions of sub-word tokens
+        are summed into whole words using the tokenizer's offsets.
+        
+        "num_samples" caps the LIME perturbations; with "adaptive" (default
+        LIME_ADAPTIVE) sampling stops early once the top words and weights are
+        stable. "lime_samples" and "lime_stability" report what was used.
+        
+        A modelName configured in CASCADES is answered by its fast model, or by
+        its slow model when the fast one is unsure; the response adds a "cascade"
+        object whose "stage" says which one decided.
+        
         Response (JSON):
           {
             "is_deceptive": true/false,
             "confidence": 0.95,
             "shap_words": [["word1", 0.5], ["word2", -0.3], ...],
             "lime_words": [["word1", 0.6], ["word2", -0.2], ...],
+            "lime_samples": 300,
+            "lime_stability": 0.97,
             "model_used": "<model_key>"
           }
         """
@@ -127,61 +234,201 @@ def register_routes(app):
             model_key = data.get('modelName', '').strip()
             params = data.get('params', {})  # For future extensibility
             top_n_words = params.get('top_n_words', None)  # None = all words
+            word_level = bool(params.get('word_level', False))
+            
+            long_text, error_msg = parse_long_text_options(params)
+            if error_msg:
+                return jsonify({'error': error_msg}), 400
+            lime_options, error_msg = parse_lime_options(params)
+            if error_msg:
+                return jsonify({'error': error_msg}), 400
             
             # Validate text
-            is_valid, cleaned_text, error_msg = validate_text_input(text)
+            is_valid, cleaned_text, error_msg = validate_text_input(text, get_text_limit(params))
             if not is_valid:
                 print(f"⚠️ checkDeception - Invalid text: {error_msg}")
                 return jsonify({'error': error_msg}), 400
             
             # Validate model
-            is_valid, error_msg = validate_model_key(model_key, AVAILABLE_MODELS)
+            is_valid, error_msg = validate_model_key(model_key, get_public_models())
             if not is_valid:
                 print(f"⚠️ checkDeception - Invalid model key: {error_msg}")
                 return jsonify({'error': error_msg}), 400
+            if long_text and is_cascade(model_key):
+                return jsonify({'error': 'long_text is not supported for cascade models'}), 400
             
             print(f"🔐 checkDeception request - Model: {model_key}, Text length: {len(cleaned_text)}")
             
-            # Token length check
-            is_valid, token_count, error_msg = check_text_length(cleaned_text, model_key)
+            # Token length check (long-text mode splits the text into windows instead).
+            # The encoding is reused by prediction and explanation.
+            encoding = None
+            if not long_text:
+                is_valid, token_count, error_msg, encoding = check_text_length(cleaned_text, get_entry_model(model_key),
+                                                                               encode=True)
+                if not is_valid:
+                    print(f"⚠️ checkDeception - Text too long: {error_msg}")
+                    return jsonify({'error': error_msg}), 400
+            
+            # Async mode: queue the work and return a job ID immediately
+            if params.get('async', False):
+                try:
+                    job = job_manager.submit('checkDeception', run_check_deception,
+                                             model_key, cleaned_text, top_n_words, encoding, long_text, word_level,
+                                             lime_options)
+                except JobQueueFullError as e:
+                    print(f"⚠️ checkDeception - {str(e)}")
+                    return jsonify({'error': 'Too many pending jobs. Please try again later.'}), 503
+                
+                print(f"📋 checkDeception queued as job {job.job_id} - Model: {model_key}")
+                return jsonify({
+                    'job_id': job.job_id,
+                    'status': job.status,
+                    'status_url': f"/api/public/jobs/{job.job_id}"
+                }), 202
+            
+            try:
+                response = run_check_deception(model_key, cleaned_text, top_n_words, encoding, long_text, word_level,
+                                               lime_options)
+            except (LongTextError, TokenLimitError) as e:
+                print(f"⚠️ checkDeception - {str(e)}")
+                return jsonify({'error': str(e)}), 400
+            
+            end_time = time.time()
+            print(f"✅ checkDeception request completed in {end_time - start_time:.3f}s")
+            
+            return jsonify(response), 200
+            
+        except Exception as e:
+            print(f"❌ checkDeception error: {str(e)}")
+            return jsonify({'error': 'Check deception failed'}), 500
+
+    @app.route('/api/public/jobs/<job_id>', methods=['GET'])
+    @jwt_required
+    @rate_limit(limit=RATE_LIMIT_DEFAULT, window=60)
+    def get_job(job_id):
+        """Get the status/result of an async job.
+        
+        Query parameters:
+          wait: Seconds to long-poll for completion (capped at JOB_MAX_WAIT)
+        
+        Response (JSON):
+          {"job_id", "kind", "status": "queued|running|completed|failed",
+           "created_at", "started_at", "finished_at", "result" | "error"}
+        """
+        try:
+            wait = min(max(float(request.args.get('wait', 0)), 0.0), JOB_MAX_WAIT)
+        except ValueError:
+            return jsonify({'error': 'wait must be a number of seconds'}), 400
+        
+        job = job_manager.get(job_id, wait=wait)
+        if job is None:
+            return jsonify({'error': 'Job not found or expired'}), 404
+        return jsonify(job), 200
+
+    @app.route('/api/public/checkDeception/batch', methods=['POST'])
+    @jwt_required
+    @rate_limit(limit=RATE_LIMIT_BATCH_TEXTS, window=60, cost=get_batch_cost, bucket='batch')
+    def check_deception_batch():
+        """Public API endpoint to check deception for many texts in one call.
+        
+        Requires JWT in Authorization header: "Bearer <token>"
+        Rate limited per text, not per call. With include_explanations at most
+        MAX_BATCH_EXPLAINED_TEXTS texts are accepted.
+        
+        Request body (JSON):
+          {
+            "texts": ["<text_1>", "<text_2>", ...],
+            "modelName": "<model_key>",
+            "params": { "include_explanations": false, "top_n_words": null }
+          }
+        
+        Response (JSON):
+          {
+            "results": [
+              {"index": 0, "is_deceptive": true, "confidence": 0.95},
+              {"index": 1, "error": "Text cannot be empty"},
+              ...
+            ],
+            "count": 2,
+            "errors": 1,
+            "model_used": "<model_key>"
+          }
+        """
+        start_time = time.time()
+        try:
+            data = request.get_json()
+            if not data:
+                return jsonify({'error': 'No data provided'}), 400
+            
+            texts = data.get('texts')
+            model_key = data.get('modelName', '').strip()
+            params = data.get('params', {})
+            include_explanations = bool(params.get('include_explanations', False))
+            top_n_words = params.get('top_n_words', None)  # None = all words
+            
+            is_valid, error_msg = validate_batch_texts(texts)
             if not is_valid:
-                print(f"⚠️ checkDeception - Text too long: {error_msg}")
+                print(f"⚠️ checkDeception batch - Invalid texts: {error_msg}")
                 return jsonify({'error': error_msg}), 400
             
-            # Run prediction
-            results = hf_pretrained_classify(model_key, cleaned_text, LABEL_MAPPING)
-            prediction = results[0]
+            # Explanations run synchronously in the request, so only small batches may ask for them
+            if include_explanations and len(texts) > MAX_BATCH_EXPLAINED_TEXTS:
+                error_msg = (f"include_explanations allows at most {MAX_BATCH_EXPLAINED_TEXTS} texts per request "
+                             f"(got {len(texts)})")
+                print(f"⚠️ checkDeception batch - {error_msg}")
+                return jsonify({'error': error_msg}), 400
             
-            # Run SHAP explanation
-            shap_explanation = get_shap_explanation(model_key, cleaned_text, top_n_words=top_n_words)
+            is_valid, error_msg = validate_model_key(model_key, AVAILABLE_MODELS)
+            if not is_valid:
+                print(f"⚠️ checkDeception batch - Invalid model key: {error_msg}")
+                return jsonify({'error': error_msg}), 400
             
-            # Run LIME explanation
-            lime_explanation = get_lime_explanation(model_key, cleaned_text, LABEL_MAPPING, top_n_words=top_n_words)
+            print(f"🔐 checkDeception batch request - Model: {model_key}, Texts: {len(texts)}")
             
-            # Build response
-            is_deceptive = (prediction['label'].lower() == 'deceptive')
-            response = {
-                'is_deceptive': is_deceptive,
-                'confidence': prediction['score'],
-                'shap_words': shap_explanation,
-                'lime_words': lime_explanation,
-                'model_used': model_key
-            }
+            items, cleaned_texts = score_text_batch(texts, model_key)
             
+            results = []
+            explanations = {}
+            for item, cleaned_text in zip(items, cleaned_texts):
+                if 'error' in item:
+                    results.append(item)
+                    continue
+                
+                result = {
+                    'index': item['index'],
+                    'is_deceptive': item['prediction'].lower() == 'deceptive',
+                    'confidence': item['confidence']
+                }
+                if include_explanations:
+                    if cleaned_text not in explanations:
+                        explanations[cleaned_text] = (
+                            get_shap_explanation(model_key, cleaned_text, top_n_words=top_n_words),
+                            get_lime_explanation(model_key, cleaned_text, LABEL_MAPPING, top_n_words=top_n_words)
+                        )
+                    result['shap_words'], result['lime_words'] = explanations[cleaned_text]
+                results.append(result)
+            
+            error_count = sum(1 for result in results if 'error' in result)
             end_time = time.time()
-            print(f"✅ checkDeception completed in {end_time - start_time:.3f}s - Model: {model_key}, Result: {prediction['label']}, Confidence: {prediction['score']:.3f}")
+            print(f"✅ checkDeception batch completed in {end_time - start_time:.3f}s - Model: {model_key}, "
+                  f"Texts: {len(texts)}, Errors: {error_count}")
             
-            return jsonify(response), 200
+            return jsonify({
+                'results': results,
+                'count': len(results),
+                'errors': error_count,
+                'model_used': model_key
+            }), 200
             
         except Exception as e:
-            print(f"❌ checkDeception error: {str(e)}")
-            return jsonify({'error': 'Check deception failed'}), 500
+            print(f"❌ checkDeception batch error: {str(e)}")
+            return jsonify({'error': 'Check deception batch failed'}), 500
     
     @app.route('/api/models', methods=['GET'])
     @rate_limit(limit=RATE_LIMIT_DEFAULT, window=60)
     def get_models():
-        """Get available pretrained models."""
-        return jsonify(list(AVAILABLE_MODELS.keys()))
+        """Get available pretrained models (and cascade names)."""
+        return jsonify(list(get_public_models().keys()))
 
     @app.route('/api/predict', methods=['POST'])
     @rate_limit(limit=RATE_LIMIT_ANALYSIS, window=60)
@@ -196,36 +443,80 @@ def register_routes(app):
             text = data.get('text', '')
             model_key = data.get('model', '')
             
+            long_text, error_msg = parse_long_text_options(data)
+            if error_msg:
+                return jsonify({'error': error_msg}), 400
+            
             # Validate text input
-            is_valid, cleaned_text, error_msg = validate_text_input(text)
+            is_valid, cleaned_text, error_msg = validate_text_input(text, get_text_limit(data))
             if not is_valid:
                 print(f"⚠️ Invalid text input: {error_msg}")
                 return jsonify({'error': error_msg}), 400
             
             # Validate model key
-            is_valid, error_msg = validate_model_key(model_key, AVAILABLE_MODELS)
+            is_valid, error_msg = validate_model_key(model_key, get_public_models())
             if not is_valid:
                 print(f"⚠️ Invalid model key: {error_msg}")
                 return jsonify({'error': error_msg}), 400
+            if long_text and is_cascade(model_key):
+                return jsonify({'error': 'long_text is not supported for cascade models'}), 400
             
             print(f"📨 Prediction request - Model: {model_key}, Text length: {len(cleaned_text)}")
             
+            # Long-text mode: score overlapping windows instead of enforcing the token limit
+            if long_text:
+                try:
+                    result = score_long_text(model_key, cleaned_text, **long_text)
+                except LongTextError as e:
+                    print(f"⚠️ Text too long: {str(e)}")
+                    return jsonify({'error': str(e)}), 400
+                
+                end_time = time.time()
+                print(f"✅ API prediction completed in {end_time - start_time:.3f}s - Model: {model_key}, Result: {result['prediction']}, Confidence: {result['confidence']:.3f}")
+                return jsonify({
+                    'prediction': result['prediction'],
+                    'confidence': result['confidence'],
+                    'original_text': cleaned_text,
+                    'model_used': model_key,
+                    'long_text': long_text_details(result)
+                })
+            
             # Check if text will exceed token limits before processing
-            is_valid, token_count, error_msg = check_text_length(cleaned_text, model_key)
-            print(f"📊 Token count check: {token_count} tokens, Valid: {is_valid}")
+            is_valid, token_count, error_msg, encoding = check_text_length(cleaned_text, get_entry_model(model_key))
+            if token_count is None:
+                print(f"📊 Token count check: within limit by length bound, Valid: {is_valid}")
+            else:
+                print(f"📊 Token count check: {token_count} tokens, Valid: {is_valid}")
             if not is_valid:
                 print(f"⚠️ Text too long: {error_msg}")
                 return jsonify({'error': error_msg}), 400
             
-            results = hf_pretrained_classify(model_key, cleaned_text, LABEL_MAPPING)
-            prediction = results[0]
-            
-            response = {
-                'prediction': prediction['label'],
-                'confidence': prediction['score'],
-                'original_text': cleaned_text,
-                'model_used': model_key
-            }
+            # Cascades answer with the fast model unless it is unsure
+            if is_cascade(model_key):
+                try:
+                    result = score_cascade(model_key, cleaned_text, encoding=encoding)
+                except TokenLimitError as e:
+                    print(f"⚠️ Text too long: {str(e)}")
+                    return jsonify({'error': str(e)}), 400
+                prediction = {'label': result['prediction'], 'score': result['confidence']}
+                response = {
+                    'prediction': prediction['label'],
+                    'confidence': prediction['score'],
+                    'original_text': cleaned_text,
+                    'model_used': result['model_used'],
+                    'cascade': result['cascade']
+                }
+            else:
+                input_ids = encoding.input_ids if encoding is not None else None
+                results = hf_pretrained_classify(model_key, cleaned_text, LABEL_MAPPING, input_ids=input_ids)
+                prediction = results[0]
+                
+                response = {
+                    'prediction': prediction['label'],
+                    'confidence': prediction['score'],
+                    'original_text': cleaned_text,
+                    'model_used': model_key
+                }
             
             end_time = time.time()
             print(f"✅ API prediction completed in {end_time - start_time:.3f}s - Model: {model_key}, Result: {prediction['label']}, Confidence: {prediction['score']:.3f}")
@@ -236,6 +527,99 @@ def register_routes(app):
             print(f"❌ API prediction error: {str(e)}")
             return jsonify({'error': 'Prediction failed'}), 500
 
+    @app.route('/api/predict/ensemble', methods=['POST'])
+    @rate_limit(limit=RATE_LIMIT_ANALYSIS, window=60)
+    def predict_ensemble():
+        """Predict deception for one text with several models (per-model and aggregated scores).
+        
+        Request body (JSON):
+          {"text": "...", "models": ["bert-covid-1", "bert-combined-1"]}   (models default to all)
+        """
+        start_time = time.time()
+        try:
+            data = request.get_json()
+            if not data:
+                return jsonify({'error': 'No data provided'}), 400
+            
+            text = data.get('text', '')
+            model_keys = data.get('models') or list(AVAILABLE_MODELS.keys())
+            
+            is_valid, cleaned_text, error_msg = validate_text_input(text)
+            if not is_valid:
+                print(f"⚠️ Invalid text input: {error_msg}")
+                return jsonify({'error': error_msg}), 400
+            
+            if not isinstance(model_keys, list):
+                return jsonify({'error': "'models' must be a list of model keys"}), 400
+            model_keys = list(dict.fromkeys(model_keys))
+            for model_key in model_keys:
+                is_valid, error_msg = validate_model_key(model_key, AVAILABLE_MODELS)
+                if not is_valid:
+                    print(f"⚠️ Invalid model key: {error_msg}")
+                    return jsonify({'error': error_msg}), 400
+            
+            print(f"📨 Ensemble prediction request - Models: {len(model_keys)}, Text length: {len(cleaned_text)}")
+            
+            try:
+                result = score_ensemble(model_keys, cleaned_text)
+            except TokenLimitError as e:
+                print(f"⚠️ Text too long: {str(e)}")
+                return jsonify({'error': str(e)}), 400
+            
+            result['original_text'] = cleaned_text
+            
+            end_time = time.time()
+            print(f"✅ Ensemble prediction completed in {end_time - start_time:.3f}s - Result: {result['aggregate']['prediction']}")
+            
+            return jsonify(result)
+            
+        except Exception as e:
+            print(f"❌ Ensemble prediction error: {str(e)}")
+            return jsonify({'error': 'Prediction failed'}), 500
+
+    @app.route('/api/predict/batch', methods=['POST'])
+    @rate_limit(limit=RATE_LIMIT_BATCH_TEXTS, window=60, cost=get_batch_cost, bucket='batch')
+    def predict_batch():
+        """Predict deception for a list of texts (results in input order, errors per item)."""
+        start_time = time.time()
+        try:
+            data = request.get_json()
+            if not data:
+                return jsonify({'error': 'No data provided'}), 400
+            
+            texts = data.get('texts')
+            model_key = data.get('model', '')
+            
+            is_valid, error_msg = validate_batch_texts(texts)
+            if not is_valid:
+                print(f"⚠️ Invalid batch input: {error_msg}")
+                return jsonify({'error': error_msg}), 400
+            
+            is_valid, error_msg = validate_model_key(model_key, AVAILABLE_MODELS)
+            if not is_valid:
+                print(f"⚠️ Invalid model key: {error_msg}")
+                return jsonify({'error': error_msg}), 400
+            
+            print(f"📨 Batch prediction request - Model: {model_key}, Texts: {len(texts)}")
+            
+            results, _ = score_text_batch(texts, model_key)
+            error_count = sum(1 for result in results if 'error' in result)
+            
+            end_time = time.time()
+            print(f"✅ API batch prediction completed in {end_time - start_time:.3f}s - Model: {model_key}, "
+                  f"Texts: {len(texts)}, Errors: {error_count}")
+            
+            return jsonify({
+                'results': results,
+                'count': len(results),
+                'errors': error_count,
+                'model_used': model_key
+            })
+            
+        except Exception as e:
+            print(f"❌ API batch prediction error: {str(e)}")
+            return jsonify({'error': 'Batch prediction failed'}), 500
+
     @app.route('/api/explain/lime', methods=['POST'])
     @rate_limit(limit=RATE_LIMIT_ANALYSIS, window=60)
     def explain_lime():
@@ -259,12 +643,19 @@ def register_routes(app):
             if not is_valid:
                 return jsonify({'error': error_msg}), 400
             
+            lime_options, error_msg = parse_lime_options(data)
+            if error_msg:
+                return jsonify({'error': error_msg}), 400
+            
             print(f"🔍 LIME explanation request - Model: {model_key}, Text length: {len(cleaned_text)}, top_n_words: {top_n_words}")
             
-            lime_explanation = get_lime_explanation(model_key, cleaned_text, LABEL_MAPPING, top_n_words=top_n_words)
+            lime_result = run_lime_explanation(model_key, cleaned_text, LABEL_MAPPING, top_n_words=top_n_words, **lime_options)
+            lime_explanation = lime_result['words']
             
             response = {
                 'lime_explanation': lime_explanation,
+                'samples': lime_result['samples'],
+                'stability': lime_result['stability'],
                 'model_used': model_key
             }
             
@@ -290,6 +681,7 @@ def register_routes(app):
             text = data.get('text', '')
             model_key = data.get('model', '')
             top_n_words = data.get('top_n_words', None)  # None = all words
+            word_level = bool(data.get('word_level', False))
             
             # Validate inputs
             is_valid, cleaned_text, error_msg = validate_text_input(text)
@@ -300,9 +692,14 @@ def register_routes(app):
             if not is_valid:
                 return jsonify({'error': error_msg}), 400
             
+            shap_options, error_msg = parse_shap_options(data)
+            if error_msg:
+                return jsonify({'error': error_msg}), 400
+            
             print(f"📊 SHAP explanation request - Model: {model_key}, Text length: {len(cleaned_text)}, top_n_words: {top_n_words}")
             
-            shap_explanation = get_shap_explanation(model_key, cleaned_text, top_n_words=top_n_words)
+            shap_explanation = get_shap_explanation(model_key, cleaned_text, top_n_words=top_n_words,
+                                                    word_level=word_level, **shap_options)
             
             response = {
                 'shap_explanation': shap_explanation,
@@ -26,7 +26,7 @@ class RateLimiter:
         self.requests = defaultdict(list)
         self.lock = Lock()
     
-    def is_allowed(self, identifier, limit=10, window=60):
+    def is_allowed(self, identifier, limit=10, window=60, cost=1):
         """
         Check if request is allowed based on rate limit.
         
@@ -34,6 +34,7 @@ class RateLimiter:
             identifier: IP address or other identifier
             limit: Number of requests allowed
             window: Time window in seconds
+            cost: Units this request consumes (e.g. number of texts in a batch)
         
         Returns:
             bool: True if allowed, False if rate limited
@@ -48,35 +49,56 @@ class RateLimiter:
             ]
             
             # Check if under limit
-            if len(self.requests[identifier]) >= limit:
+            if len(self.requests[identifier]) + cost > limit:
                 return False
             
-            # Add current request
-            self.requests[identifier].append(now)
+            # Add current request (once per unit of cost)
+            self.requests[identifier].extend([now] * cost)
             return True
 
 # Global rate limiter instance
 rate_limiter = RateLimiter()
 
 
-def rate_limit(limit=10, window=60):
+def get_rate_limit_identifier(bucket=None):
+    """
+    Get the rate limit identifier of the current request.
+    
+    Args:
+        bucket: Optional name of a separate counter (see rate_limit)
+    
+    Returns:
+        str: Client IP address, suffixed with the bucket name
+    """
+    # Get real IP address from proxy headers (nginx forwards X-Real-IP)
+    # Fall back to remote_addr if not behind proxy
+    identifier = request.headers.get('X-Real-IP') or \
+                request.headers.get('X-Forwarded-For', '').split(',')[0].strip() or \
+                request.remote_addr
+    if bucket:
+        identifier = f"{identifier}:{bucket}"
+    return identifier
+
+
+def rate_limit(limit=10, window=60, cost=None, bucket=None):
     """
     Decorator for rate limiting endpoints.
     
     Args:
         limit: Number of requests allowed per window
         window: Time window in seconds
+        cost: Optional callable returning the units the current request consumes
+            (default: 1 per request)
+        bucket: Optional name of a separate counter (so per-text batch costs do not
+            exhaust the per-request limit of other endpoints)
     """
     def decorator(f):
         @wraps(f)
         def wrapped(*args, **kwargs):
-            # Get real IP address from proxy headers (nginx forwards X-Real-IP)
-            # Fall back to remote_addr if not behind proxy
-            identifier = request.headers.get('X-Real-IP') or \
-                        request.headers.get('X-Forwarded-For', '').split(',')[0].strip() or \
-                        request.remote_addr
+            identifier = get_rate_limit_identifier(bucket)
             
-            if not rate_limiter.is_allowed(identifier, limit, window):
+            units = max(1, int(cost())) if cost else 1
+            if not rate_limiter.is_allowed(identifier, limit, window, units):
                 return jsonify({
                     'error': 'Rate limit exceeded. Please try again later.'
                 }), 429
@@ -86,12 +108,13 @@ def rate_limit(limit=10, window=60):
     return decorator
 
 
-def validate_text_input(text):
+def validate_text_input(text, max_length=MAX_TEXT_LENGTH):
     """
     Validate text input for analysis.
     
     Args:
         text: Input text string
+        max_length: Maximum number of characters (larger in long-text mode)
     
     Returns:
         tuple: (is_valid, cleaned_text, error_message)
@@ -105,8 +128,8 @@ def validate_text_input(text):
     if not text:
         return False, None, "Text cannot be empty"
     
-    if len(text) > MAX_TEXT_LENGTH:
-        return False, None, f"Text exceeds maximum length of {MAX_TEXT_LENGTH} characters"
+    if len(text) > max_length:
+        return False, None, f"Text exceeds maximum length of {max_length} characters"
     
     # Basic XSS prevention (though this is a backend API, still good practice)
     if re.search(r'<script|javascript:|onerror=|onclick=', text, re.IGNORECASE):
@@ -275,6 +298,14 @@ def validate_training_params(params):
     except (ValueError, TypeError):
         return False, None, "Validation split must be a valid number"
     
+    # Early-exit heads (BERT and RoBERTa base models only)
+    early_exit = params.get('early_exit', False)
+    if not isinstance(early_exit, bool):
+        return False, None, "early_exit must be true or false"
+    if early_exit and base_model not in ('bert-base-uncased', 'roberta-base'):
+        return False, None, "early_exit is only available for bert-base-uncased and roberta-base"
+    validated['early_exit'] = early_exit
+    
     return True, validated, None
 
 
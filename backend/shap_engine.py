@@ -0,0 +1,120 @@
+"""
+SHAP Partition Trees
+Caches the partition tree SHAP's Text masker builds for each text (an O(n^2)
+heuristic over the tokens) so repeat explanations skip it, and replaces it
+for long texts with a balanced tree over whole-word groups that are never
+split, so the evaluation budget is spent on fewer, coarser features.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Callable, List
+
+import numpy as np
+
+from config import SHAP_TREE_CACHE_SIZE, SHAP_COARSE_TOKENS, SHAP_COARSE_GROUP_TOKENS
+
+
+def coarse_partition_tree(segments: List[str], group_tokens: int = SHAP_COARSE_GROUP_TOKENS) -> np.ndarray:
+    """
+    Build a balanced partition tree over groups of whole words.
+
+    Tokens are grouped left to right; a group closes at the first word boundary
+    after it reaches group_tokens tokens. Merges inside a group get a negative
+    distance, which PartitionExplainer treats as "never split" - the group's
+    credit is spread evenly over its tokens.
+
+    Args:
+        segments: Text segment of each token, as returned by the masker's
+            token_segments (trailing whitespace marks the end of a word)
+        group_tokens: Minimum tokens per group
+
+    Returns:
+        np.ndarray: Clustering matrix (len(segments) - 1 rows of left, right,
+            distance, size) in the format of shap's partition_tree
+    """
+    num_tokens = len(segments)
+    rows = []
+
+    def merge(left: int, right: int, size: int, distance: float) -> int:
+        rows.append((left, right, distance, size))
+        return num_tokens + len(rows) - 1
+
+    # Special tokens have empty segments, so they sit on word boundaries
+    groups, start = [], 0
+    for i in range(1, num_tokens):
+        boundary = not segments[i - 1] or segments[i - 1][-1].isspace() or not segments[i]
+        if boundary and i - start >= group_tokens:
+            groups.append((start, i))
+            start = i
+    groups.append((start, num_tokens))
+
+    nodes = []
+    for start, end in groups:
+        node = start
+        for token in range(start + 1, end):
+            node = merge(node, token, token - start + 1, -1.0)
+        nodes.append((node, end - start))
+
+    while len(nodes) > 1:
+        merged = [
+            (merge(left, right, left_size + right_size, (left_size + right_size) / num_tokens), left_size + right_size)
+            for (left, left_size), (right, right_size) in zip(nodes[0::2], nodes[1::2])
+        ]
+        if len(nodes) % 2:
+            merged.append(nodes[-1])
+        nodes = merged
+
+    return np.array(rows, dtype=np.float64).reshape(-1, 4)
+
+
+class PartitionTreeCache:
+    """LRU cache of partition trees, used in place of a Text masker's clustering method."""
+
+    def __init__(self, clustering: Callable[[str], np.ndarray], token_segments: Callable,
+                 coarse_tokens: int = SHAP_COARSE_TOKENS, group_tokens: int = SHAP_COARSE_GROUP_TOKENS,
+                 max_entries: int = SHAP_TREE_CACHE_SIZE):
+        """
+        Initialize the cache.
+
+        Args:
+            clustering: The masker's own clustering method (texts up to coarse_tokens)
+            token_segments: The masker's token_segments method
+            coarse_tokens: Texts with more tokens get a coarse_partition_tree (0 = never)
+            group_tokens: Minimum tokens per group of the coarse tree
+            max_entries: Trees kept (least recently used are evicted)
+        """
+        self.clustering = clustering
+        self.token_segments = token_segments
+        self.coarse_tokens = coarse_tokens
+        self.group_tokens = group_tokens
+        self.max_entries = max_entries
+        self._trees = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, s: str) -> np.ndarray:
+        """Partition tree of a text (PartitionExplainer calls masker.clustering(text))."""
+        with self._lock:
+            tree = self._trees.get(s)
+            if tree is not None:
+                self._trees.move_to_end(s)
+                self.hits += 1
+                return tree.copy()
+            self.misses += 1
+
+        segments, _ = self.token_segments(s)
+        if self.coarse_tokens and len(segments) > self.coarse_tokens:
+            tree = coarse_partition_tree(segments, self.group_tokens)
+            groups = int((tree[:, 2] >= 0).sum()) + 1
+            print(f"✂️ SHAP coarse grouping: {len(segments)} tokens in {groups} groups")
+        else:
+            tree = self.clustering(s)
+
+        with self._lock:
+            self._trees[s] = tree
+            self._trees.move_to_end(s)
+            while len(self._trees) > self.max_entries:
+                self._trees.popitem(last=False)
+        return tree.copy()
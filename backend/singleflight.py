@@ -0,0 +1,142 @@
+"""
+Single-Flight Loading
+Coordinates concurrent loads of the same key: the first caller runs the load,
+later callers wait on the same future, and failures are shared with every
+waiter and negatively cached for a short time.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict
+
+
+class SingleFlight:
+    """Per-key load coordination with a short-lived negative cache."""
+
+    def __init__(self, name: str, failure_ttl: float = 10, max_events: int = 50):
+        """
+        Initialize the coordinator.
+
+        Args:
+            name: Name used in log lines (e.g. 'model')
+            failure_ttl: Seconds a failed load is re-raised without retrying (0 = never cache failures)
+            max_events: Recent load events kept for get_stats
+        """
+        self.name = name
+        self.failure_ttl = float(failure_ttl)
+
+        self._lock = threading.Lock()
+        self._in_flight = {}  # key -> (Future, waiter count)
+        self._failures = {}   # key -> (exception, failed_at)
+        self._events = deque(maxlen=max_events)
+
+        self._loads = 0
+        self._failed = 0
+        self._shared_waits = 0
+        self._negative_hits = 0
+        self._max_waiters = 0
+
+    def do(self, key: str, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Run fn once per key at a time and share its outcome with concurrent callers.
+
+        Args:
+            key: Load key (e.g. the model key)
+            fn: Callable performing the load
+            *args, **kwargs: Arguments for fn
+
+        Returns:
+            The value returned by fn (for the leader and every waiter)
+
+        Raises:
+            Exception: Whatever fn raised, re-raised to every waiter and to
+                callers within failure_ttl of the failure
+        """
+        with self._lock:
+            failure = self._failures.get(key)
+            if failure is not None:
+                error, failed_at = failure
+                if time.time() - failed_at < self.failure_ttl:
+                    self._negative_hits += 1
+                    raise error
+                del self._failures[key]
+
+            if key in self._in_flight:
+                future, waiters = self._in_flight[key]
+                self._in_flight[key] = (future, waiters + 1)
+                self._shared_waits += 1
+                leader = False
+            else:
+                future = Future()
+                self._in_flight[key] = (future, 0)
+                leader = True
+
+        if not leader:
+            return future.result()
+
+        start_time = time.time()
+        try:
+            value = fn(*args, **kwargs)
+            error = None
+        except Exception as e:
+            value = None
+            error = e
+
+        elapsed = time.time() - start_time
+        with self._lock:
+            # Resolve before the key leaves _in_flight, so no caller can start a second load
+            # between the two (the outcome is already visible to everyone who finds the key)
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(value)
+            _, waiters = self._in_flight.pop(key)
+            self._loads += 1
+            self._max_waiters = max(self._max_waiters, waiters)
+            if error is not None:
+                self._failed += 1
+                if self.failure_ttl > 0:
+                    self._failures[key] = (error, time.time())
+            self._events.append({
+                'key': key,
+                'seconds': round(elapsed, 3),
+                'waiters': waiters,
+                'ok': error is None,
+                'error': str(error) if error is not None else None,
+                'finished_at': time.time(),
+            })
+
+        if waiters:
+            print(f"🚦 {self.name.capitalize()} load of {key} took {elapsed:.2f}s and was shared with {waiters} waiting request(s)")
+
+        if error is not None:
+            raise error
+        return value
+
+    def forget(self, key: str) -> None:
+        """Drop a negatively cached failure so the next call retries immediately."""
+        with self._lock:
+            self._failures.pop(key, None)
+
+    def is_loading(self, key: str) -> bool:
+        """Check whether a load of key is in flight."""
+        with self._lock:
+            return key in self._in_flight
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get load counters, in-flight loads and recent load events."""
+        now = time.time()
+        with self._lock:
+            return {
+                'loads': self._loads,
+                'failed': self._failed,
+                'shared_waits': self._shared_waits,
+                'negative_cache_hits': self._negative_hits,
+                'max_waiters': self._max_waiters,
+                'in_flight': {key: waiters for key, (_, waiters) in self._in_flight.items()},
+                'failing': [key for key, (_, failed_at) in self._failures.items()
+                            if now - failed_at < self.failure_ttl],
+                'recent': list(self._events),
+            }
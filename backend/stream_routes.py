@@ -0,0 +1,247 @@
+"""
+Streaming Bulk Scoring
+Scores newline-delimited JSON or CSV uploads of any size. The request body is
+read incrementally and results are streamed back as NDJSON after every batch,
+so memory stays flat regardless of input size.
+"""
+
+import csv
+import io
+import json
+import time
+from flask import request, jsonify, Response, stream_with_context
+
+from config import (
+    AVAILABLE_MODELS, RATE_LIMIT_ANALYSIS, RATE_LIMIT_BATCH_TEXTS,
+    STREAM_BATCH_SIZE, STREAM_MAX_LINE_BYTES, STREAM_MAX_RECORDS
+)
+from security import validate_model_code, rate_limit, rate_limiter, get_rate_limit_identifier, jwt_required
+from text_scoring import score_text_batch
+
+NDJSON_CONTENT_TYPES = ('application/x-ndjson', 'application/jsonl', 'application/json-lines')
+CSV_CONTENT_TYPES = ('text/csv', 'application/csv')
+
+
+class StreamLimitError(Exception):
+    """Raised when a stream exceeds the record limit or the per-text rate limit."""
+
+
+def resolve_stream_model(model_name):
+    """
+    Resolve a pretrained model key or custom model code to a model key.
+
+    Args:
+        model_name: AVAILABLE_MODELS key or 6-character custom model code
+
+    Returns:
+        tuple: (model_key, error_message, status_code)
+    """
+    if not model_name:
+        return None, "modelName query parameter is required", 400
+
+    if model_name in AVAILABLE_MODELS:
+        return model_name, None, None
+
+    is_valid, model_code, error_msg = validate_model_code(model_name)
+    if not is_valid:
+        return None, f"Unknown model: {model_name}", 400
+
+    from model_trainer import is_model_completed, is_model_expired
+    if not is_model_completed(model_code):
+        return None, "Model not found or not completed", 404
+    if is_model_expired(model_code):
+        return None, "Model has expired", 410
+
+    return f"custom_{model_code}", None, None
+
+
+def iter_ndjson_records(stream):
+    """
+    Read NDJSON records line by line from a binary stream.
+
+    Each line is a JSON object with a 'text' field (and an optional 'id'),
+    or a bare JSON string.
+
+    Yields:
+        tuple: (line_number, record_id, text, error_message)
+    """
+    line_no = 0
+    while True:
+        raw = stream.readline(STREAM_MAX_LINE_BYTES + 1)
+        if not raw:
+            return
+        line_no += 1
+
+        if len(raw) > STREAM_MAX_LINE_BYTES and not raw.endswith(b'\n'):
+            # Skip the rest of the oversized line without buffering it
+            while raw and not raw.endswith(b'\n'):
+                raw = stream.readline(STREAM_MAX_LINE_BYTES)
+            yield line_no, None, None, f"Line exceeds {STREAM_MAX_LINE_BYTES} bytes"
+            continue
+
+        line = raw.decode('utf-8', errors='replace').strip()
+        if not line:
+            continue
+
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield line_no, None, None, "Invalid JSON"
+            continue
+
+        if isinstance(record, str):
+            yield line_no, None, record, None
+        elif isinstance(record, dict):
+            yield line_no, record.get('id'), record.get('text'), None
+        else:
+            yield line_no, None, None, "Expected a JSON object or string"
+
+
+def iter_csv_records(stream):
+    """
+    Read CSV rows incrementally from a binary stream.
+
+    The header must contain a 'text' column; an 'id' column is passed through.
+
+    Yields:
+        tuple: (row_number, record_id, text, error_message)
+    """
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', errors='replace', newline=''))
+    if not reader.fieldnames or 'text' not in reader.fieldnames:
+        raise ValueError("CSV header must contain a 'text' column")
+
+    for row_no, row in enumerate(reader, 1):
+        yield row_no, row.get('id'), row.get('text'), None
+
+
+def score_records(records, model_key, identifier=None):
+    """
+    Score one batch of parsed records.
+
+    Args:
+        records: (line_number, record_id, text, error_message) tuples
+        model_key: Validated model key
+        identifier: Rate limit identifier the texts are charged to (None = not charged)
+
+    Returns:
+        list: Result dicts in record order
+
+    Raises:
+        StreamLimitError: If the texts exceed the per-text rate limit
+    """
+    texts = [text for _, _, text, error_msg in records if error_msg is None]
+    if identifier and texts and not rate_limiter.is_allowed(identifier, RATE_LIMIT_BATCH_TEXTS, 60, len(texts)):
+        raise StreamLimitError("Rate limit exceeded. Please try again later.")
+    items = iter(score_text_batch(texts, model_key)[0]) if texts else iter(())
+
+    results = []
+    for line_no, record_id, _, error_msg in records:
+        result = {'line': line_no}
+        if record_id is not None:
+            result['id'] = record_id
+
+        if error_msg is not None:
+            result['error'] = error_msg
+        else:
+            item = next(items)
+            if 'error' in item:
+                result['error'] = item['error']
+            else:
+                result['prediction'] = item['prediction']
+                result['confidence'] = item['confidence']
+        results.append(result)
+    return results
+
+
+def register_stream_routes(app):
+    """Register the streaming bulk scoring route."""
+
+    @app.route('/api/public/score/stream', methods=['POST'])
+    @jwt_required
+    @rate_limit(limit=RATE_LIMIT_ANALYSIS, window=60)
+    def score_stream():
+        """Stream-score an NDJSON or CSV upload.
+
+        Requires JWT in Authorization header: "Bearer <token>"
+
+        Query parameters:
+          modelName: AVAILABLE_MODELS key or custom model code
+          format: 'ndjson' or 'csv' (default: taken from the Content-Type header)
+
+        Request body: NDJSON lines ({"id": ..., "text": "..."} or "...") or CSV with a text column,
+          at most STREAM_MAX_RECORDS records. Every text counts against the per-text
+          batch rate limit (RATE_LIMIT_BATCH_TEXTS); the stream stops when it runs out.
+
+        Response (NDJSON, one line per input record, then a summary line):
+          {"line": 1, "id": "a1", "prediction": "deceptive", "confidence": 0.95}
+          {"line": 2, "error": "Text cannot be empty"}
+          {"done": true, "count": 2, "errors": 1}
+        """
+        model_key, error_msg, status_code = resolve_stream_model(request.args.get('modelName', '').strip())
+        if error_msg:
+            print(f"⚠️ Stream scoring - {error_msg}")
+            return jsonify({'error': error_msg}), status_code
+
+        content_type = (request.mimetype or '').lower()
+        input_format = request.args.get('format', '').strip().lower()
+        if not input_format:
+            input_format = 'csv' if content_type in CSV_CONTENT_TYPES else 'ndjson'
+        if input_format not in ('ndjson', 'csv'):
+            return jsonify({'error': "format must be 'ndjson' or 'csv'"}), 400
+        if input_format == 'ndjson' and content_type not in NDJSON_CONTENT_TYPES + ('application/json', 'text/plain', ''):
+            return jsonify({'error': f"Unsupported Content-Type for NDJSON: {content_type}"}), 415
+
+        stream = request.stream
+        # Texts share the per-text bucket of the batch endpoints
+        identifier = get_rate_limit_identifier('batch')
+        print(f"📥 Stream scoring request - Model: {model_key}, Format: {input_format}")
+
+        def generate():
+            start_time = time.time()
+            count = 0
+            errors = 0
+            batch = []
+            try:
+                records = iter_csv_records(stream) if input_format == 'csv' else iter_ndjson_records(stream)
+                too_many = False
+                for record in records:
+                    if count + len(batch) >= STREAM_MAX_RECORDS:
+                        too_many = True
+                        break
+                    batch.append(record)
+                    if len(batch) < STREAM_BATCH_SIZE:
+                        continue
+                    results = score_records(batch, model_key, identifier)
+                    batch = []
+                    count += len(results)
+                    errors += sum(1 for result in results if 'error' in result)
+                    yield ''.join(json.dumps(result) + '\n' for result in results)
+
+                if batch:
+                    results = score_records(batch, model_key, identifier)
+                    count += len(results)
+                    errors += sum(1 for result in results if 'error' in result)
+                    yield ''.join(json.dumps(result) + '\n' for result in results)
+
+                if too_many:
+                    raise StreamLimitError(f"Stream exceeds the limit of {STREAM_MAX_RECORDS} records")
+
+                end_time = time.time()
+                print(f"✅ Stream scoring completed in {end_time - start_time:.3f}s - Model: {model_key}, "
+                      f"Records: {count}, Errors: {errors}")
+                yield json.dumps({'done': True, 'count': count, 'errors': errors}) + '\n'
+
+            except StreamLimitError as e:
+                print(f"⚠️ Stream scoring stopped after {count} records: {str(e)}")
+                yield json.dumps({'done': False, 'count': count, 'errors': errors, 'error': str(e)}) + '\n'
+
+            except Exception as e:
+                print(f"❌ Stream scoring error after {count} records: {str(e)}")
+                yield json.dumps({'done': False, 'count': count, 'errors': errors,
+                                  'error': f'Stream scoring failed: {str(e)}'}) + '\n'
+
+        return Response(
+            stream_with_context(generate()),
+            mimetype='application/x-ndjson',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
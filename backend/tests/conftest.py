@@ -0,0 +1,74 @@
+"""
+Shared fixtures for the backend tests.
+
+Run from backend/ with `python -m pytest tests`. Tests that need the model
+stack (torch, transformers) skip when it is not installed. Model tests use a
+tiny randomly initialized BERT saved to a temporary directory, so no model
+download is needed.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+# Keep the result caches out of backend/cache
+os.environ.setdefault('CACHE_DIR', tempfile.mkdtemp(prefix='dd-test-cache-'))
+
+TINY_MODEL_KEY = 'tiny-test-bert'
+TINY_VOCAB = ['[PAD]', '[UNK]', '[CLS]', '[SEP]', '[MASK]', 'the', 'vaccine', 'is', 'a', 'total', 'hoax',
+              'made', 'by', 'big', 'pharma', 'to', 'control', 'people', 'climate', 'change', 'real',
+              'scient', '##ists', 'say', 'true', '.', ',']
+
+
+@pytest.fixture(scope='session')
+def tiny_model_dir(tmp_path_factory):
+    """Directory with a tiny sequence classifier and its WordPiece tokenizer."""
+    pytest.importorskip('torch')
+    transformers = pytest.importorskip('transformers')
+
+    model_dir = tmp_path_factory.mktemp('models') / TINY_MODEL_KEY
+    model_dir.mkdir()
+    vocab_file = model_dir / 'vocab.txt'
+    vocab_file.write_text('\n'.join(TINY_VOCAB) + '\n')
+
+    # Positional: the keyword is vocab_file in transformers 4 and vocab in 5
+    tokenizer = transformers.BertTokenizerFast(str(vocab_file), model_max_length=64)
+    config = transformers.BertConfig(
+        vocab_size=len(TINY_VOCAB), hidden_size=16, num_hidden_layers=2, num_attention_heads=2,
+        intermediate_size=32, max_position_embeddings=64, num_labels=2,
+        id2label={0: '0', 1: '1'}, label2id={'0': 0, '1': 1},
+    )
+    transformers.set_seed(0)
+    model = transformers.BertForSequenceClassification(config)
+    model.save_pretrained(model_dir)
+    tokenizer.save_pretrained(model_dir)
+    return model_dir
+
+
+@pytest.fixture(scope='session')
+def tiny_model_key(tiny_model_dir):
+    """Key of the tiny model, registered in AVAILABLE_MODELS for the whole session."""
+    from config import AVAILABLE_MODELS
+    AVAILABLE_MODELS[TINY_MODEL_KEY] = {'path': tiny_model_dir, 'hf_id': None}
+    yield TINY_MODEL_KEY
+    AVAILABLE_MODELS.pop(TINY_MODEL_KEY, None)
+
+
+@pytest.fixture
+def client():
+    """Flask test client with every API route registered."""
+    pytest.importorskip('flask')
+    pytest.importorskip('torch')
+    pytest.importorskip('transformers')
+    from flask import Flask
+    from routes import register_routes
+
+    app = Flask(__name__)
+    register_routes(app)
+    return app.test_client()
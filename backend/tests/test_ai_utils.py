@@ -0,0 +1,35 @@
+"""Prediction helpers and the served-model fingerprint."""
+
+import numpy as np
+
+
+def test_fingerprint_is_memoized_until_eviction(tiny_model_key, monkeypatch):
+    import ai_utils
+    import model_utils
+
+    ai_utils.evict_model(tiny_model_key)
+    calls = []
+    get_model_path = model_utils.get_model_path
+    monkeypatch.setattr(model_utils, 'get_model_path', lambda key: calls.append(key) or get_model_path(key))
+
+    fingerprint = ai_utils.get_model_fingerprint(tiny_model_key)
+    assert ai_utils.get_model_fingerprint(tiny_model_key) == fingerprint
+    assert calls == [tiny_model_key]
+
+    ai_utils.get_loaded_model(tiny_model_key)
+    ai_utils.get_model_fingerprint(tiny_model_key)
+    ai_utils.evict_model(tiny_model_key)
+    assert ai_utils.get_model_fingerprint(tiny_model_key) == fingerprint
+    assert len(calls) == 4  # cold load, refresh after the load, refresh after the eviction
+
+
+def test_pred_probs_of_no_texts_is_empty(tiny_model_key):
+    from ai_utils import get_pred_probs
+    from config import CLASS_NAMES
+
+    probs = get_pred_probs(tiny_model_key, [])
+    assert probs.shape == (0, len(CLASS_NAMES))
+
+    probs = get_pred_probs(tiny_model_key, ['the vaccine is a hoax', 'climate change is real'])
+    assert probs.shape == (2, len(CLASS_NAMES))
+    np.testing.assert_allclose(probs.sum(axis=1), 1.0, atol=1e-5)
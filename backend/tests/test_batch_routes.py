@@ -0,0 +1,53 @@
+"""Batch checkDeception: per-text scoring, per-text rate cost and the include_explanations cap."""
+
+import pytest
+
+
+def _post_batch(client, texts, model_key, remote_addr='127.0.0.1', **params):
+    from security import create_jwt_token
+
+    return client.post('/api/public/checkDeception/batch',
+                       json={'texts': texts, 'modelName': model_key, 'params': params},
+                       headers={'Authorization': f'Bearer {create_jwt_token()}'},
+                       environ_base={'REMOTE_ADDR': remote_addr})
+
+
+def test_batch_scores_every_text(client, tiny_model_key):
+    response = _post_batch(client, ['the vaccine is a hoax', '', 'climate change is real'], tiny_model_key)
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['count'] == 3
+    assert data['errors'] == 1
+    assert 'is_deceptive' in data['results'][0]
+
+
+def test_batch_rejects_explanations_for_large_batches(client, tiny_model_key):
+    from config import MAX_BATCH_EXPLAINED_TEXTS
+
+    texts = ['the vaccine is a hoax'] * (MAX_BATCH_EXPLAINED_TEXTS + 1)
+    response = _post_batch(client, texts, tiny_model_key, include_explanations=True)
+    assert response.status_code == 400
+    assert 'include_explanations' in response.get_json()['error']
+
+
+def test_batch_cost_is_one_unit_per_text(client):
+    from config import MAX_BATCH_TEXTS
+    from text_scoring import get_batch_cost
+
+    for body, expected in (({'texts': ['a', 'b', 'c']}, 3), ({'texts': ['a'] * (MAX_BATCH_TEXTS + 5)}, MAX_BATCH_TEXTS),
+                           ({'texts': 'not a list'}, 1), ({}, 1)):
+        with client.application.test_request_context(json=body):
+            assert get_batch_cost() == expected
+
+
+def test_batch_is_charged_per_text_in_its_own_bucket(client, tiny_model_key):
+    from config import RATE_LIMIT_BATCH_TEXTS
+    from security import rate_limiter
+
+    remote_addr = '10.0.1.1'
+    assert rate_limiter.is_allowed(f'{remote_addr}:batch', RATE_LIMIT_BATCH_TEXTS, 60, RATE_LIMIT_BATCH_TEXTS - 2)
+
+    assert _post_batch(client, ['the vaccine is a hoax'] * 3, tiny_model_key, remote_addr).status_code == 429
+    assert _post_batch(client, ['the vaccine is a hoax'] * 2, tiny_model_key, remote_addr).status_code == 200
+    assert _post_batch(client, ['the vaccine is a hoax'], tiny_model_key, remote_addr).status_code == 429
+    assert rate_limiter.is_allowed(remote_addr, 10, 60)  # the per-request bucket is untouched
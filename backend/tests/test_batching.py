@@ -0,0 +1,48 @@
+"""Micro-batching of concurrent single-text predictions."""
+
+import threading
+
+import pytest
+
+
+def test_concurrent_submissions_share_batches():
+    from batching import MicroBatcher
+
+    batches = []
+    release = threading.Event()
+
+    def run_batch(payloads):
+        release.wait(5)
+        batches.append(list(payloads))
+        return [payload * 2 for payload in payloads]
+
+    batcher = MicroBatcher('test', run_batch, max_batch_size=4, max_wait_ms=200)
+    futures = [batcher.submit(i) for i in range(6)]
+    release.set()
+
+    assert [future.result(timeout=5) for future in futures] == [i * 2 for i in range(6)]
+    assert max(len(batch) for batch in batches) <= 4
+    assert len(batches) < 6
+    assert batcher.get_stats()['requests'] == 6
+
+
+def test_batch_errors_reach_every_caller():
+    from batching import MicroBatcher
+
+    def run_batch(payloads):
+        raise ValueError('boom')
+
+    batcher = MicroBatcher('failing', run_batch, max_batch_size=2, max_wait_ms=50)
+    futures = [batcher.submit(i) for i in range(2)]
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result(timeout=5)
+    assert batcher.get_stats()['errors'] >= 1
+
+
+def test_single_texts_go_through_the_batcher(tiny_model_key):
+    from ai_utils import get_batching_stats, hf_pretrained_classify
+
+    result = hf_pretrained_classify(tiny_model_key, 'scientists say the vaccine is real')
+    assert result[0]['label'] in ('0', '1')
+    assert get_batching_stats()['models'][tiny_model_key]['requests'] >= 1
@@ -0,0 +1,42 @@
+"""Model cascades: CASCADES parsing and fast/slow routing."""
+
+import pytest
+
+
+def test_parse_cascades_skips_invalid_entries():
+    from cascade import parse_cascades, format_cascade_spec
+
+    models = {'fast': {}, 'slow': {}}
+    spec = ';'.join([
+        format_cascade_spec('quick', 'fast', 'slow', 0.2, 0.8),
+        'broken',
+        'unknown=fast>missing@0.2:0.8',
+        'inverted=fast>slow@0.9:0.1',
+    ])
+    cascades = parse_cascades(spec, models)
+    assert list(cascades) == ['quick']
+    assert cascades['quick'].to_dict() == {'fast_model': 'fast', 'slow_model': 'slow', 'band': [0.2, 0.8]}
+    assert cascades['quick'].escalates(0.5)
+    assert not cascades['quick'].escalates(0.9)
+
+
+@pytest.mark.parametrize('band, stage', [((0.0, 1.0), 'slow'), ((0.0, 0.0), 'fast')])
+def test_score_cascade_escalates_inside_the_band(tiny_model_key, monkeypatch, band, stage):
+    import cascade
+    from ai_utils import encode_text
+
+    monkeypatch.setitem(cascade.CASCADES, 'tiny-cascade',
+                        cascade.Cascade('tiny-cascade', tiny_model_key, tiny_model_key, *band))
+    monkeypatch.setitem(cascade._stats, 'tiny-cascade', {'requests': 0, 'escalated': 0})
+    assert cascade.is_cascade('tiny-cascade')
+    assert cascade.get_entry_model('tiny-cascade') == tiny_model_key
+    assert 'tiny-cascade' in cascade.get_public_models()
+
+    text = 'the vaccine is made by big pharma'
+    result = cascade.score_cascade('tiny-cascade', text, encoding=encode_text(tiny_model_key, text))
+    assert result['cascade']['stage'] == stage
+    assert result['model_used'] == tiny_model_key
+    assert result['prediction'] in ('deceptive', 'truthful')
+    stats = cascade.get_cascade_stats()['tiny-cascade']
+    assert stats['requests'] == 1
+    assert stats['escalated'] == int(stage == 'slow')
@@ -0,0 +1,90 @@
+"""Early exit: head training, the layer-by-layer forward pass and loading."""
+
+import shutil
+
+import numpy as np
+import pytest
+
+TEXTS = ['the vaccine is a total hoax', 'climate change is real', 'big pharma made the vaccine',
+         'scientists say the vaccine is true', 'a hoax to control people', 'climate scientists say it is real']
+LABELS = [0, 1, 0, 1, 0, 1]
+
+
+@pytest.fixture
+def early_exit_model(tiny_model_dir, tmp_path):
+    """A copy of the tiny model with exit heads after its first layer."""
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+    from early_exit import train_early_exit
+
+    model_dir = tmp_path / 'early-exit-bert'
+    shutil.copytree(tiny_model_dir, model_dir)
+    model = AutoModelForSequenceClassification.from_pretrained(str(model_dir)).eval()
+    tokenizer = AutoTokenizer.from_pretrained(str(model_dir))
+    report = train_early_exit(model, tokenizer, str(model_dir), TEXTS, LABELS, layers=[1],
+                              thresholds=(0.5, 0.99), latency_samples=2)
+    return model_dir, model, tokenizer, report
+
+
+def test_train_early_exit_writes_heads_and_report(early_exit_model):
+    from early_exit import get_heads_path, load_report, format_report
+
+    model_dir, _, _, report = early_exit_model
+    assert get_heads_path(str(model_dir)).exists()
+    assert load_report(str(model_dir)) == report
+    assert report['exit_layers'] == [1]
+    assert [r['threshold'] for r in report['thresholds']] == [0.5, 0.99]
+    # Every row clears a 0.5 threshold on a binary head
+    assert report['thresholds'][0]['exit_rates']['1'] == 1.0
+    assert format_report(report)
+
+
+def test_early_exit_runner_matches_the_full_model_when_no_row_exits(early_exit_model, monkeypatch):
+    import torch
+    import early_exit
+
+    model_dir, model, tokenizer, _ = early_exit_model
+    monkeypatch.setattr(early_exit, 'EARLY_EXIT_THRESHOLDS', {'all': 1.01})
+    runner = early_exit.load_early_exit('early-exit-bert', str(model_dir), model)
+    assert runner is not None
+
+    batch = dict(tokenizer(TEXTS, padding=True, return_tensors='pt'))
+    with torch.inference_mode():
+        expected = model(**batch).logits.numpy()
+    assert np.allclose(runner.logits(batch), expected, atol=1e-5)
+    assert runner.get_stats()['exit_rates'] == {'2': 1.0}
+
+    runner.threshold = 0.0
+    runner.logits(batch)
+    stats = runner.get_stats()
+    assert stats['rows'] == 2 * len(TEXTS)
+    assert stats['exit_rates'] == {'1': 0.5, '2': 0.5}
+
+
+def test_early_exit_is_off_without_a_threshold(early_exit_model, monkeypatch):
+    import early_exit
+
+    model_dir, model, _, _ = early_exit_model
+    monkeypatch.setattr(early_exit, 'EARLY_EXIT_THRESHOLDS', {})
+    assert not early_exit.is_early_exit_enabled('early-exit-bert', str(model_dir))
+    assert early_exit.load_early_exit('early-exit-bert', str(model_dir), model) is None
+
+
+def test_fingerprint_changes_when_the_heads_are_retrained(early_exit_model, monkeypatch):
+    import ai_utils
+    import early_exit
+    from config import AVAILABLE_MODELS
+
+    model_dir, model, tokenizer, _ = early_exit_model
+    monkeypatch.setitem(AVAILABLE_MODELS, 'early-exit-bert', {'path': model_dir, 'hf_id': None})
+    monkeypatch.setattr(early_exit, 'EARLY_EXIT_THRESHOLDS', {'early-exit-bert': 0.9})
+    ai_utils._forget_fingerprint('early-exit-bert')
+    before = ai_utils.get_model_fingerprint('early-exit-bert')
+    assert '-exit0.9-' in before
+
+    # Same threshold, different heads
+    early_exit.train_early_exit(model, tokenizer, str(model_dir), TEXTS[::-1], LABELS[::-1], layers=[1],
+                                thresholds=(0.9,), latency_samples=1)
+    ai_utils._forget_fingerprint('early-exit-bert')
+    after = ai_utils.get_model_fingerprint('early-exit-bert')
+    assert after != before
+    assert after.split('-exit')[0] == before.split('-exit')[0]
@@ -0,0 +1,74 @@
+"""Stacked (vmapped) ensemble scoring and release of the stacked weights."""
+
+import numpy as np
+import pytest
+
+TEXT = 'the vaccine is a total hoax'
+
+
+@pytest.fixture
+def twin_model_keys(tiny_model_key, tiny_model_dir):
+    """Two keys serving the tiny model, so they share one architecture."""
+    from config import AVAILABLE_MODELS
+    AVAILABLE_MODELS['tiny-test-bert-twin'] = {'path': tiny_model_dir, 'hf_id': None}
+    yield [tiny_model_key, 'tiny-test-bert-twin']
+    AVAILABLE_MODELS.pop('tiny-test-bert-twin', None)
+
+
+def test_vmap_is_off_by_default(twin_model_keys):
+    import ensemble
+
+    assert not ensemble.ENSEMBLE_VMAP
+    result = ensemble.score_ensemble(twin_model_keys, TEXT)
+    assert [group['mode'] for group in result['groups']] == ['sequential']
+
+
+def test_vmap_matches_the_per_model_loop(twin_model_keys, monkeypatch):
+    import ensemble
+
+    sequential = ensemble.score_ensemble(twin_model_keys, TEXT)
+    monkeypatch.setattr(ensemble, 'ENSEMBLE_VMAP', True)
+    stacked = ensemble.score_ensemble(twin_model_keys, TEXT)
+    assert [group['mode'] for group in stacked['groups']] == ['vmap']
+    for key in twin_model_keys:
+        assert stacked['models'][key]['deceptive_score'] == pytest.approx(
+            sequential['models'][key]['deceptive_score'], abs=1e-5)
+    assert stacked['aggregate']['prediction'] == sequential['aggregate']['prediction']
+
+
+def test_stack_is_charged_to_the_model_cache_and_released_on_eviction(twin_model_keys, monkeypatch):
+    import ensemble
+    from ai_utils import evict_model, get_loaded_model, get_model_cache_stats
+
+    monkeypatch.setattr(ensemble, 'ENSEMBLE_VMAP', True)
+    ensemble.score_ensemble(twin_model_keys, TEXT)
+    key = ensemble.get_stack_key([get_loaded_model(k) for k in twin_model_keys])
+    assert key in ensemble._stacks
+    stack_stats = get_model_cache_stats()['models'][key]
+    params = sum(get_loaded_model(k).param_bytes for k in twin_model_keys)
+    assert stack_stats['size_mb'] == pytest.approx(params / 1024**2, abs=0.1)
+    assert not stack_stats['pinned']
+
+    assert evict_model('tiny-test-bert-twin')
+    assert key not in ensemble._stacks
+    assert key not in get_model_cache_stats()['models']
+    assert 'tiny-test-bert-twin' not in ensemble._architectures
+
+
+def test_groups_that_do_not_fit_the_budget_run_sequentially(twin_model_keys, monkeypatch):
+    import ensemble
+
+    monkeypatch.setattr(ensemble, 'ENSEMBLE_VMAP', True)
+    monkeypatch.setattr(ensemble, 'get_model_cache_headroom', lambda keep: 0)
+    result = ensemble.score_ensemble(twin_model_keys, TEXT)
+    assert [group['mode'] for group in result['groups']] == ['sequential']
+
+
+def test_stacked_base_holds_no_weights(twin_model_keys):
+    from ai_utils import get_loaded_model
+    from ensemble import StackedModels
+
+    models = [get_loaded_model(k).model for k in twin_model_keys]
+    stacked = StackedModels(models)
+    assert all(p.is_meta for p in stacked.base.parameters())
+    assert all(np.shape(t)[0] == 2 for t in stacked.params.values())
@@ -0,0 +1,19 @@
+"""Request-level checks of the explanation endpoints."""
+
+TEXT = 'the vaccine is a total hoax made by big pharma'
+
+
+def test_explain_lime_endpoint(client, tiny_model_key):
+    response = client.post('/api/explain/lime', json={
+        'text': TEXT, 'model': tiny_model_key, 'top_n_words': 3, 'num_samples': 60, 'adaptive': False,
+    })
+    assert response.status_code == 200, response.get_json()
+    body = response.get_json()
+    assert len(body['lime_explanation']) == 3
+    assert body['samples'] == 60
+    assert body['model_used'] == tiny_model_key
+
+
+def test_explain_lime_rejects_bad_budget(client, tiny_model_key):
+    response = client.post('/api/explain/lime', json={'text': TEXT, 'model': tiny_model_key, 'num_samples': 'many'})
+    assert response.status_code == 400
@@ -0,0 +1,50 @@
+"""Explanation engines and the explanation cache."""
+
+
+def test_lime_ranking_is_cached_once_and_truncated(tiny_model_key):
+    from explanations import explain_lime, get_explanation_cache_stats
+
+    text = 'big pharma made the total hoax to control people'
+    full = explain_lime(tiny_model_key, text, num_samples=60, adaptive=False)
+    assert len(full['words']) == len(text.split())
+    weights = [abs(w) for _, w in full['words']]
+    assert weights == sorted(weights, reverse=True)
+
+    stats = get_explanation_cache_stats()
+    top3 = explain_lime(tiny_model_key, text, top_n_words=3, num_samples=60, adaptive=False)
+    top5 = explain_lime(tiny_model_key, text, top_n_words=5, num_samples=60, adaptive=False)
+    assert top3['words'] == full['words'][:3]
+    assert top5['words'] == full['words'][:5]
+    after = get_explanation_cache_stats()
+    assert after['misses'] == stats['misses']
+    assert after['memory_hits'] == stats['memory_hits'] + 2
+
+
+def test_explanation_cache_is_keyed_on_the_sample_budget(tiny_model_key):
+    from explanations import explain_lime, get_explanation_cache_stats
+
+    text = 'scientists say the climate is real'
+    explain_lime(tiny_model_key, text, num_samples=40, adaptive=False)
+    misses = get_explanation_cache_stats()['misses']
+    result = explain_lime(tiny_model_key, text, num_samples=50, adaptive=False)
+    assert get_explanation_cache_stats()['misses'] == misses + 1
+    assert result['samples'] == 50
+
+
+def test_explanations_survive_a_restart(tiny_model_key, tmp_path, monkeypatch):
+    import explanations
+    from config import EXPLANATION_CACHE_MAX_DISK_ENTRIES
+    from result_cache import TwoTierCache
+
+    def fresh_cache():
+        return TwoTierCache(tmp_path / 'results.sqlite', 'explanations', max_memory_entries=8,
+                            max_disk_entries=EXPLANATION_CACHE_MAX_DISK_ENTRIES)
+
+    text = 'the vaccine is made by big pharma'
+    monkeypatch.setattr(explanations, '_explanation_cache', fresh_cache())
+    first = explanations.explain_lime(tiny_model_key, text, top_n_words=2, num_samples=40, adaptive=False)
+
+    monkeypatch.setattr(explanations, '_explanation_cache', fresh_cache())
+    second = explanations.explain_lime(tiny_model_key, text, top_n_words=2, num_samples=40, adaptive=False)
+    assert explanations.get_explanation_cache_stats()['disk_hits'] == 1
+    assert [word for word, _ in second['words']] == [word for word, _ in first['words']]
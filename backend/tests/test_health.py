@@ -0,0 +1,44 @@
+"""Health endpoint and startup warm-up readiness."""
+
+
+def test_health_is_ready_without_warmup(client):
+    for url in ('/api/health', '/api/health?ready=1'):
+        response = client.get(url)
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['status'] == 'healthy'
+        assert data['warmup']['ready'] is True
+        assert 'explanation_cache' in data
+
+
+def test_ready_check_waits_for_warmup(client, monkeypatch):
+    import routes
+
+    monkeypatch.setattr(routes.warmup_manager, 'get_status',
+                        lambda: {'ready': False, 'degraded': False, 'failed_models': [], 'models': {}})
+    assert client.get('/api/health').status_code == 200
+    assert client.get('/api/health?ready=1').status_code == 503
+
+
+def test_failed_warmup_is_reported_as_degraded(client, monkeypatch):
+    import routes
+    from warmup import WarmupManager
+
+    def fail_load(model_key):
+        raise RuntimeError('weights missing')
+
+    monkeypatch.setattr('ai_utils.get_loaded_model', fail_load)
+    manager = WarmupManager(['covid'], sequence_lengths=[8])
+    manager.start()
+    manager._thread.join(timeout=10)
+    assert manager.is_ready() is False
+    monkeypatch.setattr(routes, 'warmup_manager', manager)
+
+    assert client.get('/api/health').status_code == 200
+    response = client.get('/api/health?ready=1')
+    assert response.status_code == 503
+    data = response.get_json()
+    assert data['status'] == 'degraded'
+    assert data['warmup']['degraded'] is True
+    assert data['warmup']['failed_models'] == ['covid']
+    assert data['warmup']['models']['covid']['error'] == 'weights missing'
@@ -0,0 +1,30 @@
+"""Cold-import checks: the API and the trainer module must not load lazy stacks."""
+
+import subprocess
+import sys
+
+from conftest import BACKEND_DIR
+
+
+def test_model_trainer_import_is_light():
+    code = ("import sys, model_trainer; "
+            "print(','.join(m for m in ('torch', 'transformers', 'onnx_backend', 'quantization', 'early_exit') "
+            "if m in sys.modules))")
+    result = subprocess.run([sys.executable, '-c', code], cwd=str(BACKEND_DIR), capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr[-2000:]
+    assert result.stdout.strip() == ''
+
+
+def test_import_time_report_passes():
+    # The budget is generous here; the eager-import check is what this guards
+    result = subprocess.run([sys.executable, 'import_time_report.py', '--budget', '120', '--top', '5'],
+                            cwd=str(BACKEND_DIR), capture_output=True, text=True, timeout=300)
+    assert result.returncode == 0, result.stdout[-2000:] + result.stderr[-2000:]
+
+
+def test_serving_modules_load_transformers_lazily():
+    code = ("import sys, ai_utils, model_registry, quantization, mmap_weights; "
+            "print(','.join(m for m in sys.modules if m.startswith('transformers') or m in ('sklearn', 'pandas')))")
+    result = subprocess.run([sys.executable, '-c', code], cwd=str(BACKEND_DIR), capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr[-2000:]
+    assert result.stdout.strip() == ''
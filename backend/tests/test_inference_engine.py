@@ -0,0 +1,87 @@
+"""Worker-pool inference against the in-process model, and worker restarts."""
+
+import time
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope='module')
+def engine():
+    pytest.importorskip('torch')
+    pytest.importorskip('transformers')
+    from inference_engine import InferenceEngine
+
+    engine = InferenceEngine(num_workers=1, threads_per_worker=1, health_interval=1)
+    engine.start()
+    yield engine
+    engine.stop()
+
+
+def test_worker_predictions_match_local_model(engine, tiny_model_key, tiny_model_dir):
+    from inference_engine import RemoteModel
+    from model_registry import LoadedModel
+
+    local = LoadedModel(tiny_model_key, str(tiny_model_dir), -1)
+    remote = RemoteModel(engine, tiny_model_key, str(tiny_model_dir))
+    input_ids = local.encode(['the vaccine is a hoax', 'climate change is real', 'scientists say'] * 5)
+
+    expected = local.predict_proba_ids(input_ids)
+    np.testing.assert_allclose(remote.predict_proba_ids(input_ids, batch_size=4), expected, atol=1e-5)
+    # Large inputs travel through shared memory
+    engine.shm_threshold_bytes = 0
+    np.testing.assert_allclose(remote.predict_proba_ids(input_ids, batch_size=4), expected, atol=1e-5)
+
+
+def test_remote_model_reports_worker_weight_bytes(engine, tiny_model_key, tiny_model_dir):
+    from inference_engine import RemoteModel
+    from model_cache import ModelCache
+
+    remote = RemoteModel(engine, tiny_model_key, str(tiny_model_dir))
+    assert remote.param_bytes > 0
+
+    # The byte budget now applies in worker mode
+    cache = ModelCache(max_bytes=remote.param_bytes)
+    cache.put('a', remote)
+    cache.put('b', remote)
+    assert 'a' not in cache and 'b' in cache
+
+
+def test_dead_worker_is_restarted_with_its_models(tiny_model_key, tiny_model_dir):
+    from concurrent.futures import Future
+    from inference_engine import InferenceEngine, RemoteModel
+
+    engine = InferenceEngine(num_workers=1, threads_per_worker=1, health_interval=0.2, worker_timeout=30)
+    engine.start()
+    try:
+        remote = RemoteModel(engine, tiny_model_key, str(tiny_model_dir))
+        input_ids = remote.encode(['the vaccine is a hoax', 'climate change is real'])
+        expected = remote.predict_proba_ids(input_ids)
+
+        # Requests still pending on the old process fail instead of hanging
+        abandoned = Future()
+        engine._workers[0].pending[-1] = ('predict', abandoned)
+        engine._workers[0].process.kill()
+        with pytest.raises(RuntimeError, match='restarted'):
+            abandoned.result(timeout=30)
+
+        deadline = time.time() + 30
+        while engine.get_stats()['processes'][0]['restarts'] == 0 and time.time() < deadline:
+            time.sleep(0.1)
+        worker = engine.get_stats()['processes'][0]
+        assert worker['restarts'] == 1 and worker['alive']
+        # The replacement process reloads the model before serving
+        np.testing.assert_allclose(remote.predict_proba_ids(input_ids), expected, atol=1e-5)
+    finally:
+        engine.stop()
+
+
+def test_pick_worker_ignores_health_pings():
+    from concurrent.futures import Future
+    from inference_engine import InferenceEngine, _WorkerState
+
+    engine = InferenceEngine(num_workers=2, threads_per_worker=1)
+    engine._workers = [_WorkerState(None, None, None), _WorkerState(None, None, None)]
+    engine._workers[0].pending = {0: ('ping', Future()), 1: ('ping', Future())}
+    engine._workers[1].pending = {2: ('predict', Future())}
+    assert engine._pick_worker() == 0
@@ -0,0 +1,68 @@
+"""Background jobs: the job manager and async checkDeception."""
+
+import threading
+
+import pytest
+
+from jobs import JobManager, JobQueueFullError
+
+
+def test_job_manager_runs_and_reports_jobs():
+    manager = JobManager(max_workers=1, max_pending=5, result_ttl=60)
+
+    ok = manager.submit('add', lambda a, b: a + b, 2, 3)
+    state = manager.get(ok.job_id, wait=5)
+    assert state['status'] == 'completed'
+    assert state['result'] == 5
+
+    def fail():
+        raise ValueError('boom')
+
+    bad = manager.submit('fail', fail)
+    state = manager.get(bad.job_id, wait=5)
+    assert state['status'] == 'failed'
+    assert state['error'] == 'boom'
+
+    assert manager.get('missing') is None
+    stats = manager.get_stats()
+    assert (stats['submitted'], stats['completed'], stats['failed'], stats['pending']) == (2, 1, 1, 0)
+
+
+def test_job_manager_rejects_when_full_and_expires_results():
+    manager = JobManager(max_workers=1, max_pending=1, result_ttl=0)
+    release = threading.Event()
+
+    job = manager.submit('wait', release.wait, 5)
+    with pytest.raises(JobQueueFullError):
+        manager.submit('wait', release.wait, 5)
+    assert manager.get_stats()['rejected'] == 1
+
+    release.set()
+    assert manager.get(job.job_id, wait=5)['status'] == 'completed'
+    assert manager.cleanup_expired() == 1
+    assert manager.get(job.job_id) is None
+
+
+def test_async_check_deception_returns_a_pollable_job(client, tiny_model_key, monkeypatch):
+    import routes
+    from security import create_jwt_token
+
+    # The job body is the synchronous handler; stub it so the test needs no explainers
+    monkeypatch.setattr(routes, 'run_check_deception',
+                        lambda model_key, text, *args: {'model_used': model_key, 'text': text})
+    headers = {'Authorization': f'Bearer {create_jwt_token()}'}
+
+    response = client.post('/api/public/checkDeception', headers=headers, json={
+        'text': 'the vaccine is a total hoax', 'modelName': tiny_model_key, 'params': {'async': True},
+    })
+    assert response.status_code == 202, response.get_json()
+    body = response.get_json()
+    assert body['status_url'] == f"/api/public/jobs/{body['job_id']}"
+
+    response = client.get(f"{body['status_url']}?wait=5", headers=headers)
+    assert response.status_code == 200
+    job = response.get_json()
+    assert job['status'] == 'completed'
+    assert job['result'] == {'model_used': tiny_model_key, 'text': 'the vaccine is a total hoax'}
+
+    assert client.get('/api/public/jobs/unknown', headers=headers).status_code == 404
@@ -0,0 +1,96 @@
+"""Native LIME engine: perturbation sampling, the surrogate fit and explain()."""
+
+import numpy as np
+
+
+def test_sample_masks_keep_the_original_first():
+    from lime_engine import sample_masks
+
+    masks = sample_masks(5, 200, np.random.default_rng(0))
+    assert masks.shape == (200, 5)
+    assert masks[0].all()
+    removed = (~masks[1:]).sum(axis=1)
+    assert removed.min() >= 1 and removed.max() <= 5
+
+
+def test_weighted_ridge_matches_weighted_least_squares():
+    from lime_engine import weighted_ridge
+
+    rng = np.random.default_rng(0)
+    X = rng.random((50, 3))
+    y = X @ np.array([1.0, -2.0, 0.5]) + 0.3
+    weights = rng.random(50) + 0.1
+    coef, intercept = weighted_ridge(X, y, weights, alpha=0.0)
+    assert np.allclose(coef, [1.0, -2.0, 0.5])
+    assert np.isclose(intercept, 0.3)
+
+
+def test_features_drop_every_token_of_a_removed_word(tiny_model_key):
+    from ai_utils import encode_text
+    from lime_engine import LimeFeatures
+
+    encoding = encode_text(tiny_model_key, 'scientists say scientists are true.')
+    features = LimeFeatures(encoding)
+    assert features.vocab == ['scientists', 'say', 'are', 'true']
+
+    # Remove 'scientists' (both occurrences, two word pieces each); [CLS], [SEP] and '.' always stay
+    masks = np.array([[True, True, True, True], [False, True, True, True]])
+    full, without = features.perturbed_ids(masks, max_length=64)
+    assert full == encoding.input_ids
+    assert len(without) == len(full) - 4
+    assert without[0] == full[0] and without[-2:] == full[-2:]
+
+
+def test_mask_scorer_runs_each_distinct_mask_once(tiny_model_key):
+    from ai_utils import encode_text, get_loaded_model
+    from lime_engine import LimeFeatures, MaskScorer
+
+    loaded_model = get_loaded_model(tiny_model_key)
+    features = LimeFeatures(encode_text(tiny_model_key, 'the vaccine is a hoax'))
+    scorer = MaskScorer(loaded_model, features, column=1, batch_size=4)
+    masks = np.array([[True] * 5, [False] + [True] * 4, [True] * 5])
+    scores = scorer.score(masks)
+    assert scorer.distinct == 2
+    assert scores[0] == scores[2]
+    scorer.score(masks[:2])
+    assert scorer.distinct == 2
+
+
+def test_explain_fixed_budget_is_seeded(tiny_model_key):
+    import lime_engine
+    from ai_utils import encode_text, get_loaded_model
+
+    text = 'big pharma made the vaccine to control people'
+    loaded_model, encoding = get_loaded_model(tiny_model_key), encode_text(tiny_model_key, text)
+    first = lime_engine.explain(loaded_model, encoding, num_features=4, num_samples=80, seed=3)
+    assert first == lime_engine.explain(loaded_model, encoding, num_features=4, num_samples=80, seed=3)
+    assert first['samples'] == 80
+    assert len(first['words']) == 4
+    assert {word for word, _ in first['words']} <= set(text.split())
+    weights = [abs(w) for _, w in first['words']]
+    assert weights == sorted(weights, reverse=True)
+
+
+def test_compare_fits_scores_ranking_and_weight_changes():
+    from lime_engine import compare_fits
+
+    fit = [(0, 0.5), (1, -0.3), (2, 0.1)]
+    assert compare_fits(fit, fit, top_k=2, tolerance=0.05) == (1.0, True)
+
+    stability, converged = compare_fits(fit, [(1, -0.5), (0, 0.4), (2, 0.1)], top_k=2, tolerance=0.05)
+    assert not converged
+    assert 0.0 <= stability < 1.0
+
+
+def test_explain_adaptive_stops_within_the_budget(tiny_model_key):
+    import lime_engine
+    from ai_utils import encode_text, get_loaded_model
+
+    text = 'climate change is real scientists say'
+    result = lime_engine.explain(get_loaded_model(tiny_model_key), encode_text(tiny_model_key, text),
+                                 num_features=3, seed=1, num_samples=300, adaptive=True,
+                                 min_samples=50, round_samples=50, tolerance=0.5)
+    assert len(result['words']) == 3
+    assert 50 <= result['samples'] <= 300
+    assert result['distinct_samples'] <= result['samples']
+    assert 0.0 <= result['stability'] <= 1.0
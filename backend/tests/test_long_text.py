@@ -0,0 +1,101 @@
+"""Long-text window splitting, aggregation and scoring."""
+
+import numpy as np
+import pytest
+
+
+def test_window_aggregation_strategies():
+    from long_text import aggregate_window_probs
+
+    # Columns: (truthful, deceptive); the short middle window is the most deceptive
+    probs = np.array([[0.9, 0.1], [0.2, 0.8], [0.7, 0.3]])
+    lengths = [100, 10, 100]
+
+    mean, decisive = aggregate_window_probs(probs, lengths, 'mean', deceptive_index=1)
+    np.testing.assert_allclose(mean, [0.6, 0.4])
+    assert decisive == 0
+
+    worst, decisive = aggregate_window_probs(probs, lengths, 'max_deceptive', deceptive_index=1)
+    np.testing.assert_allclose(worst, [0.2, 0.8])
+    assert decisive == 1
+
+    weighted, decisive = aggregate_window_probs(probs, lengths, 'length_weighted', deceptive_index=1)
+    np.testing.assert_allclose(weighted, (100 * probs[0] + 10 * probs[1] + 100 * probs[2]) / 210)
+    assert weighted[1] < mean[1]
+    assert decisive == 0
+
+
+def test_windows_overlap_by_stride_and_cover_the_text(tiny_model_key):
+    from ai_utils import get_loaded_model
+    from long_text import split_windows
+
+    tokenizer = get_loaded_model(tiny_model_key).tokenizer
+    text = ' '.join(['the vaccine is a total hoax .'] * 20)
+    token_count = len(tokenizer(text, add_special_tokens=False)['input_ids'])
+    windows = split_windows(tokenizer, text, window_tokens=16, stride=4)
+
+    assert windows[0]['token_start'] == 0 and windows[-1]['token_end'] == token_count
+    for previous, window in zip(windows, windows[1:]):
+        assert previous['token_end'] - window['token_start'] == 4
+    assert all(len(window['input_ids']) <= 16 for window in windows)
+    assert windows[0]['input_ids'][0] == tokenizer.cls_token_id
+    assert windows[0]['text'].startswith('the vaccine')
+
+
+@pytest.mark.parametrize('options, error', [
+    ({'long_text': True, 'aggregation': 'median'}, 'aggregation'),
+    ({'long_text': True, 'stride': -1}, 'stride'),
+    ({'long_text': True, 'stride': True}, 'stride'),
+])
+def test_long_text_options_are_validated(options, error):
+    from long_text import parse_long_text_options
+
+    assert parse_long_text_options({}) == (None, None)
+    parsed, error_msg = parse_long_text_options(options)
+    assert parsed is None and error in error_msg
+
+
+def test_long_text_windows_use_prediction_cache(tiny_model_key, monkeypatch):
+    import long_text
+    from ai_utils import get_loaded_model, get_prediction_cache_stats
+
+    split_windows = long_text.split_windows
+    monkeypatch.setattr(long_text, 'split_windows',
+                        lambda tokenizer, text, stride: split_windows(tokenizer, text, window_tokens=32, stride=stride))
+
+    # No repeated windows, so every window is its own cache entry
+    words = 'the vaccine is a total hoax made by big pharma to control people climate change real say true'.split()
+    text = ' '.join(words[(i * 7) % len(words)] + ('' if i % 5 else ' .') for i in range(150))
+    first = long_text.score_long_text(tiny_model_key, text, aggregation='mean', stride=8)
+    hits = get_prediction_cache_stats()['memory_hits']
+    second = long_text.score_long_text(tiny_model_key, text, aggregation='mean', stride=8)
+
+    assert len(first['windows']) > 1
+    assert get_prediction_cache_stats()['memory_hits'] == hits + len(first['windows'])
+    assert second == first
+
+    # Same probabilities as a direct forward pass over the windows
+    loaded_model = get_loaded_model(tiny_model_key)
+    windows = split_windows(loaded_model.tokenizer, text, window_tokens=32, stride=8)
+    expected = loaded_model.predict_proba_ids([window['input_ids'] for window in windows])
+    np.testing.assert_allclose([w['confidence'] for w in first['windows']], expected.max(axis=1), atol=1e-5)
+
+
+def test_long_text_prediction_follows_the_aggregation(tiny_model_key, monkeypatch):
+    import long_text
+
+    split_windows = long_text.split_windows
+    monkeypatch.setattr(long_text, 'split_windows',
+                        lambda tokenizer, text, stride: split_windows(tokenizer, text, window_tokens=16, stride=stride))
+    text = ' '.join(['the vaccine is a total hoax made by big pharma .', 'climate change is real , scientists say .'] * 6)
+
+    for aggregation in long_text.AGGREGATIONS:
+        result = long_text.score_long_text(tiny_model_key, text, aggregation=aggregation, stride=4)
+        windows = result['windows']
+        # Rebuilt as (other label, deceptive) columns from the per-window scores
+        probs = np.array([[1 - w['deceptive_score'], w['deceptive_score']] for w in windows])
+        lengths = [w['token_end'] - w['token_start'] for w in windows]
+        expected, decisive = long_text.aggregate_window_probs(probs, lengths, aggregation, deceptive_index=1)
+        assert result['aggregation'] == aggregation
+        assert result['confidence'] == pytest.approx(float(expected.max()), abs=1e-5)
+        assert result['decisive_window'] == decisive
@@ -0,0 +1,56 @@
+"""Memory-mapped safetensors loading and its use by LoadedModel."""
+
+import numpy as np
+import pytest
+
+
+def test_mmap_model_matches_from_pretrained(tiny_model_dir):
+    torch = pytest.importorskip('torch')
+    from transformers import AutoModelForSequenceClassification
+    from mmap_weights import load_mmap_model
+
+    model = load_mmap_model(str(tiny_model_dir))
+    assert model is not None
+    reference = AutoModelForSequenceClassification.from_pretrained(str(tiny_model_dir)).eval()
+    input_ids = torch.tensor([[2, 5, 6, 7, 8, 10, 3]])
+    with torch.no_grad():
+        np.testing.assert_allclose(model(input_ids=input_ids).logits.numpy(),
+                                   reference(input_ids=input_ids).logits.numpy(), atol=1e-6)
+
+
+def test_mmap_does_not_convert_on_load(tiny_model_dir, tmp_path):
+    torch = pytest.importorskip('torch')
+    from transformers import AutoModelForSequenceClassification
+    from mmap_weights import load_mmap_model, ensure_safetensors, SAFETENSORS_FILENAME, PYTORCH_BIN_FILENAME
+
+    # A model trained before safetensors: config plus pytorch_model.bin
+    model = AutoModelForSequenceClassification.from_pretrained(str(tiny_model_dir))
+    model.config.save_pretrained(tmp_path)
+    torch.save(model.state_dict(), tmp_path / PYTORCH_BIN_FILENAME)
+
+    assert load_mmap_model(str(tmp_path)) is None
+    assert not (tmp_path / SAFETENSORS_FILENAME).exists()
+
+    assert ensure_safetensors(str(tmp_path)) == tmp_path / SAFETENSORS_FILENAME
+    assert load_mmap_model(str(tmp_path)) is not None
+
+
+def test_loaded_model_serves_mapped_weights(tiny_model_key, tiny_model_dir, monkeypatch):
+    pytest.importorskip('torch')
+    import model_registry
+    from mmap_weights import get_mapped_weights_memory
+
+    monkeypatch.setattr(model_registry, 'MMAP_WEIGHTS', True)
+    loaded_model = model_registry.LoadedModel(tiny_model_key, str(tiny_model_dir), -1)
+    if loaded_model.backend != 'torch':
+        pytest.skip("Served from ONNX")
+    assert loaded_model.model is not None
+    assert loaded_model.mmapped
+
+    # The parameters view the file mapping instead of private copies
+    usage = get_mapped_weights_memory({tiny_model_key: str(tiny_model_dir)})
+    assert tiny_model_key in usage
+    assert loaded_model.predict_proba_ids(loaded_model.encode(['the vaccine is a hoax'])).shape == (1, 2)
+
+    monkeypatch.setattr(model_registry, 'MMAP_WEIGHTS', False)
+    assert not model_registry.LoadedModel(tiny_model_key, str(tiny_model_dir), -1).mmapped
@@ -0,0 +1,66 @@
+"""Memory-bounded LRU model cache."""
+
+import time
+
+
+class _Entry:
+    def __init__(self, param_bytes):
+        self.param_bytes = param_bytes
+
+
+def test_lru_eviction_within_byte_budget():
+    from model_cache import ModelCache
+
+    evicted = []
+    cache = ModelCache(max_bytes=300, pinned=['pinned'],
+                       on_evict=lambda key, value, reason: evicted.append((key, reason)))
+    cache.put('pinned', _Entry(100))
+    cache.put('a', _Entry(100))
+    cache.put('b', _Entry(100))
+    cache.get('a')
+    cache.put('c', _Entry(100))
+
+    assert evicted == [('b', 'lru')]
+    assert sorted(cache.keys()) == ['a', 'c', 'pinned']
+    stats = cache.get_stats()
+    assert stats['used_mb'] == round(300 / 1024**2, 1)
+    assert stats['evictions']['lru'] == 1
+
+
+def test_over_budget_keeps_pinned_and_new_entry(capsys):
+    from model_cache import ModelCache
+
+    cache = ModelCache(max_bytes=250, pinned=['pinned'])
+    cache.put('pinned', _Entry(200))
+    cache.put('a', _Entry(40))
+    cache.put('big', _Entry(100))
+
+    assert sorted(cache.keys()) == ['big', 'pinned']
+    assert 'only pinned entries and big remain' in capsys.readouterr().out
+
+
+def test_idle_entries_are_evicted_but_pinned_stay():
+    from model_cache import ModelCache
+
+    cache = ModelCache(idle_ttl=0.05, pinned=['pinned'])
+    cache.put('pinned', _Entry(1))
+    cache.put('custom', _Entry(1))
+    time.sleep(0.1)
+
+    assert cache.evict_idle() == 1
+    assert 'custom' not in cache
+    assert 'pinned' in cache
+    assert cache.get('custom') is None
+    assert cache.pop('pinned') is not None
+
+
+def test_headroom_excludes_pinned_and_kept_entries():
+    from model_cache import ModelCache
+
+    cache = ModelCache(max_bytes=1000, pinned=['pinned'])
+    cache.put('pinned', _Entry(300))
+    cache.put('member', _Entry(200))
+    cache.put('other', _Entry(100))
+    assert cache.headroom() == 700
+    assert cache.headroom(keep=['member']) == 500
+    assert ModelCache().headroom() is None
@@ -0,0 +1,39 @@
+"""The shared model instance behind the label, probability and explainer views."""
+
+import numpy as np
+
+
+def test_views_share_one_model(tiny_model_key):
+    from ai_utils import get_loaded_model, get_pred_probs, hf_pretrained_classify
+
+    loaded_model = get_loaded_model(tiny_model_key)
+    assert get_loaded_model(tiny_model_key) is loaded_model
+    assert loaded_model.classifier.model is loaded_model.model
+    assert loaded_model.prob_classifier.model is loaded_model.model
+
+    texts = ['the vaccine is a total hoax', 'scientists say climate change is real']
+    labels = [result['label'] for result in hf_pretrained_classify(tiny_model_key, texts)]
+    probs = loaded_model.predict_proba_ids(loaded_model.encode(texts))
+    assert labels == [loaded_model.config.id2label[i] for i in probs.argmax(axis=1)]
+
+    # get_pred_probs reorders the same probabilities into CLASS_NAMES columns
+    np.testing.assert_allclose(get_pred_probs(tiny_model_key, texts, use_cache=False),
+                               probs[:, loaded_model.class_columns()], atol=1e-6)
+
+
+def test_explainer_scores_do_not_depend_on_batch_size(tiny_model_key, monkeypatch):
+    import model_registry
+    from ai_utils import get_loaded_model
+
+    loaded_model = get_loaded_model(tiny_model_key)
+    texts = ['the vaccine is a total hoax made by big pharma', 'true', 'climate change is real',
+             'scientists say', 'a hoax to control people', 'the vaccine']
+
+    monkeypatch.setattr(model_registry, 'EXPLAINER_BATCH_SIZES', {tiny_model_key: 1})
+    assert loaded_model.explainer_batch_size == 1
+    one_by_one = loaded_model.predict_proba_texts(texts)
+
+    monkeypatch.setattr(model_registry, 'EXPLAINER_BATCH_SIZES', {tiny_model_key: 4})
+    batched = loaded_model.predict_proba_texts(texts)
+    assert batched.flags['C_CONTIGUOUS']
+    np.testing.assert_allclose(batched, one_by_one, atol=1e-5)
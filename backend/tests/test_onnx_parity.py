@@ -0,0 +1,78 @@
+"""ONNX Runtime parity with PyTorch and backend selection (parity skipped without onnx/onnxruntime or exports)."""
+
+import shutil
+
+import pytest
+
+
+def test_tiny_model_export_matches_pytorch(tiny_model_dir, tmp_path):
+    pytest.importorskip('onnx')
+    pytest.importorskip('onnxruntime')
+    from onnx_backend import check_parity
+
+    model_dir = tmp_path / 'model'
+    shutil.copytree(tiny_model_dir, model_dir)
+    result = check_parity(str(model_dir))
+    assert result['passed'], result
+
+
+def test_served_exports_match_pytorch():
+    pytest.importorskip('onnxruntime')
+    from config import AVAILABLE_MODELS
+    from model_utils import get_model_path
+    from onnx_backend import check_parity, is_export_current
+
+    exported = {}
+    for model_key in AVAILABLE_MODELS:
+        try:
+            model_path = get_model_path(model_key)
+        except ValueError:
+            continue
+        if is_export_current(model_path):
+            exported[model_key] = model_path
+    if not exported:
+        pytest.skip("No current ONNX exports (python manage_serving_models.py export-onnx --all)")
+
+    failures = {key: result for key, result in
+                ((key, check_parity(path)) for key, path in exported.items()) if not result['passed']}
+    assert not failures
+
+
+def test_backend_falls_back_to_pytorch(tiny_model_dir, tmp_path, monkeypatch):
+    import onnx_backend
+
+    model_dir = tmp_path / 'model'
+    shutil.copytree(tiny_model_dir, model_dir)
+
+    monkeypatch.setattr(onnx_backend, 'INFERENCE_BACKEND', 'auto')
+    monkeypatch.setattr(onnx_backend, 'is_onnxruntime_available', lambda: True)
+    assert onnx_backend.select_backend(str(model_dir), device=-1) == 'torch'  # no export yet
+    assert onnx_backend.select_backend(str(model_dir), device=0) == 'torch'
+    assert onnx_backend.select_backend('org/hub-model', device=-1) == 'torch'
+
+    def broken_export(model_path, force=False):
+        raise RuntimeError('unsupported operator')
+
+    monkeypatch.setattr(onnx_backend, 'INFERENCE_BACKEND', 'onnx')
+    monkeypatch.setattr(onnx_backend, 'export_onnx', broken_export)
+    assert onnx_backend.select_backend(str(model_dir), device=-1) == 'torch'
+
+    monkeypatch.setattr(onnx_backend, 'is_onnxruntime_available', lambda: False)
+    onnx_backend.get_onnx_path(str(model_dir)).parent.mkdir()
+    onnx_backend.get_onnx_path(str(model_dir)).write_bytes(b'stale')
+    assert onnx_backend.select_backend(str(model_dir), device=-1) == 'torch'
+
+
+def test_onnx_mode_exports_then_auto_serves_it(tiny_model_dir, tmp_path, monkeypatch):
+    pytest.importorskip('onnx')
+    pytest.importorskip('onnxruntime')
+    import onnx_backend
+
+    model_dir = tmp_path / 'model'
+    shutil.copytree(tiny_model_dir, model_dir)
+    monkeypatch.setattr(onnx_backend, 'INFERENCE_BACKEND', 'onnx')
+    assert onnx_backend.select_backend(str(model_dir), device=-1) == 'onnx'
+    assert onnx_backend.is_export_current(str(model_dir))
+
+    monkeypatch.setattr(onnx_backend, 'INFERENCE_BACKEND', 'auto')
+    assert onnx_backend.select_backend(str(model_dir), device=-1) == 'onnx'
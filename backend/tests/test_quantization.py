@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+
+def test_is_quantization_enabled(monkeypatch):
+    pytest.importorskip('torch')
+    import quantization
+
+    monkeypatch.setattr(quantization, 'QUANTIZED_MODELS', ['bert-covid-1', 'custom'])
+    assert quantization.is_quantization_enabled('bert-covid-1')
+    assert quantization.is_quantization_enabled('custom_abc123')
+    assert not quantization.is_quantization_enabled('bert-covid-2')
+
+    monkeypatch.setattr(quantization, 'QUANTIZED_MODELS', ['all'])
+    assert quantization.is_quantization_enabled('bert-covid-2')
+
+
+def test_quantized_variant_is_cached_and_close_to_fp32(tiny_model_dir):
+    torch = pytest.importorskip('torch')
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+    from quantization import build_quantized, load_quantized, get_model_bytes, _predict_probs
+
+    path = build_quantized(str(tiny_model_dir))
+    assert path.exists()
+    mtime = path.stat().st_mtime_ns
+    assert build_quantized(str(tiny_model_dir)) == path
+    assert path.stat().st_mtime_ns == mtime  # current variant is reused
+
+    fp32 = AutoModelForSequenceClassification.from_pretrained(str(tiny_model_dir)).eval()
+    int8 = load_quantized(str(tiny_model_dir))
+    assert any(type(m).__module__.startswith('torch.ao.nn.quantized') for m in int8.modules())
+    assert get_model_bytes(int8) < get_model_bytes(fp32)
+
+    tokenizer = AutoTokenizer.from_pretrained(str(tiny_model_dir))
+    texts = ['the vaccine is a total hoax', 'climate change is real']
+    fp32_probs = _predict_probs(fp32, tokenizer, texts, batch_size=2)
+    int8_probs = _predict_probs(int8, tokenizer, texts, batch_size=2)
+    assert int8_probs.shape == (2, 2)
+    assert np.allclose(int8_probs.sum(axis=1), 1.0, atol=1e-5)
+    assert np.abs(int8_probs - fp32_probs).max() < 0.05
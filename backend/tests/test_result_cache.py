@@ -0,0 +1,47 @@
+"""Two-tier result cache and model fingerprints."""
+
+import os
+
+
+def test_memory_and_disk_tiers(tmp_path):
+    from result_cache import TwoTierCache, text_hash
+
+    assert text_hash('  The  vaccine\nis real ') == text_hash('The vaccine is real')
+
+    cache = TwoTierCache(tmp_path / 'results.sqlite', 'predictions', max_memory_entries=1)
+    cache.put_many({'a': [1, 2], 'b': {'label': 'x'}})
+    assert cache.get_many(['a', 'b', 'c']) == {'a': [1, 2], 'b': {'label': 'x'}}
+    stats = cache.get_stats()
+    assert (stats['memory_hits'], stats['disk_hits'], stats['misses']) == (1, 1, 1)
+
+    # A new process (fresh memory tier) reads the disk tier
+    restarted = TwoTierCache(tmp_path / 'results.sqlite', 'predictions', max_memory_entries=10)
+    assert restarted.get('a') == [1, 2]
+    assert restarted.get_stats()['disk_hits'] == 1
+
+
+def test_fingerprint_changes_with_model_files(tmp_path):
+    from result_cache import ModelFingerprints
+
+    model_dir = tmp_path / 'model'
+    model_dir.mkdir()
+    (model_dir / 'config.json').write_text('{"a": 1}')
+    fingerprints = ModelFingerprints(tmp_path / 'results.sqlite')
+
+    first = fingerprints.get(str(model_dir))
+    assert fingerprints.get(str(model_dir)) == first
+
+    (model_dir / 'config.json').write_text('{"a": 2}')
+    os.utime(model_dir / 'config.json', ns=(1, 1))
+    assert fingerprints.get(str(model_dir)) != first
+    assert fingerprints.get('org/hub-model') == fingerprints.get('org/hub-model')
+
+
+def test_repeated_predictions_hit_the_cache(tiny_model_key):
+    from ai_utils import get_prediction_cache_stats, hf_pretrained_classify
+
+    texts = ['big pharma say the hoax is true', 'people say climate change is a hoax']
+    first = hf_pretrained_classify(tiny_model_key, texts)
+    hits = get_prediction_cache_stats()['memory_hits']
+    assert hf_pretrained_classify(tiny_model_key, texts) == first
+    assert get_prediction_cache_stats()['memory_hits'] == hits + 2
@@ -0,0 +1,68 @@
+"""SHAP cost bounds: budget options, cached and coarse partition trees."""
+
+import numpy as np
+import pytest
+
+
+def test_coarse_partition_tree_never_splits_word_groups():
+    from shap_engine import coarse_partition_tree
+
+    segments = ['', 'the ', 'vacc', 'ine ', 'is ', 'a ', 'hoax', '']
+    tree = coarse_partition_tree(segments, group_tokens=2)
+    assert tree.shape == (len(segments) - 1, 4)
+
+    # Groups: [CLS] the | vacc ine | is a | hoax [SEP], each merged at a negative distance
+    inner = tree[tree[:, 2] < 0]
+    assert [(int(left), int(right)) for left, right, _, _ in inner] == [(0, 1), (2, 3), (4, 5), (6, 7)]
+    assert (inner[:, 3] == 2).all()
+
+    # Then a balanced tree over the groups, ending in the root
+    outer = tree[tree[:, 2] >= 0]
+    assert [(int(left), int(right), size) for left, right, _, size in outer] == [(8, 9, 4), (10, 11, 4), (12, 13, 8)]
+    assert outer[-1, 2] == 1.0
+
+
+def test_partition_tree_cache_is_lru_and_goes_coarse_for_long_texts():
+    from shap_engine import PartitionTreeCache
+
+    calls = []
+    cache = PartitionTreeCache(lambda s: calls.append(s) or np.zeros((1, 4)),
+                               lambda s: (['a ', 'b'], None), coarse_tokens=10, max_entries=1)
+    cache('x'), cache('x'), cache('y'), cache('x')
+    assert calls == ['x', 'y', 'x']
+    assert cache.hits == 1 and cache.misses == 3
+
+    segments = ['', 'the ', 'vaccine ', 'is ', 'a ', 'hoax', '']
+    coarse = PartitionTreeCache(lambda s: pytest.fail('fine tree built for a long text'),
+                                lambda s: (segments, None), coarse_tokens=4, group_tokens=2)
+    tree = coarse('long text')
+    assert tree.shape == (len(segments) - 1, 4)
+    tree[0, 0] = -1  # callers get a copy
+    assert coarse('long text')[0, 0] == 0
+
+
+def test_parse_shap_options_bounds():
+    from explanations import parse_shap_options
+
+    assert parse_shap_options({}) == ({}, None)
+    assert parse_shap_options({'max_evals': 100, 'batch_size': 8}) == ({'max_evals': 100, 'batch_size': 8}, None)
+    for bad in ({'max_evals': 5}, {'max_evals': '100'}, {'batch_size': True}, {'batch_size': 0}):
+        options, error = parse_shap_options(bad)
+        assert options == {} and error
+
+
+def test_explain_shap_rejects_bad_budget(client, tiny_model_key):
+    response = client.post('/api/explain/shap', json={'text': 'the vaccine is a hoax', 'model': tiny_model_key,
+                                                      'max_evals': 1})
+    assert response.status_code == 400
+    assert 'max_evals' in response.get_json()['error']
+
+
+def test_explain_shap_endpoint(client, tiny_model_key):
+    pytest.importorskip('shap')
+    response = client.post('/api/explain/shap', json={'text': 'the vaccine is a total hoax', 'model': tiny_model_key,
+                                                      'top_n_words': 3, 'max_evals': 40, 'batch_size': 8})
+    assert response.status_code == 200, response.get_json()
+    body = response.get_json()
+    assert len(body['shap_explanation']) == 3
+    assert body['model_used'] == tiny_model_key
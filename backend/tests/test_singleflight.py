@@ -0,0 +1,96 @@
+"""Single-flight loading: shared loads and the negative cache."""
+
+import threading
+import time
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_load():
+    flight = SingleFlight('test')
+    calls = []
+    started = threading.Event()
+
+    def load():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return 'model'
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do('a', load)))
+    leader.start()
+    started.wait(5)
+    waiters = [threading.Thread(target=lambda: results.append(flight.do('a', load))) for _ in range(3)]
+    for thread in waiters:
+        thread.start()
+    for thread in [leader] + waiters:
+        thread.join(5)
+
+    assert results == ['model'] * 4
+    assert len(calls) == 1
+    stats = flight.get_stats()
+    assert stats['loads'] == 1
+    assert stats['shared_waits'] == 3
+    assert not flight.is_loading('a')
+
+
+def test_failures_are_cached_until_forgotten():
+    flight = SingleFlight('test', failure_ttl=60)
+    calls = []
+
+    def fail():
+        calls.append(1)
+        raise RuntimeError('no such model')
+
+    with pytest.raises(RuntimeError):
+        flight.do('a', fail)
+    with pytest.raises(RuntimeError):
+        flight.do('a', fail)
+    assert len(calls) == 1
+    assert flight.get_stats()['negative_cache_hits'] == 1
+    assert flight.get_stats()['failing'] == ['a']
+
+    flight.forget('a')
+    assert flight.do('a', lambda: 'ok') == 'ok'
+
+
+def test_failures_are_retried_without_a_ttl():
+    flight = SingleFlight('test', failure_ttl=0)
+    calls = []
+
+    def fail():
+        calls.append(1)
+        raise RuntimeError('boom')
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            flight.do('a', fail)
+    assert len(calls) == 2
+
+
+@pytest.mark.parametrize('fails', [False, True])
+def test_outcome_is_published_before_the_key_is_released(fails):
+    flight = SingleFlight('test', failure_ttl=0)
+
+    class CheckedInFlight(dict):
+        def pop(self, key, *args):
+            future, _ = self[key]
+            assert future.done(), 'key released before its future was resolved'
+            return super().pop(key, *args)
+
+    flight._in_flight = CheckedInFlight()
+
+    def load():
+        if fails:
+            raise RuntimeError('boom')
+        return 'model'
+
+    if fails:
+        with pytest.raises(RuntimeError):
+            flight.do('a', load)
+    else:
+        assert flight.do('a', load) == 'model'
+    assert not flight.is_loading('a')
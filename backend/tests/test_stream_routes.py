@@ -0,0 +1,98 @@
+"""Streaming bulk scoring: NDJSON and CSV input, per-text rate limiting and the record limit."""
+
+import json
+
+import pytest
+
+
+def _post_stream(client, url, body, content_type, remote_addr):
+    from security import create_jwt_token
+
+    return client.post(
+        url,
+        data=body,
+        content_type=content_type,
+        headers={'Authorization': f'Bearer {create_jwt_token()}'},
+        environ_base={'REMOTE_ADDR': remote_addr},
+    )
+
+
+def _read_results(response):
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def _stream(client, model_key, lines, remote_addr):
+    body = ''.join(json.dumps(line) + '\n' for line in lines)
+    return _read_results(_post_stream(client, f'/api/public/score/stream?modelName={model_key}', body,
+                                      'application/x-ndjson', remote_addr))
+
+
+def test_stream_scores_records(client, tiny_model_key):
+    results = _stream(client, tiny_model_key, [{'id': 'a', 'text': 'the vaccine is a hoax'}, 'climate change is real'],
+                      '10.0.0.1')
+    assert [r.get('id') for r in results[:2]] == ['a', None]
+    assert all('prediction' in r for r in results[:2])
+    assert results[-1] == {'done': True, 'count': 2, 'errors': 0}
+
+
+def test_stream_reports_bad_ndjson_lines_in_place(client, tiny_model_key, monkeypatch):
+    import stream_routes
+    monkeypatch.setattr(stream_routes, 'STREAM_MAX_LINE_BYTES', 64)
+
+    body = '\n'.join(['"the vaccine is a hoax"', '{not json', '', '[1, 2]', json.dumps({'text': 'x' * 100}),
+                      json.dumps({'id': 7, 'text': ''}), '"climate change is real"']) + '\n'
+    results = _read_results(_post_stream(client, f'/api/public/score/stream?modelName={tiny_model_key}', body,
+                                         'application/x-ndjson', '10.0.0.4'))
+
+    assert [r['line'] for r in results[:-1]] == [1, 2, 4, 5, 6, 7]
+    assert 'prediction' in results[0] and 'prediction' in results[5]
+    assert results[1]['error'] == 'Invalid JSON'
+    assert results[2]['error'] == 'Expected a JSON object or string'
+    assert results[3]['error'] == 'Line exceeds 64 bytes'
+    assert results[4]['id'] == 7 and 'error' in results[4]
+    assert results[-1] == {'done': True, 'count': 6, 'errors': 4}
+
+
+def test_stream_scores_csv_rows(client, tiny_model_key):
+    body = 'id,text\nr1,the vaccine is a hoax\nr2,"climate change, again, is real"\n'
+    results = _read_results(_post_stream(client, f'/api/public/score/stream?modelName={tiny_model_key}', body,
+                                         'text/csv', '10.0.0.5'))
+    assert [(r['line'], r['id']) for r in results[:2]] == [(1, 'r1'), (2, 'r2')]
+    assert all('prediction' in r for r in results[:2])
+    assert results[-1] == {'done': True, 'count': 2, 'errors': 0}
+
+    # format= overrides the Content-Type; a header without a text column ends the stream
+    results = _read_results(_post_stream(client, f'/api/public/score/stream?modelName={tiny_model_key}&format=csv',
+                                         'id,body\nr1,hello\n', 'text/plain', '10.0.0.5'))
+    assert results == [{'done': False, 'count': 0, 'errors': 0,
+                        'error': "Stream scoring failed: CSV header must contain a 'text' column"}]
+
+
+def test_stream_rejects_unknown_formats(client, tiny_model_key):
+    url = f'/api/public/score/stream?modelName={tiny_model_key}'
+    assert _post_stream(client, url + '&format=xml', '', 'text/plain', '10.0.0.6').status_code == 400
+    assert _post_stream(client, url, '<texts/>', 'application/xml', '10.0.0.6').status_code == 415
+    assert _post_stream(client, '/api/public/score/stream', '', 'text/plain', '10.0.0.6').status_code == 400
+
+
+def test_stream_charges_every_text_to_batch_bucket(client, tiny_model_key, monkeypatch):
+    import stream_routes
+    monkeypatch.setattr(stream_routes, 'STREAM_BATCH_SIZE', 2)
+    monkeypatch.setattr(stream_routes, 'RATE_LIMIT_BATCH_TEXTS', 3)
+
+    results = _stream(client, tiny_model_key, ['the vaccine is a hoax'] * 5, '10.0.0.2')
+    assert results[-1]['done'] is False
+    assert results[-1]['count'] == 2
+    assert 'Rate limit' in results[-1]['error']
+
+
+def test_stream_stops_at_record_limit(client, tiny_model_key, monkeypatch):
+    import stream_routes
+    monkeypatch.setattr(stream_routes, 'STREAM_MAX_RECORDS', 3)
+
+    results = _stream(client, tiny_model_key, ['the vaccine is a hoax'] * 5, '10.0.0.3')
+    assert results[-1]['done'] is False
+    assert results[-1]['count'] == 3
+    assert '3 records' in results[-1]['error']
@@ -0,0 +1,30 @@
+"""TextEncoding: one tokenization reused for scoring and word-level attributions."""
+
+
+def test_encoding_recovers_words_and_sums_token_values(tiny_model_key):
+    from ai_utils import encode_text
+
+    text = 'scientists say the vaccine is real'
+    encoding = encode_text(tiny_model_key, text)
+    assert encoding.has_word_mapping
+    assert encoding.token_count == len(encoding.input_ids)
+    assert [word for word, _, _ in encoding.words()] == text.split()
+    for word, start, end in encoding.words():
+        assert text[start:end] == word
+
+    # 'scientists' is two word pieces, so its two values are summed
+    values = [0.0] * encoding.token_count
+    values[1], values[2] = 0.25, 0.5
+    words = encoding.aggregate_to_words(values)
+    assert words[0] == ('scientists', 0.75)
+    assert [word for word, _ in words] == text.split()
+    assert encoding.aggregate_to_words(values[:-1]) is None
+
+
+def test_encoding_without_offsets(tiny_model_key):
+    from text_encoding import TextEncoding
+
+    encoding = TextEncoding(tiny_model_key, 'the vaccine', [2, 5, 6, 3])
+    assert encoding.token_count == 4
+    assert not encoding.has_word_mapping
+    assert encoding.aggregate_to_words([0.1] * 4) is None
@@ -0,0 +1,27 @@
+"""Token-length precheck and the cached tokenizer."""
+
+
+def test_short_ascii_text_skips_tokenization(tiny_model_key):
+    from ai_utils import count_tokens, get_tokenizer
+    from text_scoring import check_text_length
+
+    assert get_tokenizer(tiny_model_key) is get_tokenizer(tiny_model_key)
+    assert count_tokens(tiny_model_key, 'the vaccine is a hoax', max_tokens=64) == (None, None)
+    assert check_text_length('the vaccine is a hoax', tiny_model_key, max_tokens=64) == (True, None, None, None)
+
+
+def test_long_text_is_tokenized_and_rejected(tiny_model_key):
+    from text_scoring import check_text_length
+
+    text = ' '.join(['the vaccine is a hoax'] * 20)
+    is_valid, token_count, error_msg, encoding = check_text_length(text, tiny_model_key, max_tokens=64)
+    assert not is_valid
+    assert token_count == 5 * 20 + 2
+    assert '64' in error_msg
+
+    is_valid, token_count, error_msg, encoding = check_text_length(text, tiny_model_key, max_tokens=512)
+    assert is_valid and token_count is None  # the character bound already proves it fits
+
+    is_valid, token_count, _, encoding = check_text_length(text, tiny_model_key, max_tokens=512, encode=True)
+    assert is_valid and token_count == 102
+    assert encoding.input_ids[0] == 2 and len(encoding.input_ids) == 102
@@ -0,0 +1,106 @@
+"""
+Text Encoding
+Request-scoped tokenization: a text is tokenized once and the resulting input
+IDs, character offsets and word mapping are passed through the length check,
+prediction and explanation stages.
+"""
+
+from typing import List, Optional, Tuple
+
+
+class TextEncoding:
+    """One text tokenized once with a model's tokenizer."""
+
+    __slots__ = ('model_key', 'text', 'input_ids', 'offsets', 'word_ids', '_words')
+
+    def __init__(self, model_key: str, text: str, input_ids: List[int],
+                 offsets: Optional[List[Tuple[int, int]]] = None, word_ids: Optional[List[Optional[int]]] = None):
+        """
+        Initialize the encoding.
+
+        Args:
+            model_key: Model whose tokenizer produced the encoding
+            text: The encoded text
+            input_ids: Token IDs including special tokens
+            offsets: Character span of each token ((0, 0) for special tokens)
+            word_ids: Word index of each token (None for special tokens)
+        """
+        self.model_key = model_key
+        self.text = text
+        self.input_ids = input_ids
+        self.offsets = offsets
+        self.word_ids = word_ids
+        self._words = None
+
+    @classmethod
+    def encode(cls, tokenizer, model_key: str, text: str) -> 'TextEncoding':
+        """
+        Tokenize a text once, keeping offsets and the word mapping when the tokenizer provides them.
+
+        Args:
+            tokenizer: The model's tokenizer
+            model_key: The key for the model
+            text: Text to encode (not truncated, so the token count is exact)
+
+        Returns:
+            TextEncoding: The encoding
+        """
+        try:
+            encoding = tokenizer(text, truncation=False, return_offsets_mapping=True)
+        except NotImplementedError:
+            # Slow tokenizers have no offsets or word mapping
+            return cls(model_key, text, tokenizer.encode(text, truncation=False, add_special_tokens=True))
+        return cls(model_key, text, encoding['input_ids'],
+                   offsets=[tuple(span) for span in encoding['offset_mapping']],
+                   word_ids=encoding.word_ids())
+
+    @property
+    def token_count(self) -> int:
+        """Number of tokens including special tokens."""
+        return len(self.input_ids)
+
+    @property
+    def has_word_mapping(self) -> bool:
+        """Whether words can be recovered exactly from the offsets."""
+        return self.offsets is not None and self.word_ids is not None
+
+    def words(self) -> List[Tuple[str, int, int]]:
+        """
+        Get the words of the text as the tokenizer split them.
+
+        Returns:
+            List[Tuple[str, int, int]]: (word, char_start, char_end) in text order
+        """
+        if self._words is None:
+            spans = {}
+            for word_id, (start, end) in zip(self.word_ids or [], self.offsets or []):
+                if word_id is None:
+                    continue
+                if word_id in spans:
+                    spans[word_id] = (min(spans[word_id][0], start), max(spans[word_id][1], end))
+                else:
+                    spans[word_id] = (start, end)
+            self._words = [(self.text[start:end], start, end) for _, (start, end) in sorted(spans.items())]
+        return self._words
+
+    def aggregate_to_words(self, token_values) -> Optional[List[Tuple[str, float]]]:
+        """
+        Sum per-token attributions into per-word attributions using the offsets.
+
+        Args:
+            token_values: One value per token of this encoding (special tokens included)
+
+        Returns:
+            Optional[List[Tuple[str, float]]]: (word, summed value) in text order, or
+                None if the values do not line up with this encoding's tokens
+        """
+        if not self.has_word_mapping or len(token_values) != len(self.input_ids):
+            return None
+
+        totals = {}
+        for word_id, value in zip(self.word_ids, token_values):
+            if word_id is not None:
+                totals[word_id] = totals.get(word_id, 0.0) + float(value)
+
+        word_ids = sorted({w for w in self.word_ids if w is not None})
+        return [(word, totals[word_id]) for word_id, (word, _, _) in zip(word_ids, self.words())]
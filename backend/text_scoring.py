@@ -0,0 +1,120 @@
+"""
+Text Scoring
+Shared validation and scoring helpers for the single-text, batch and
+streaming prediction endpoints.
+"""
+
+from flask import request
+from config import LABEL_MAPPING, MAX_BATCH_TEXTS
+from ai_utils import hf_pretrained_classify, count_tokens, encode_text
+from text_encoding import TextEncoding
+from security import validate_text_input
+
+
+def check_text_length(text, model_key, max_tokens=512, encode=False):
+    """
+    Check if text will exceed the model's token limit
+    
+    Uses the cached tokenizer and, unless encode is set, skips tokenization
+    entirely when a character-count bound already proves the text fits.
+    
+    Args:
+        text: Input text to check
+        model_key: Key for the model (for tokenizer)
+        max_tokens: Maximum tokens allowed (default 512 for BERT)
+        encode: Always tokenize, keeping offsets and the word mapping, so the
+            request's later stages can reuse the encoding
+        
+    Returns:
+        tuple: (is_valid, token_count, error_message, encoding)
+            token_count and encoding are None when the fast bound was enough;
+            encoding.input_ids can be passed to hf_pretrained_classify
+    """
+    try:
+        if encode:
+            encoding = encode_text(model_key, text)
+            token_count = encoding.token_count
+        else:
+            token_count, input_ids = count_tokens(model_key, text, max_tokens)
+            encoding = TextEncoding(model_key, text, input_ids) if input_ids is not None else None
+        
+        if token_count is not None and token_count > max_tokens:
+            return False, token_count, f"Text contains {token_count} tokens, but model limit is {max_tokens}. Please reduce text length.", None
+        
+        return True, token_count, None, encoding
+        
+    except Exception as e:
+        # Fallback to character count if tokenizer fails
+        if len(text) > 1300:
+            return False, -1, "Text is too long. Please limit to 1300 characters.", None
+        return True, -1, None, None
+
+
+def get_batch_cost():
+    """Rate-limit cost of a batch request: one unit per submitted text."""
+    data = request.get_json(silent=True) or {}
+    texts = data.get('texts')
+    if not isinstance(texts, list):
+        return 1
+    return min(len(texts), MAX_BATCH_TEXTS)
+
+
+def validate_batch_texts(texts):
+    """
+    Validate the texts list of a batch request.
+    
+    Args:
+        texts: Value of the request's 'texts' field
+        
+    Returns:
+        tuple: (is_valid, error_message)
+    """
+    if not isinstance(texts, list) or not texts:
+        return False, "'texts' must be a non-empty list"
+    if len(texts) > MAX_BATCH_TEXTS:
+        return False, f"Too many texts: {len(texts)} (maximum {MAX_BATCH_TEXTS} per request)"
+    return True, None
+
+
+def score_text_batch(texts, model_key):
+    """
+    Validate and classify a batch of texts, reporting errors per item.
+    
+    Identical texts are scored once; valid texts go through the model in
+    length-sorted batches.
+    
+    Args:
+        texts: Raw texts from the request
+        model_key: Validated model key
+        
+    Returns:
+        tuple: (items, cleaned_texts) in input order. Each item is either
+            {'index', 'prediction', 'confidence'} or {'index', 'error'};
+            cleaned_texts holds the validated text (None for invalid items)
+    """
+    items = [None] * len(texts)
+    cleaned_texts = [None] * len(texts)
+    checked = {}  # cleaned text -> error message (None if valid)
+    
+    for i, text in enumerate(texts):
+        is_valid, cleaned_text, error_msg = validate_text_input(text)
+        if is_valid:
+            if cleaned_text not in checked:
+                is_valid, _, error_msg, _ = check_text_length(cleaned_text, model_key)
+                checked[cleaned_text] = None if is_valid else error_msg
+            error_msg = checked[cleaned_text]
+        
+        if error_msg:
+            items[i] = {'index': i, 'error': error_msg}
+        else:
+            cleaned_texts[i] = cleaned_text
+    
+    unique_texts = [text for text, error_msg in checked.items() if error_msg is None]
+    if unique_texts:
+        predictions = dict(zip(unique_texts, hf_pretrained_classify(model_key, unique_texts, LABEL_MAPPING)))
+        for i, cleaned_text in enumerate(cleaned_texts):
+            if cleaned_text is not None:
+                prediction = predictions[cleaned_text]
+                items[i] = {'index': i, 'prediction': prediction['label'], 'confidence': prediction['score']}
+    
+    return items, cleaned_texts
@@ -1,6 +1,5 @@
 import os
 import json
-import pandas as pd
 import threading
 from datetime import datetime
 from flask import request, jsonify, send_file, Response
@@ -62,7 +61,8 @@ def register_training_routes(app):
 
     start_zip_cleanup_scheduler()
 from ai_utils import preload_model, hf_pretrained_classify, _model_cache
-from explanations import get_lime_explanation, get_shap_explanation
+from explanations import get_shap_explanation, explain_lime, parse_lime_options, parse_shap_options
+from long_text import parse_long_text_options, get_text_limit, score_long_text, long_text_details, LongTextError
 from config import LABEL_MAPPING
 
 # Global progress tracking for downloads
@@ -127,6 +127,7 @@ def register_training_routes(app):
             # Read CSV
             try:
                 file.seek(0)  # Reset file pointer after validation
+                import pandas as pd
                 df = pd.read_csv(file)
                 print(f"📊 CSV loaded: {len(df)} rows, {len(df.columns)} columns")
             except Exception as e:
@@ -210,6 +211,7 @@ def register_training_routes(app):
             # Read and validate CSV
             try:
                 file.seek(0)  # Reset file pointer after validation
+                import pandas as pd
                 df = pd.read_csv(file)
                 is_valid, error_msg = validate_csv_data(df)
                 if not is_valid:
@@ -306,8 +308,12 @@ def register_training_routes(app):
             data = request.get_json()
             text = data.get('text', '').strip()
             
+            long_text, error_msg = parse_long_text_options(data)
+            if error_msg:
+                return jsonify({'error': error_msg}), 400
+            
             # Validate text input
-            is_valid, cleaned_text, error_msg = validate_text_input(text)
+            is_valid, cleaned_text, error_msg = validate_text_input(text, get_text_limit(data))
             if not is_valid:
                 print(f"⚠️ Text validation failed: {error_msg}")
                 return jsonify({'error': error_msg}), 400
@@ -324,9 +330,17 @@ def register_training_routes(app):
                 print(f"📦 Loading custom model: {model_code}")
                 preload_model(custom_key, str(model_path), True)
             
-            # Make prediction
-            results = hf_pretrained_classify(custom_key, cleaned_text, LABEL_MAPPING)
-            prediction = results[0]
+            # Make prediction (long-text mode scores overlapping windows)
+            long_result = None
+            if long_text:
+                try:
+                    long_result = score_long_text(custom_key, cleaned_text, **long_text)
+                except LongTextError as e:
+                    return jsonify({'error': str(e)}), 400
+                prediction = {'label': long_result['prediction'], 'score': long_result['confidence']}
+            else:
+                results = hf_pretrained_classify(custom_key, cleaned_text, LABEL_MAPPING)
+                prediction = results[0]
             
             # Get model metadata for response
             metadata = get_model_metadata(model_code)
@@ -339,6 +353,8 @@ def register_training_routes(app):
                 'model_name': metadata.get('name', f'Custom Model {model_code}') if metadata else f'Custom Model {model_code}',
                 'model_type': 'custom'
             }
+            if long_result is not None:
+                response['long_text'] = long_text_details(long_result)
             
             end_time = time.time()
             print(f"✅ Custom prediction completed in {end_time - start_time:.3f}s - Result: {prediction['label']}, Confidence: {prediction['score']:.3f}")
@@ -376,6 +392,10 @@ def register_training_routes(app):
                 print(f"⚠️ Text validation failed: {error_msg}")
                 return jsonify({'error': error_msg}), 400
             
+            lime_options, error_msg = parse_lime_options(data)
+            if error_msg:
+                return jsonify({'error': error_msg}), 400
+            
             # Ensure model is loaded
             custom_key = f"custom_{model_code}"
             if custom_key not in _model_cache:
@@ -383,12 +403,15 @@ def register_training_routes(app):
                 preload_model(custom_key, str(model_path), True)
             
             # Generate LIME explanation
-            lime_explanation = get_lime_explanation(custom_key, cleaned_text, LABEL_MAPPING)
+            lime_result = explain_lime(custom_key, cleaned_text, LABEL_MAPPING, **lime_options)
+            lime_explanation = lime_result['words']
             
             metadata = get_model_metadata(model_code)
             
             response = {
                 'lime_explanation': lime_explanation,
+                'samples': lime_result['samples'],
+                'stability': lime_result['stability'],
                 'model_code': model_code,
                 'model_name': metadata.get('name', f'Custom Model {model_code}') if metadata else f'Custom Model {model_code}'
             }
@@ -429,6 +452,10 @@ def register_training_routes(app):
                 print(f"⚠️ Text validation failed: {error_msg}")
                 return jsonify({'error': error_msg}), 400
             
+            shap_options, error_msg = parse_shap_options(data)
+            if error_msg:
+                return jsonify({'error': error_msg}), 400
+            
             # Ensure model is loaded
             custom_key = f"custom_{model_code}"
             if custom_key not in _model_cache:
@@ -436,7 +463,7 @@ def register_training_routes(app):
                 preload_model(custom_key, str(model_path), True)
             
             # Generate SHAP explanation
-            shap_explanation = get_shap_explanation(custom_key, cleaned_text)
+            shap_explanation = get_shap_explanation(custom_key, cleaned_text, **shap_options)
             
             metadata = get_model_metadata(model_code)
             
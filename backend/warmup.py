@@ -0,0 +1,162 @@
+"""
+Startup Warm-up
+Loads models concurrently in the background after startup, runs dummy forward
+passes at typical sequence lengths and optionally builds the explainers, so the
+first user of each model does not pay the cold-start cost. Per-model readiness
+is reported through /api/health.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from config import (
+    AVAILABLE_MODELS, WARMUP_MODELS, WARMUP_WORKERS, WARMUP_SEQUENCE_LENGTHS, WARMUP_EXPLAINERS
+)
+
+WARMUP_FILLER = "warm up "
+
+
+def resolve_warmup_models(selection: List[str]) -> List[str]:
+    """Expand the WARMUP_MODELS selection ('all' = every pretrained model)."""
+    keys = []
+    for entry in selection:
+        if entry == 'all':
+            keys.extend(AVAILABLE_MODELS.keys())
+        elif entry in AVAILABLE_MODELS:
+            keys.append(entry)
+        else:
+            print(f"⚠️ Warm-up skipping unknown model: {entry}")
+    return list(dict.fromkeys(keys))
+
+
+class WarmupManager:
+    """Background warm-up of the served models with per-model readiness."""
+
+    def __init__(self, model_keys: List[str], max_workers: int = 2, sequence_lengths: List[int] = None,
+                 explainers: bool = False):
+        """
+        Initialize the warm-up manager.
+
+        Args:
+            model_keys: Models to warm up
+            max_workers: Models warmed concurrently
+            sequence_lengths: Token lengths of the dummy forward passes
+            explainers: Also build the LIME and SHAP explainers
+        """
+        self.model_keys = list(model_keys)
+        self.max_workers = max(1, int(max_workers))
+        self.sequence_lengths = list(sequence_lengths or [])
+        self.explainers = explainers
+
+        self._lock = threading.Lock()
+        self._states = {key: {'status': 'pending'} for key in self.model_keys}
+        self._thread = None
+        self._started_at = None
+        self._finished_at = None
+
+    def start(self):
+        """Start warming up in a background thread (returns immediately)."""
+        with self._lock:
+            if self._thread is not None or not self.model_keys:
+                return
+            self._started_at = time.time()
+            self._thread = threading.Thread(target=self._run, name='warmup', daemon=True)
+            self._thread.start()
+        print(f"🔥 Warm-up started for {len(self.model_keys)} model(s) "
+              f"({self.max_workers} at a time, lengths {self.sequence_lengths}, "
+              f"explainers {'on' if self.explainers else 'off'})")
+
+    def _set_state(self, model_key: str, **fields):
+        with self._lock:
+            self._states[model_key].update(fields)
+
+    def _run(self):
+        """Warm every model on a thread pool and record the overall duration."""
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='warmup') as executor:
+            list(executor.map(self._warm_model, self.model_keys))
+
+        with self._lock:
+            self._finished_at = time.time()
+            failed = self._failed_models()
+        print(f"🎉 Warm-up completed in {self._finished_at - self._started_at:.2f}s "
+              f"({len(self.model_keys) - len(failed)}/{len(self.model_keys)} models ready)")
+
+    def _warm_model(self, model_key: str):
+        """Load one model, run the dummy forward passes and optionally build its explainers."""
+        from ai_utils import get_loaded_model
+
+        start_time = time.time()
+        try:
+            self._set_state(model_key, status='loading', started_at=start_time)
+            loaded_model = get_loaded_model(model_key)
+            load_seconds = time.time() - start_time
+
+            self._set_state(model_key, status='warming', load_seconds=round(load_seconds, 3))
+            forward_start = time.time()
+            max_length = min(getattr(loaded_model.tokenizer, 'model_max_length', 512) or 512, 512)
+            for length in self.sequence_lengths:
+                length = min(length, max_length)
+                input_ids = loaded_model.tokenizer(WARMUP_FILLER * length, truncation=True,
+                                                   max_length=length)['input_ids']
+                loaded_model.predict_proba_ids([input_ids])
+            forward_seconds = time.time() - forward_start
+
+            explainer_seconds = None
+            if self.explainers:
+                explainer_start = time.time()
+                loaded_model.get_lime_explainer()
+                loaded_model.get_shap_explainer()
+                explainer_seconds = round(time.time() - explainer_start, 3)
+
+            total_seconds = time.time() - start_time
+            self._set_state(model_key, status='ready', forward_seconds=round(forward_seconds, 3),
+                            explainer_seconds=explainer_seconds, total_seconds=round(total_seconds, 3))
+            print(f"✅ Warm-up of {model_key} done in {total_seconds:.2f}s "
+                  f"(load {load_seconds:.2f}s, forward {forward_seconds:.2f}s)")
+
+        except Exception as e:
+            self._set_state(model_key, status='failed', error=str(e),
+                            total_seconds=round(time.time() - start_time, 3))
+            print(f"❌ Warm-up of {model_key} failed: {str(e)}")
+
+    def _failed_models(self) -> List[str]:
+        """Get the keys of the models whose warm-up failed. Caller must hold the lock."""
+        return [key for key, state in self._states.items() if state['status'] == 'failed']
+
+    def is_ready(self) -> bool:
+        """Check whether every model warmed up (or there was nothing to warm up)."""
+        return self.get_status()['ready']
+
+    def get_status(self) -> Dict[str, Any]:
+        """
+        Get overall and per-model warm-up state.
+
+        Returns:
+            Dict with 'ready' (warm-up finished and no model failed), 'degraded'
+            (warm-up finished but some models failed), 'failed_models',
+            'elapsed_seconds' and the per-model 'models' states
+        """
+        with self._lock:
+            elapsed = None
+            if self._started_at is not None:
+                elapsed = round((self._finished_at or time.time()) - self._started_at, 3)
+            finished = not self.model_keys or self._finished_at is not None
+            failed = self._failed_models()
+            return {
+                'ready': finished and not failed,
+                'degraded': finished and bool(failed),
+                'failed_models': failed,
+                'elapsed_seconds': elapsed,
+                'models': {key: dict(state) for key, state in self._states.items()},
+            }
+
+
+# Global warm-up manager instance (started from app.py)
+warmup_manager = WarmupManager(
+    resolve_warmup_models(WARMUP_MODELS),
+    max_workers=WARMUP_WORKERS,
+    sequence_lengths=WARMUP_SEQUENCE_LENGTHS,
+    explainers=WARMUP_EXPLAINERS
+)